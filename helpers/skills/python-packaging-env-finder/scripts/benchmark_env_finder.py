@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for env_finder.py
+
+Generates synthetic repository trees with a chosen number, size and density
+of CMake, Make and Python build files, measures env_finder against them (or
+against local checkouts) and stores the results as JSON so runs before and
+after a change can be compared.
+
+    ./benchmark_env_finder.py generate /tmp/envbench --cmake 500 --makefiles 200
+    ./benchmark_env_finder.py run /tmp/envbench ~/src/pytorch -o after.json
+    ./benchmark_env_finder.py compare before.json after.json
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from env_finder import EnvironmentVariableInvestigator  # noqa: E402
+
+
+# Metrics marked as improved or regressed by compare; the rest describe the input
+HIGHER_IS_BETTER = {"files_per_sec", "mb_per_sec", "matches_per_sec"}
+LOWER_IS_BETTER = {
+    "discovery_sec",
+    "analysis_sec",
+    "report_sec",
+    "peak_rss_kib",
+    "discovery_peak_rss_kib",
+    "analysis_peak_rss_kib",
+    "report_peak_rss_kib",
+    "occurrence_store_kib",
+    "decoys",
+}
+
+# Prefix of names that the synthetic trees mention without reading them from
+# the environment; any of them in the results is a false positive
+DECOY_PREFIX = "SYN_DECOY"
+
+# Steps of a scan, each measured in a fresh process
+PHASES = ["discovery", "analysis", "report"]
+
+
+# ============================================================================
+# Synthetic trees
+# ============================================================================
+
+
+def _env_name(rng: random.Random, prefix: str, variables: int) -> str:
+    return f"{prefix}_{rng.randrange(variables)}"
+
+
+def _fill(rng: random.Random, size: int, density: float, filler, env_line) -> str:
+    """Produce about ``size`` bytes of lines, ``density`` of them env reads"""
+    lines = []
+    length = 0
+    index = 0
+    while length < size:
+        line = env_line(index) if rng.random() < density else filler(index)
+        lines.append(line)
+        length += len(line) + 1
+        index += 1
+    return "\n".join(lines) + "\n"
+
+
+def cmake_content(rng: random.Random, size: int, density: float, variables: int):
+    def filler(i: int) -> str:
+        return f'set(SYN_LOCAL_{i} "${{CMAKE_CURRENT_SOURCE_DIR}}/src/file_{i}.cpp")'
+
+    def env_line(i: int) -> str:
+        name = _env_name(rng, "SYN_CMAKE", variables)
+        if i % 2:
+            return f"if(DEFINED ENV{{{name}}})\n  set(OPT_{i} $ENV{{{name}}})\nendif()"
+        return f'message(STATUS "Using $ENV{{{name}}}")'
+
+    return _fill(rng, size, density, filler, env_line)
+
+
+def make_content(rng: random.Random, size: int, density: float, variables: int):
+    def filler(i: int) -> str:
+        return f"obj/file_{i}.o: src/file_{i}.c\n\t$(CC) $(CFLAGS) -c $< -o $@"
+
+    def env_line(i: int) -> str:
+        name = _env_name(rng, "SYN_MAKE", variables)
+        if i % 2:
+            return f"{name} ?= default_{i}"
+        return f"target_{i}:\n\t@echo $({name}) $${name}"
+
+    return _fill(rng, size, density, filler, env_line)
+
+
+def python_content(rng: random.Random, size: int, density: float, variables: int):
+    header = (
+        '"""Synthetic build script\n\n'
+        "Top-level-looking lines inside a docstring are not code:\n"
+        f'os.environ["{DECOY_PREFIX}_PY_DOCSTRING"]\n'
+        '"""\n\nimport os\nfrom setuptools import setup\n\n'
+    )
+
+    def filler(i: int) -> str:
+        return f"SOURCES_{i} = ['src/file_{i}.cpp', 'src/file_{i}_impl.cpp']"
+
+    def env_line(i: int) -> str:
+        name = _env_name(rng, "SYN_PY", variables)
+        if i % 2:
+            return f'opt_{i} = os.environ.get("{name}", "{i}")'
+        return f'if os.getenv("{name}"):\n    SOURCES_{i} = []'
+
+    return header + _fill(rng, size, density, filler, env_line)
+
+
+def shell_content() -> str:
+    """A build script whose only unassigned reference is an env read"""
+    return (
+        "#!/bin/bash\n"
+        'if [ -n "$SYN_SHELL_CI" ]; then\n'
+        f"    {DECOY_PREFIX}_SHELL_OUTDIR=/tmp/out\n"
+        "fi\n"
+        f'mkdir -p "${DECOY_PREFIX}_SHELL_OUTDIR"\n'
+    )
+
+
+def generate_tree(
+    root: Path,
+    cmake: int,
+    makefiles: int,
+    setup_py: int,
+    file_size: int,
+    density: float,
+    variables: int,
+    seed: int,
+) -> Dict[str, int]:
+    """Write a synthetic project and return the number of files per kind
+
+    The root CMakeLists.txt, Makefile and setup.py are always created. Extra
+    CMake files go into nested directories, extra Makefiles become ``*.mk``
+    fragments and extra Python files are ``setup.py`` files of sub-packages,
+    which are only discovered with ``--sweep``, as is ``scripts/build.sh``.
+    """
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    if not (root / ".git").exists():
+        subprocess.run(["git", "init", "-q", str(root)], check=True)
+
+    def write(rel_path: str, content: str) -> None:
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+    for i in range(max(cmake, 1)):
+        rel_path = (
+            "CMakeLists.txt" if i == 0 else f"src/mod_{i // 50}/sub_{i}/CMakeLists.txt"
+        )
+        write(rel_path, cmake_content(rng, file_size, density, variables))
+    for i in range(max(makefiles, 1)):
+        rel_path = "Makefile" if i == 0 else f"make/part_{i // 50}/rules_{i}.mk"
+        write(rel_path, make_content(rng, file_size, density, variables))
+    for i in range(max(setup_py, 1)):
+        rel_path = "setup.py" if i == 0 else f"python/pkg_{i}/setup.py"
+        write(rel_path, python_content(rng, file_size, density, variables))
+    write("scripts/build.sh", shell_content())
+
+    return {
+        "cmake": max(cmake, 1),
+        "makefiles": max(makefiles, 1),
+        "setup_py": max(setup_py, 1),
+    }
+
+
+# ============================================================================
+# Measurement
+# ============================================================================
+
+
+class CountingInvestigator(EnvironmentVariableInvestigator):
+    """Investigator that counts every hit merged into the results"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.matches = 0
+
+    def apply_hits(self, file_path, hits):
+        self.matches += len(hits)
+        super().apply_hits(file_path, hits)
+
+
+def _peak_rss_kib() -> int:
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    scale = 1024 if sys.platform == "darwin" else 1
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return peak // scale
+
+
+def measure_phase(
+    phase: str, project_path: str, options: Dict[str, object], jobs: int
+) -> Dict:
+    """Run one step of a scan and return its metrics
+
+    Meant to run in a fresh process so peak RSS belongs to this step and the
+    untimed steps it depends on (analysis needs discovery, the report needs
+    both). With ``jobs`` the analysis workers count through RUSAGE_CHILDREN.
+    """
+    investigator = CountingInvestigator(project_path, **options)
+    metrics: Dict[str, object] = {}
+
+    start = time.perf_counter()
+    files = investigator.find_build_files()
+    discovery = time.perf_counter() - start
+
+    if phase == "discovery":
+        metrics["discovery_sec"] = discovery
+        total_bytes = 0
+        for file_path in files:
+            try:
+                total_bytes += file_path.stat().st_size
+            except OSError:
+                pass
+        metrics["files"] = len(files)
+        metrics["bytes"] = total_bytes
+
+    elif phase in ("analysis", "report"):
+        start = time.perf_counter()
+        investigator.analyze_files(files, jobs=jobs)
+        analysis = time.perf_counter() - start
+
+        if phase == "analysis":
+            metrics["analysis_sec"] = analysis
+            metrics["matches"] = investigator.matches
+            metrics["variables"] = len(investigator.variables)
+            metrics["decoys"] = sum(
+                1 for name in investigator.variables if name.startswith(DECOY_PREFIX)
+            )
+            if investigator.occurrences is not None:
+                metrics["occurrence_store_kib"] = (
+                    investigator.occurrences.memory_usage() // 1024
+                )
+        else:
+            start = time.perf_counter()
+            investigator.generate_report("text")
+            investigator.generate_report("json")
+            metrics["report_sec"] = time.perf_counter() - start
+
+    metrics[f"{phase}_peak_rss_kib"] = _peak_rss_kib()
+    return metrics
+
+
+def _in_fresh_process(function, *args) -> Dict:
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(function, *args).result()
+
+
+def benchmark_target(
+    project_path: str, options: Dict[str, object], jobs: int, repeat: int
+) -> Dict:
+    """Measure a project ``repeat`` times and summarize with the median"""
+    runs = []
+    for _ in range(repeat):
+        run: Dict[str, object] = {}
+        for phase in PHASES:
+            run.update(
+                _in_fresh_process(measure_phase, phase, project_path, options, jobs)
+            )
+        analysis = run["analysis_sec"]
+        run["files_per_sec"] = run["files"] / analysis if analysis else 0.0
+        run["mb_per_sec"] = run["bytes"] / (1024 * 1024) / analysis if analysis else 0.0
+        run["matches_per_sec"] = run["matches"] / analysis if analysis else 0.0
+        run["peak_rss_kib"] = max(run[f"{phase}_peak_rss_kib"] for phase in PHASES)
+        runs.append(run)
+    median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    return {"path": project_path, "median": median, "runs": runs}
+
+
+def compare_results(old: Dict, new: Dict) -> str:
+    """Format the change of each median metric for targets in both result files"""
+    old_targets = {target["path"]: target for target in old["targets"]}
+    lines = []
+    for target in new["targets"]:
+        previous = old_targets.get(target["path"])
+        if previous is None:
+            continue
+        lines.append(target["path"])
+        for key, value in target["median"].items():
+            before = previous["median"].get(key)
+            if before is None:
+                continue
+            if before:
+                change = (value - before) / before * 100
+                marker = " "
+                if change and key in HIGHER_IS_BETTER | LOWER_IS_BETTER:
+                    better = (change > 0) == (key in HIGHER_IS_BETTER)
+                    marker = "+" if better else "-"
+                lines.append(
+                    f"  {marker} {key:<22} {before:>14.3f} -> {value:>14.3f} "
+                    f"({change:+.1f}%)"
+                )
+            else:
+                lines.append(f"    {key:<22} {before:>14.3f} -> {value:>14.3f}")
+    return "\n".join(lines) if lines else "No common targets to compare"
+
+
+# ============================================================================
+# Command line
+# ============================================================================
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark env_finder on synthetic trees or local checkouts"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="Create a synthetic tree")
+    generate.add_argument("path", help="Directory to create the tree in")
+    generate.add_argument("--cmake", type=int, default=200, help="CMakeLists.txt files")
+    generate.add_argument("--makefiles", type=int, default=100, help="Make files")
+    generate.add_argument("--setup-py", type=int, default=20, help="setup.py files")
+    generate.add_argument(
+        "--file-size", type=int, default=16384, metavar="BYTES", help="Bytes per file"
+    )
+    generate.add_argument(
+        "--density",
+        type=float,
+        default=0.05,
+        help="Fraction of lines that read an environment variable",
+    )
+    generate.add_argument(
+        "--variables", type=int, default=500, help="Distinct variable names per kind"
+    )
+    generate.add_argument("--seed", type=int, default=0, help="Random seed")
+
+    run = subparsers.add_parser("run", help="Measure env_finder on projects")
+    run.add_argument("paths", nargs="+", help="Project directories to measure")
+    run.add_argument("--repeat", type=int, default=3, help="Runs per project")
+    run.add_argument("--output", "-o", help="Write JSON results to this file")
+    run.add_argument("--jobs", "-j", type=int, default=1, help="Worker processes")
+    run.add_argument("--sweep", action="store_true", help="Benchmark --sweep mode")
+    run.add_argument(
+        "--all-occurrences", action="store_true", help="Record every occurrence"
+    )
+    run.add_argument("--no-ast", action="store_true", help="Disable the AST analyzer")
+    run.add_argument(
+        "--no-tokenizers", action="store_true", help="Disable the tokenizers"
+    )
+    run.add_argument(
+        "--git-index", action="store_true", help="Discover files with git ls-files"
+    )
+
+    compare = subparsers.add_parser("compare", help="Compare two result files")
+    compare.add_argument("old", help="Baseline JSON results")
+    compare.add_argument("new", help="New JSON results")
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        counts = generate_tree(
+            Path(args.path),
+            cmake=args.cmake,
+            makefiles=args.makefiles,
+            setup_py=args.setup_py,
+            file_size=args.file_size,
+            density=args.density,
+            variables=args.variables,
+            seed=args.seed,
+        )
+        print(f"Generated {args.path}: {json.dumps(counts)}")
+        return
+
+    if args.command == "compare":
+        try:
+            with open(args.old) as f:
+                old = json.load(f)
+            with open(args.new) as f:
+                new = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not read results: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(compare_results(old, new))
+        return
+
+    options = {
+        "sweep": args.sweep,
+        "all_occurrences": args.all_occurrences,
+        "use_ast": not args.no_ast,
+        "use_tokenizers": not args.no_tokenizers,
+        "use_git_index": args.git_index,
+    }
+    targets: List[Dict] = []
+    for path in args.paths:
+        if not os.path.isdir(path):
+            print(f"Error: {path} is not a directory", file=sys.stderr)
+            sys.exit(1)
+        print(f"Measuring {path}...", file=sys.stderr)
+        targets.append(
+            benchmark_target(os.path.abspath(path), options, args.jobs, args.repeat)
+        )
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "jobs": args.jobs,
+        "repeat": args.repeat,
+        "options": options,
+        "targets": targets,
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    for target in targets:
+        median = target["median"]
+        print(
+            f"{target['path']}: {median['files']:.0f} files, "
+            f"discovery {median['discovery_sec']:.3f}s, "
+            f"{median['files_per_sec']:.0f} files/s, "
+            f"{median['mb_per_sec']:.1f} MB/s, "
+            f"{median['matches_per_sec']:.0f} matches/s, "
+            f"peak RSS {median['discovery_peak_rss_kib'] / 1024:.1f}/"
+            f"{median['analysis_peak_rss_kib'] / 1024:.1f}/"
+            f"{median['report_peak_rss_kib'] / 1024:.1f} MiB "
+            "(discovery/analysis/report), "
+            f"{median['decoys']:.0f} false positives",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
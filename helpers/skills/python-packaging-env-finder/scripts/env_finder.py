@@ -7,15 +7,113 @@ that can be set during wheel building. It examines various build
 configuration files and extracts environment variable usage.
 """
 
+import os
 import sys
 import re
 import json
+import fnmatch
+import functools
 import argparse
+import array
+import ast
+import bisect
+import concurrent.futures
+import hashlib
+import io
+import mmap
+import sqlite3
+import subprocess
+import time
+from collections import Counter
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 from dataclasses import dataclass
 
 
+# Build files that are only meaningful at the project root
+ROOT_BUILD_FILES = [
+    "setup.py",
+    "setup.cfg",
+    "pyproject.toml",
+    "CMakeLists.txt",
+    "configure.ac",
+    "configure.in",
+    "Makefile",
+    "makefile",
+    "build.py",
+    "conda.yaml",
+    "environment.yml",
+]
+
+# Build files searched for anywhere in the tree
+RECURSIVE_BUILD_PATTERNS = [
+    "CMakeLists.txt",
+    "*.mk",
+]
+
+# Directories that never contain build configuration worth scanning
+DEFAULT_EXCLUDE_DIRS = {
+    ".git",
+    ".hg",
+    ".svn",
+    ".tox",
+    ".nox",
+    ".venv",
+    "venv",
+    ".eggs",
+    "__pycache__",
+    "node_modules",
+    "build",
+    "dist",
+    "third_party",
+}
+
+# Files at least this large are memory-mapped and scanned as one buffer
+MMAP_THRESHOLD = 1024 * 1024
+
+# Bump whenever a change to the analysis would alter cached per-file results
+CACHE_VERSION = 7
+
+# Whole-tree sweep: source files by suffix or exact name, and their limits
+SWEEP_SUFFIXES = {
+    ".py": "python",
+    ".c": "c",
+    ".cc": "c",
+    ".cpp": "c",
+    ".cxx": "c",
+    ".cu": "c",
+    ".cuh": "c",
+    ".h": "c",
+    ".hh": "c",
+    ".hpp": "c",
+    ".hxx": "c",
+    ".sh": "shell",
+    ".bash": "shell",
+    ".bzl": "bazel",
+    ".bazel": "bazel",
+    ".cmake": "cmake",
+    ".mk": "make",
+}
+SWEEP_NAMES = {
+    "BUILD": "bazel",
+    "WORKSPACE": "bazel",
+    ".bazelrc": "bazel",
+    "CMakeLists.txt": "cmake",
+    "Makefile": "make",
+    "makefile": "make",
+    "GNUmakefile": "make",
+}
+SWEEP_MAX_FILE_SIZE = 2 * 1024 * 1024
+# A NUL byte in the first chunk marks a file as binary
+SNIFF_BYTES = 8192
+
+# Occurrences listed per variable in the text report with --all-occurrences
+TEXT_OCCURRENCE_LIMIT = 20
+
+# Number of parsed Python build files kept in memory, keyed by content hash
+AST_CACHE_SIZE = 64
+
+
 @dataclass
 class EnvVariable:
     """Represents a discovered environment variable"""
@@ -29,12 +127,1115 @@ class EnvVariable:
     usage_context: str
 
 
+class EnvHit(NamedTuple):
+    """A single environment variable sighting within one file"""
+
+    name: str
+    line_number: int
+    context: str
+    default_value: Optional[str]
+    line_content: str
+
+
+class OccurrenceColumns:
+    """Parallel integer columns holding every sighting of one variable"""
+
+    __slots__ = ("files", "lines", "contexts")
+
+    def __init__(self):
+        self.files = array.array("I")
+        self.lines = array.array("I")
+        self.contexts = array.array("H")
+
+
+class OccurrenceStore:
+    """Compact record of every (file, line, context) hit of every variable
+
+    Paths and contexts are interned once into shared tables, so a hit costs
+    ten bytes of array storage instead of a tuple of Python objects.
+    """
+
+    __slots__ = ("paths", "contexts", "variables", "_path_ids", "_context_ids")
+
+    def __init__(self):
+        self.paths: List[str] = []
+        self.contexts: List[str] = []
+        self.variables: Dict[str, OccurrenceColumns] = {}
+        self._path_ids: Dict[str, int] = {}
+        self._context_ids: Dict[str, int] = {}
+
+    def add_file(self, rel_path: str, hits: List[EnvHit]) -> None:
+        """Record all hits of one file"""
+        if not hits:
+            return
+        file_id = self._intern(rel_path, self.paths, self._path_ids)
+        for hit in hits:
+            columns = self.variables.get(hit.name)
+            if columns is None:
+                columns = self.variables[hit.name] = OccurrenceColumns()
+            columns.files.append(file_id)
+            columns.lines.append(hit.line_number)
+            columns.contexts.append(
+                self._intern(hit.context, self.contexts, self._context_ids)
+            )
+
+    @staticmethod
+    def _intern(value: str, table: List[str], ids: Dict[str, int]) -> int:
+        index = ids.get(value)
+        if index is None:
+            index = ids[value] = len(table)
+            table.append(value)
+        return index
+
+    def occurrences(self, name: str) -> Iterator[Tuple[str, int, str]]:
+        """Yield ``(source_file, line_number, usage_context)`` for a variable"""
+        columns = self.variables.get(name)
+        if columns is None:
+            return
+        for file_id, line_num, context_id in zip(
+            columns.files, columns.lines, columns.contexts
+        ):
+            yield self.paths[file_id], line_num, self.contexts[context_id]
+
+    def count(self, name: Optional[str] = None) -> int:
+        """Number of hits of one variable, or of all variables"""
+        if name is not None:
+            columns = self.variables.get(name)
+            return len(columns.lines) if columns else 0
+        return sum(len(columns.lines) for columns in self.variables.values())
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the store, including interned strings"""
+        total = sys.getsizeof(self.variables)
+        for table, ids in (
+            (self.paths, self._path_ids),
+            (self.contexts, self._context_ids),
+        ):
+            total += sys.getsizeof(table) + sys.getsizeof(ids)
+            total += sum(sys.getsizeof(value) for value in table)
+        for columns in self.variables.values():
+            total += sys.getsizeof(columns)
+            total += sum(
+                sys.getsizeof(column)
+                for column in (columns.files, columns.lines, columns.contexts)
+            )
+        return total
+
+
+def git_blob_sha(data: bytes) -> str:
+    """Compute the git blob SHA-1 of file content"""
+    digest = hashlib.sha1(f"blob {len(data)}\0".encode())
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def default_cache_dir() -> Path:
+    """Return the XDG cache directory used for env_finder results"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return Path(base) / "ai-helpers" / "env_finder"
+
+
+class PythonEnvAnalyzer:
+    """Find environment variable reads in a parsed Python module
+
+    Resolves ``os``/``environ``/``getenv`` import aliases, simple aliases such
+    as ``env = os.environ`` and module-level string constants used as keys.
+    Only statements whose lines mention one of those names are descended into,
+    which keeps long setup.py files cheap to analyze.
+    """
+
+    BASE_NAMES = frozenset({"environ", "getenv"})
+
+    def __init__(self, tree: ast.Module, content: str):
+        self.tree = tree
+        self.content = content
+        self.newlines = [m.start() for m in re.finditer("\n", content)]
+        self.os_names = set()
+        self.environ_names = set()
+        self.getenv_names = set()
+        self.constants: Dict[str, str] = {}
+
+    def analyze(self) -> List[tuple]:
+        """Return ``(name, line, column, context, default)`` tuples in source order"""
+        for node in self.tree.body:
+            target, value = self._simple_assignment(node)
+            if target and isinstance(value, ast.Constant):
+                if isinstance(value.value, str):
+                    self.constants[target] = value.value
+
+        nodes = list(self._walk(self.BASE_NAMES))
+        self._collect_bindings(nodes)
+        aliases = (self.environ_names | self.getenv_names) - self.BASE_NAMES
+        if aliases:
+            nodes = list(self._walk(self.BASE_NAMES | aliases))
+
+        found = []
+        for node in nodes:
+            hit = self._match(node)
+            if hit:
+                found.append(hit)
+        found.sort(key=lambda item: (item[1], item[2]))
+        return found
+
+    def _relevant_lines(self, names: Iterable[str]) -> List[int]:
+        pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, names)) + r")\b")
+        lines = {
+            bisect.bisect_left(self.newlines, m.start()) + 1
+            for m in pattern.finditer(self.content)
+        }
+        return sorted(lines)
+
+    def _walk(self, names: Iterable[str]) -> Iterator[ast.AST]:
+        """Yield nodes, skipping statements that never mention ``names``"""
+        relevant = self._relevant_lines(names)
+        stack: List[ast.AST] = [self.tree]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, ast.stmt) and not isinstance(
+                node, (ast.Import, ast.ImportFrom)
+            ):
+                start = node.lineno
+                if getattr(node, "decorator_list", None):
+                    start = min(start, node.decorator_list[0].lineno)
+                index = bisect.bisect_left(relevant, start)
+                if index == len(relevant) or relevant[index] > node.end_lineno:
+                    continue
+            yield node
+            stack.extend(ast.iter_child_nodes(node))
+
+    def _collect_bindings(self, nodes: List[ast.AST]) -> None:
+        assignments = []
+        for node in nodes:
+            if isinstance(node, ast.Assign):
+                assignments.append(node)
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.name == "os" or (
+                        alias.name.startswith("os.") and not alias.asname
+                    ):
+                        self.os_names.add(alias.asname or "os")
+            elif isinstance(node, ast.ImportFrom) and node.module == "os":
+                for alias in node.names:
+                    if alias.name == "environ":
+                        self.environ_names.add(alias.asname or alias.name)
+                    elif alias.name == "getenv":
+                        self.getenv_names.add(alias.asname or alias.name)
+
+        assignments.sort(key=lambda node: node.lineno)
+        for node in assignments:
+            target, value = self._simple_assignment(node)
+            if not target:
+                continue
+            if self._is_environ(value):
+                self.environ_names.add(target)
+            elif self._is_getenv(value):
+                self.getenv_names.add(target)
+
+    @staticmethod
+    def _simple_assignment(node: ast.AST):
+        """Return (name, value) for ``name = value`` statements"""
+        if isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target = node.targets[0]
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            target = node.target
+        else:
+            return None, None
+        if isinstance(target, ast.Name):
+            return target.id, node.value
+        return None, None
+
+    def _is_os_attr(self, node: ast.AST, attr: str) -> bool:
+        return (
+            isinstance(node, ast.Attribute)
+            and node.attr == attr
+            and isinstance(node.value, ast.Name)
+            and node.value.id in self.os_names
+        )
+
+    def _is_environ(self, node: ast.AST) -> bool:
+        if isinstance(node, ast.Name):
+            return node.id in self.environ_names
+        return self._is_os_attr(node, "environ")
+
+    def _is_getenv(self, node: ast.AST) -> bool:
+        if isinstance(node, ast.Name):
+            return node.id in self.getenv_names
+        return self._is_os_attr(node, "getenv")
+
+    def _resolve_str(self, node: ast.AST) -> Optional[str]:
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return node.value
+        if isinstance(node, ast.Name):
+            return self.constants.get(node.id)
+        return None
+
+    def _resolve_default(self, node: Optional[ast.AST]) -> Optional[str]:
+        if node is None:
+            return None
+        if isinstance(node, ast.Constant):
+            return None if node.value is None else str(node.value)
+        return self._resolve_str(node)
+
+    def _match(self, node: ast.AST) -> Optional[tuple]:
+        if isinstance(node, ast.Call):
+            func = node.func
+            if (
+                isinstance(func, ast.Attribute)
+                and func.attr in ("get", "setdefault")
+                and self._is_environ(func.value)
+            ):
+                context = "os.environ.get"
+            elif self._is_getenv(func):
+                context = "os.getenv"
+            else:
+                return None
+            # os.getenv and os.environ.get both name their parameters key, default
+            arguments = list(node.args[:2])
+            arguments += [None] * (2 - len(arguments))
+            for keyword in node.keywords:
+                if keyword.arg == "key":
+                    arguments[0] = keyword.value
+                elif keyword.arg == "default":
+                    arguments[1] = keyword.value
+            if arguments[0] is None:
+                return None
+            name = self._resolve_str(arguments[0])
+            default = self._resolve_default(arguments[1])
+        elif isinstance(node, ast.Subscript) and self._is_environ(node.value):
+            context = "os.environ access"
+            name = self._resolve_str(node.slice)
+            default = None
+        elif (
+            isinstance(node, ast.Compare)
+            and len(node.ops) == 1
+            and isinstance(node.ops[0], (ast.In, ast.NotIn))
+            and self._is_environ(node.comparators[0])
+        ):
+            context = "os.environ access"
+            name = self._resolve_str(node.left)
+            default = None
+        else:
+            return None
+
+        if name is None:
+            return None
+        return (name, node.lineno, node.col_offset, context, default)
+
+
+# CMake: tokens that change lexical state outside quoted arguments, plus
+# $ENV{NAME} references and if(DEFINED ENV{NAME}) checks
+CMAKE_TOKEN_RE = re.compile(
+    r"""
+    (?P<bracket>\#?\[(?P<eq>=*)\[)
+    |(?P<comment>\#)
+    |(?P<quote>")
+    |\bDEFINED\s+ENV\{(?P<defined>[A-Za-z_][A-Za-z0-9_]*)\}
+    |\$ENV\{(?P<name>[A-Za-z_][A-Za-z0-9_]*)\}
+    """,
+    re.VERBOSE,
+)
+CMAKE_QUOTED_RE = re.compile(
+    r'(?P<escape>\\.)|(?P<quote>")|\$ENV\{(?P<name>[A-Za-z_][A-Za-z0-9_]*)\}'
+)
+
+# Make: variable assignments, make references and shell references in recipes.
+# "$$" is consumed as a unit so "$$(cmd)" is never read as a make reference.
+MAKE_ASSIGN_RE = re.compile(
+    r"^\s*(?:(?:export|override)\s+)*([A-Za-z_][A-Za-z0-9_]*)\s*(\?=|:{1,3}=|\+=|!=|=)(.*)$"
+)
+MAKE_REF_RE = re.compile(
+    r"""
+    (?P<quoted>'[^']*')
+    |\$\$(?:\{(?P<braced>[A-Za-z_][A-Za-z0-9_]*)\}|(?P<shell>[A-Za-z_][A-Za-z0-9_]*))?
+    |\$[({](?P<make>[A-Za-z_][A-Za-z0-9_]*)(?=[)}:])
+    """,
+    re.VERBOSE,
+)
+MAKE_ONLY_REF_RE = re.compile(r"\$\$|\$[({]([A-Za-z_][A-Za-z0-9_]*)(?=[)}:])")
+MAKE_COMMENT_RE = re.compile(r"(?<!\\)#")
+
+# Variables make defines itself; references to them are not environment reads
+MAKE_BUILTIN_VARS = {
+    "MAKE",
+    "MAKECMDGOALS",
+    "MAKEFILE_LIST",
+    "MAKELEVEL",
+    "CURDIR",
+    "SHELL",
+}
+
+
+def tokenize_cmake(lines: Iterable[str]) -> List[EnvHit]:
+    """Stream CMake source and return its environment variable references
+
+    Understands line comments, bracket comments and arguments (which are never
+    expanded) and quoted arguments spanning several lines, so references in
+    multi-line ``set()`` calls are found and commented-out ones are not.
+    """
+    hits = []
+    in_quote = False
+    bracket_end = None
+
+    for line_num, line in enumerate(lines, 1):
+        pos = 0
+        while True:
+            if bracket_end:
+                close = line.find(bracket_end, pos)
+                if close < 0:
+                    break
+                pos = close + len(bracket_end)
+                bracket_end = None
+                continue
+
+            pattern = CMAKE_QUOTED_RE if in_quote else CMAKE_TOKEN_RE
+            match = pattern.search(line, pos)
+            if not match:
+                break
+            pos = match.end()
+
+            if match.group("quote"):
+                in_quote = not in_quote
+            elif in_quote:
+                if match.group("name"):
+                    hits.append(
+                        EnvHit(
+                            match.group("name"),
+                            line_num,
+                            "CMake ENV",
+                            None,
+                            line.strip(),
+                        )
+                    )
+            elif match.group("bracket"):
+                bracket_end = "]" + match.group("eq") + "]"
+            elif match.group("comment"):
+                break
+            else:
+                name = match.group("defined") or match.group("name")
+                hits.append(EnvHit(name, line_num, "CMake ENV", None, line.strip()))
+
+    return hits
+
+
+def tokenize_make(lines: Iterable[str]) -> List[EnvHit]:
+    """Stream Makefile source and return its environment variable references
+
+    Handles comments, backslash continuations and recipe lines. ``NAME ?= value``
+    is reported with its default, ``$(NAME)``/``${NAME}`` only when the file
+    does not assign NAME unconditionally (which would override the
+    environment), and ``$$NAME`` in recipes as a shell reference unless it sits
+    inside single quotes.
+    """
+    hits = []
+    refs = []
+    assigned = set()
+    continued = recipe = in_comment = False
+    pending = None  # [name, line_num, value parts, line] of a ?= assignment
+
+    for line_num, raw in enumerate(lines, 1):
+        line = raw.rstrip("\r\n")
+        trailing = len(line) - len(line.rstrip("\\"))
+        continues = trailing % 2 == 1
+        body = line[:-1] if continues else line
+
+        if not continued:
+            recipe = line.startswith("\t")
+            in_comment = False
+        if in_comment:
+            body = ""
+        elif not recipe:
+            comment = MAKE_COMMENT_RE.search(body)
+            if comment:
+                body = body[: comment.start()]
+                in_comment = True
+
+        if not continued and not recipe:
+            assignment = MAKE_ASSIGN_RE.match(body)
+            if assignment:
+                name, operator, value = assignment.groups()
+                if operator == "?=":
+                    pending = [name, line_num, [value.strip()], line.strip()]
+                elif operator != "+=":
+                    assigned.add(name)
+        elif continued and pending is not None and body.strip():
+            pending[2].append(body.strip())
+
+        if "$" in body:
+            for match in MAKE_REF_RE.finditer(body):
+                if match.group("quoted"):
+                    for inner in MAKE_ONLY_REF_RE.finditer(match.group("quoted")):
+                        if inner.group(1):
+                            refs.append((inner.group(1), line_num, line))
+                elif match.group("make"):
+                    refs.append((match.group("make"), line_num, line))
+                elif recipe and (match.group("shell") or match.group("braced")):
+                    name = match.group("shell") or match.group("braced")
+                    hits.append(
+                        EnvHit(
+                            name,
+                            line_num,
+                            "Shell variable reference",
+                            None,
+                            line.strip(),
+                        )
+                    )
+
+        if not continues and pending is not None:
+            name, start, parts, first_line = pending
+            default = " ".join(part for part in parts if part) or None
+            hits.append(
+                EnvHit(name, start, "Make conditional assignment", default, first_line)
+            )
+            pending = None
+        continued = continues
+
+    for name, line_num, line in refs:
+        if name not in assigned and name not in MAKE_BUILTIN_VARS:
+            hits.append(
+                EnvHit(name, line_num, "Make variable reference", None, line.strip())
+            )
+
+    hits.sort(key=lambda hit: hit.line_number)
+    return hits
+
+
+# C/C++: getenv-style calls with a literal name. Comments and other string
+# literals are matched as alternatives so their contents are skipped.
+C_GETENV_RE = re.compile(
+    r"""
+    //[^\n]*
+    |/\*.*?\*/
+    |\b(?:std::)?(?:getenv|secure_getenv|_wgetenv|getenv_s)\s*\(
+        [^"()]*?L?"(?P<name>[A-Za-z_][A-Za-z0-9_]*)"
+    |"(?:\\.|[^"\\\n])*"
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# Shell: ${NAME:-default} style expansions, plain references and assignments
+SHELL_REF_RE = re.compile(
+    r"""
+    (?P<quoted>'[^']*')
+    |\$\{(?P<dname>[A-Za-z_][A-Za-z0-9_]*)(?P<op>:?[-=?+])(?P<default>[^}]*)\}
+    |\$\{(?P<braced>[A-Za-z_][A-Za-z0-9_]*)\}
+    |\$(?P<name>[A-Za-z_][A-Za-z0-9_]*)
+    """,
+    re.VERBOSE,
+)
+SHELL_ASSIGN_RE = re.compile(
+    r"(?:^\s*|[;&|({]\s*"
+    r"|\b(?:then|do|else|export|local|readonly|declare(?:\s+-\w+)*)\s+)"
+    r"([A-Za-z_][A-Za-z0-9_]*)(?:\+?=|\s*$)"
+    r"|\b(?:for|read(?:\s+-\w+)*)\s+([A-Za-z_][A-Za-z0-9_]*)"
+)
+SHELL_COMMENT_RE = re.compile(r"(?:^|\s)#.*$")
+
+# Variables the shell sets itself; references to them are not environment reads
+SHELL_BUILTIN_VARS = {
+    "BASH_SOURCE",
+    "BASH_VERSION",
+    "EUID",
+    "FUNCNAME",
+    "IFS",
+    "LINENO",
+    "OLDPWD",
+    "OPTARG",
+    "OPTIND",
+    "PIPESTATUS",
+    "PPID",
+    "PWD",
+    "RANDOM",
+    "SECONDS",
+    "UID",
+}
+
+# Bazel/Starlark: repository_ctx.os.environ, getenv and --*_env flags
+BAZEL_ENV_RE = re.compile(
+    r"""
+    \.environ(?:\.get)?\s*[\[(]\s*"(?P<environ>[A-Za-z_][A-Za-z0-9_]*)"
+        (?:\s*,\s*"(?P<environ_default>[^"]*)")?
+    |\.getenv\(\s*"(?P<getenv>[A-Za-z_][A-Za-z0-9_]*)"
+        (?:\s*,\s*"(?P<getenv_default>[^"]*)")?
+    |--(?:host_)?(?:action|repo|test)_env[=\s](?P<flag>[A-Za-z_][A-Za-z0-9_]*)
+        (?:=(?P<flag_default>\S*))?
+    |\benviron\s*=\s*\[(?P<rule_environ>[^\]]*)\]
+    """,
+    re.VERBOSE,
+)
+
+
+def _line_numbers(text: str):
+    """Return a function mapping a text offset to its 1-based line number"""
+    newlines = [m.start() for m in re.finditer("\n", text)]
+
+    def line_of(offset: int) -> int:
+        return bisect.bisect_left(newlines, offset) + 1
+
+    return line_of
+
+
+def scan_c_source(lines: Iterable[str]) -> List[EnvHit]:
+    """Return ``getenv("NAME")`` style reads in C/C++ source"""
+    text = "".join(lines)
+    if "getenv" not in text:
+        return []
+    line_of = _line_numbers(text)
+    source_lines = text.split("\n")
+    hits = []
+    for match in C_GETENV_RE.finditer(text):
+        if match.group("name"):
+            line_num = line_of(match.start())
+            hits.append(
+                EnvHit(
+                    match.group("name"),
+                    line_num,
+                    "C getenv",
+                    None,
+                    source_lines[line_num - 1].strip(),
+                )
+            )
+    return hits
+
+
+def tokenize_shell(lines: Iterable[str]) -> List[EnvHit]:
+    """Stream a shell script and return its environment variable reads
+
+    ``${NAME:-default}`` expansions are reported with their default. Plain
+    ``$NAME`` references count only when the script never assigns NAME.
+    Comments and single-quoted strings are skipped.
+    """
+    hits = []
+    refs = []
+    assigned = set()
+    for line_num, raw in enumerate(lines, 1):
+        line = raw.rstrip("\r\n")
+        if line_num == 1 and line.startswith("#!"):
+            continue
+        body = SHELL_COMMENT_RE.sub("", line)
+        for match in SHELL_ASSIGN_RE.finditer(body):
+            assigned.add(match.group(1) or match.group(2))
+        if "$" not in body:
+            continue
+        for match in SHELL_REF_RE.finditer(body):
+            if match.group("dname"):
+                hits.append(
+                    EnvHit(
+                        match.group("dname"),
+                        line_num,
+                        "Shell default expansion",
+                        match.group("default") or None,
+                        line.strip(),
+                    )
+                )
+            elif match.group("braced") or match.group("name"):
+                name = match.group("braced") or match.group("name")
+                refs.append(
+                    EnvHit(
+                        name, line_num, "Shell variable reference", None, line.strip()
+                    )
+                )
+
+    hits.extend(
+        ref
+        for ref in refs
+        if ref.name not in assigned and ref.name not in SHELL_BUILTIN_VARS
+    )
+    hits.sort(key=lambda hit: hit.line_number)
+    return hits
+
+
+def scan_bazel(lines: Iterable[str]) -> List[EnvHit]:
+    """Return environment reads in Bazel/Starlark files and .bazelrc"""
+    text = "".join(lines)
+    line_of = _line_numbers(text)
+    source_lines = text.split("\n")
+    hits = []
+    for match in BAZEL_ENV_RE.finditer(text):
+        if match.group("rule_environ") is not None:
+            # repository_rule(environ = [...]) lists the variables it reads
+            for name in re.finditer(r'"([A-Za-z_][A-Za-z0-9_]*)"', match.group(0)):
+                line_num = line_of(match.start() + name.start())
+                hits.append(
+                    EnvHit(
+                        name.group(1),
+                        line_num,
+                        "Bazel repository_rule environ",
+                        None,
+                        source_lines[line_num - 1].strip(),
+                    )
+                )
+            continue
+        for group, context in (
+            ("environ", "Bazel os.environ"),
+            ("getenv", "Bazel getenv"),
+            ("flag", "Bazel --*_env flag"),
+        ):
+            if match.group(group):
+                line_num = line_of(match.start())
+                hits.append(
+                    EnvHit(
+                        match.group(group),
+                        line_num,
+                        context,
+                        match.group(f"{group}_default") or None,
+                        source_lines[line_num - 1].strip(),
+                    )
+                )
+    return hits
+
+
+class FileScan(NamedTuple):
+    """Outcome of reading and scanning one file
+
+    ``hits`` is None when the content matched the known blob hash and a
+    cached result can be reused. ``blob_sha`` is None when the result must
+    not be cached. ``note`` records why a file was skipped or truncated.
+    """
+
+    hits: Optional[List[EnvHit]]
+    blob_sha: Optional[str]
+    note: Optional[str] = None
+
+
+# Investigator used by parallel scan workers, created once per process
+_worker_investigator = None
+
+
+def _init_scan_worker(project_path: str, options: Dict[str, object]) -> None:
+    global _worker_investigator
+    options = dict(options)
+    database_path = options.pop("database_path", None)
+    if database_path:
+        options["database"] = VariableDatabase(Path(database_path), read_only=True)
+    _worker_investigator = EnvironmentVariableInvestigator(project_path, **options)
+
+
+def _scan_in_worker(task: Tuple[str, Optional[str], bool]) -> FileScan:
+    rel_path, known_blob, want_blob = task
+    try:
+        return _worker_investigator.read_and_scan(rel_path, known_blob, want_blob)
+    except OSError as e:
+        print(f"Warning: Could not read {rel_path}: {e}", file=sys.stderr)
+        return FileScan([], None, "unreadable")
+
+
+class GitObjectReader:
+    """Read objects through one long-lived ``git cat-file --batch`` process"""
+
+    def __init__(self, repo_path: Path):
+        self.process = subprocess.Popen(
+            ["git", "-C", str(repo_path), "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def read(self, object_name: str) -> Optional[bytes]:
+        """Return the content of an object, or None if it does not exist"""
+        self.process.stdin.write(object_name.encode() + b"\n")
+        self.process.stdin.flush()
+        header = self.process.stdout.readline().split()
+        if len(header) != 3:
+            return None
+        data = self.process.stdout.read(int(header[2]))
+        self.process.stdout.read(1)  # trailing newline
+        return data
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        self.process.wait()
+
+    def __enter__(self) -> "GitObjectReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def parse_revisions(rev_range: Optional[str], revs: Optional[List[str]]) -> List[str]:
+    """Turn ``--rev A..B`` or ``--revs A B ...`` into a list of revisions"""
+    if rev_range:
+        old, sep, new = rev_range.partition("..")
+        if not sep or not old or not new:
+            raise ValueError(f"Invalid revision range '{rev_range}', expected A..B")
+        return [old, new.lstrip(".")]
+    if revs and len(revs) < 2:
+        raise ValueError("--revs needs at least two revisions")
+    return list(revs or [])
+
+
+def compare_variables(
+    old: Dict[str, EnvVariable], new: Dict[str, EnvVariable]
+) -> Dict[str, Dict[str, object]]:
+    """Return the added, removed and changed variables between two scans"""
+    changed = {}
+    for name in sorted(old.keys() & new.keys()):
+        before, after = old[name], new[name]
+        if (before.default_value, before.var_type) != (
+            after.default_value,
+            after.var_type,
+        ):
+            changed[name] = (before, after)
+    return {
+        "added": {name: new[name] for name in sorted(new.keys() - old.keys())},
+        "removed": {name: old[name] for name in sorted(old.keys() - new.keys())},
+        "changed": changed,
+    }
+
+
+class ScanCache:
+    """Per-repository cache of extracted variables, one entry per build file
+
+    Entries are keyed by path relative to the project and validated by size
+    and mtime. When only the mtime changed (e.g. after a checkout) the git
+    blob hash of the content decides whether the cached hits still apply.
+    """
+
+    def __init__(self, cache_file: Path):
+        self.cache_file = cache_file
+        self.entries: Dict[str, dict] = {}
+        self.files_reused = 0
+        self.files_analyzed = 0
+        self._seen: set = set()
+        self._load()
+
+    @classmethod
+    def for_project(
+        cls, project_path: Path, cache_dir: Optional[Path] = None, variant: str = ""
+    ) -> "ScanCache":
+        """Open the cache file belonging to a project (and scan variant)"""
+        key = hashlib.sha256(str(project_path).encode()).hexdigest()[:16]
+        directory = cache_dir or default_cache_dir()
+        suffix = f"-{variant}" if variant else ""
+        return cls(directory / f"{project_path.name}-{key}{suffix}.json")
+
+    def _load(self) -> None:
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(
+                f"Warning: Ignoring unreadable cache {self.cache_file}: {e}",
+                file=sys.stderr,
+            )
+            return
+        if data.get("version") == CACHE_VERSION:
+            self.entries = data.get("files", {})
+
+    def lookup(self, rel_path: str, stat: os.stat_result) -> Optional[List[EnvHit]]:
+        """Return cached hits if size and mtime are unchanged"""
+        entry = self.entries.get(rel_path)
+        if (
+            entry
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return self._reuse(rel_path, entry)
+        return None
+
+    def entry_blob(self, rel_path: str) -> Optional[str]:
+        """Return the blob hash recorded for a file, if any"""
+        entry = self.entries.get(rel_path)
+        return entry["blob"] if entry and entry["blob"] else None
+
+    def lookup_blob(
+        self, rel_path: str, stat: os.stat_result, blob_sha: str
+    ) -> Optional[List[EnvHit]]:
+        """Return cached hits if the content hash is unchanged"""
+        entry = self.entries.get(rel_path)
+        if entry and entry["blob"] == blob_sha:
+            entry["size"] = stat.st_size
+            entry["mtime_ns"] = stat.st_mtime_ns
+            return self._reuse(rel_path, entry)
+        return None
+
+    def _reuse(self, rel_path: str, entry: dict) -> List[EnvHit]:
+        self._seen.add(rel_path)
+        self.files_reused += 1
+        return [EnvHit(*hit) for hit in entry["hits"]]
+
+    def store(
+        self,
+        rel_path: str,
+        stat: os.stat_result,
+        blob_sha: str,
+        hits: List[EnvHit],
+    ) -> None:
+        """Record freshly extracted hits for a file"""
+        self._seen.add(rel_path)
+        self.files_analyzed += 1
+        self.entries[rel_path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "blob": blob_sha,
+            "hits": [list(hit) for hit in hits],
+        }
+
+    def save(self) -> None:
+        """Write the cache, dropping entries for files not seen in this run"""
+        files = {path: self.entries[path] for path in sorted(self._seen)}
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix(".tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "files": files}, f)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            print(
+                f"Warning: Could not write cache {self.cache_file}: {e}",
+                file=sys.stderr,
+            )
+
+
+class VariableDatabase:
+    """SQLite store of scan results across projects and revisions
+
+    Per-file hits are keyed by git blob hash and analyzer, so identical files
+    (vendored pybind11, shared CMake modules) are analyzed only once across
+    all projects. Discovered variables are indexed by name to answer
+    questions like "which projects read CUDA_HOME".
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS projects (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS revisions (
+            id INTEGER PRIMARY KEY,
+            project_id INTEGER NOT NULL REFERENCES projects(id),
+            revision TEXT NOT NULL,
+            commit_sha TEXT,
+            scanned_at REAL NOT NULL,
+            incomplete TEXT,
+            UNIQUE (project_id, revision)
+        );
+        CREATE TABLE IF NOT EXISTS files (
+            revision_id INTEGER NOT NULL REFERENCES revisions(id),
+            path TEXT NOT NULL,
+            blob_sha TEXT NOT NULL,
+            PRIMARY KEY (revision_id, path)
+        );
+        CREATE TABLE IF NOT EXISTS blob_hits (
+            blob_sha TEXT NOT NULL,
+            analyzer TEXT NOT NULL,
+            hits TEXT NOT NULL,
+            PRIMARY KEY (blob_sha, analyzer)
+        );
+        CREATE TABLE IF NOT EXISTS variables (
+            revision_id INTEGER NOT NULL REFERENCES revisions(id),
+            name TEXT NOT NULL,
+            description TEXT,
+            var_type TEXT,
+            default_value TEXT,
+            source_file TEXT,
+            line_number INTEGER,
+            usage_context TEXT,
+            PRIMARY KEY (revision_id, name)
+        );
+        CREATE INDEX IF NOT EXISTS variables_by_name ON variables (name);
+        CREATE INDEX IF NOT EXISTS files_by_blob ON files (blob_sha);
+    """
+
+    def __init__(self, db_path: Path, read_only: bool = False):
+        self.db_path = db_path
+        self.blobs_stored = 0
+        if read_only:
+            # Parallel scan workers only look up blobs in the database that
+            # the main process has already created
+            self.conn = sqlite3.connect(
+                f"{db_path.resolve().as_uri()}?mode=ro", uri=True, timeout=60
+            )
+            return
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path), timeout=60)
+        # WAL lets the read-only scan workers read while this connection writes
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def lookup_blob(self, blob_sha: str, analyzer: str) -> Optional[List[EnvHit]]:
+        """Return hits stored for a blob by any earlier scan, if present"""
+        row = self.conn.execute(
+            "SELECT hits FROM blob_hits WHERE blob_sha = ? AND analyzer = ?",
+            (blob_sha, analyzer),
+        ).fetchone()
+        if row is None:
+            return None
+        return [EnvHit(*hit) for hit in json.loads(row[0])]
+
+    def store_blob(self, blob_sha: str, analyzer: str, hits: List[EnvHit]) -> None:
+        """Record the hits extracted from a blob"""
+        self.blobs_stored += 1
+        self.conn.execute(
+            "INSERT OR REPLACE INTO blob_hits (blob_sha, analyzer, hits) "
+            "VALUES (?, ?, ?)",
+            (blob_sha, analyzer, json.dumps([list(hit) for hit in hits])),
+        )
+
+    def record_scan(
+        self,
+        project_path: Path,
+        revision: str,
+        commit_sha: Optional[str],
+        variables: Dict[str, EnvVariable],
+        file_blobs: Dict[str, str],
+        incomplete: List[str],
+    ) -> None:
+        """Replace the stored results of one project revision"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO projects (path, name) VALUES (?, ?)",
+                (str(project_path), project_path.name),
+            )
+            (project_id,) = self.conn.execute(
+                "SELECT id FROM projects WHERE path = ?", (str(project_path),)
+            ).fetchone()
+            row = self.conn.execute(
+                "SELECT id FROM revisions WHERE project_id = ? AND revision = ?",
+                (project_id, revision),
+            ).fetchone()
+            if row:
+                self.conn.execute("DELETE FROM files WHERE revision_id = ?", row)
+                self.conn.execute("DELETE FROM variables WHERE revision_id = ?", row)
+                self.conn.execute("DELETE FROM revisions WHERE id = ?", row)
+            revision_id = self.conn.execute(
+                "INSERT INTO revisions "
+                "(project_id, revision, commit_sha, scanned_at, incomplete) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    project_id,
+                    revision,
+                    commit_sha,
+                    time.time(),
+                    json.dumps(incomplete) if incomplete else None,
+                ),
+            ).lastrowid
+            self.conn.executemany(
+                "INSERT INTO files (revision_id, path, blob_sha) VALUES (?, ?, ?)",
+                [(revision_id, path, sha) for path, sha in sorted(file_blobs.items())],
+            )
+            self.conn.executemany(
+                "INSERT INTO variables (revision_id, name, description, var_type, "
+                "default_value, source_file, line_number, usage_context) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        revision_id,
+                        var.name,
+                        var.description,
+                        var.var_type,
+                        var.default_value,
+                        var.source_file,
+                        var.line_number,
+                        var.usage_context,
+                    )
+                    for var in variables.values()
+                ],
+            )
+
+    def query(self, names: List[str]) -> List[Dict[str, object]]:
+        """Find stored variables by name; ``*`` and ``?`` act as wildcards"""
+        clause = " OR ".join("v.name GLOB ?" for _ in names)
+        cursor = self.conn.execute(
+            "SELECT v.name, p.name, p.path, r.revision, r.commit_sha, "
+            "v.source_file, v.line_number, v.usage_context, v.default_value "
+            "FROM variables v "
+            "JOIN revisions r ON r.id = v.revision_id "
+            "JOIN projects p ON p.id = r.project_id "
+            f"WHERE {clause} ORDER BY v.name, p.name, r.scanned_at",
+            names,
+        )
+        keys = [
+            "name",
+            "project",
+            "project_path",
+            "revision",
+            "commit",
+            "source_file",
+            "line_number",
+            "usage_context",
+            "default_value",
+        ]
+        return [dict(zip(keys, row)) for row in cursor]
+
+    def close(self) -> None:
+        """Commit pending blob results and close the connection"""
+        self.conn.commit()
+        self.conn.close()
+
+
 class EnvironmentVariableInvestigator:
     """Main class for investigating environment variables in Python projects"""
 
-    def __init__(self, project_path: str):
+    def __init__(
+        self,
+        project_path: str,
+        exclude_dirs: Optional[Iterable[str]] = None,
+        use_git_index: bool = False,
+        cache: Optional[ScanCache] = None,
+        mmap_threshold: Optional[int] = MMAP_THRESHOLD,
+        use_ast: bool = True,
+        use_tokenizers: bool = True,
+        max_bytes_per_file: Optional[int] = None,
+        deadline: Optional[float] = None,
+        sweep: bool = False,
+        max_file_size: Optional[int] = SWEEP_MAX_FILE_SIZE,
+        database: Optional[VariableDatabase] = None,
+        all_occurrences: bool = False,
+    ):
         self.project_path = Path(project_path).resolve()
         self.variables: Dict[str, EnvVariable] = {}
+        self.exclude_dirs = set(
+            DEFAULT_EXCLUDE_DIRS if exclude_dirs is None else exclude_dirs
+        )
+        self.use_git_index = use_git_index
+        self.cache = cache
+        self.mmap_threshold = mmap_threshold
+        self.use_ast = use_ast
+        self.use_tokenizers = use_tokenizers
+        self.max_bytes_per_file = max_bytes_per_file
+        # time.monotonic() value after which discovery stops early
+        self.deadline = deadline
+        self.sweep = sweep
+        self.max_file_size = max_file_size
+        self.database = database
+        # Every hit of every variable, not just the first one
+        self.occurrences = OccurrenceStore() if all_occurrences else None
+        # Blob hash of every analyzed file whose content was hashed
+        self.file_blobs: Dict[str, str] = {}
+        # Files skipped or truncated, by FileScan note
+        self.file_notes: Counter = Counter()
+        self.incomplete_reasons: List[str] = []
+        # Called with each variable the first time it is discovered
+        self.on_new_variable: Optional[Callable[[EnvVariable], None]] = None
+        self._ast_cache: Dict[str, ast.Module] = {}
+
+        # Exact names are matched with a set lookup, globs with one combined regex
+        self._root_names = {name: rank for rank, name in enumerate(ROOT_BUILD_FILES)}
+        rank_offset = len(ROOT_BUILD_FILES)
+        self._recursive_names: Dict[str, int] = {}
+        recursive_globs = []
+        for rank, pattern in enumerate(RECURSIVE_BUILD_PATTERNS, rank_offset):
+            if any(ch in pattern for ch in "*?["):
+                recursive_globs.append((rank, pattern))
+            else:
+                self._recursive_names[pattern] = rank
+        self._recursive_glob_ranks = [rank for rank, _ in recursive_globs]
+        self._sweep_rank = rank_offset + len(RECURSIVE_BUILD_PATTERNS)
+        self._recursive_glob_re = (
+            re.compile(
+                "|".join(
+                    f"(?P<g{i}>{fnmatch.translate(pattern)})"
+                    for i, (_, pattern) in enumerate(recursive_globs)
+                )
+            )
+            if recursive_globs
+            else None
+        )
 
         # Common environment variable patterns
         self.env_patterns = [
@@ -64,6 +1265,20 @@ class EnvironmentVariableInvestigator:
             ),
         ]
 
+        # Byte variants of env_patterns for whole-buffer scanning. Whitespace and
+        # negated classes are kept from crossing newlines so every match stays
+        # within one line, exactly as in the per-line scan.
+        self._buffer_patterns = [
+            (
+                re.compile(
+                    pattern.replace(r"\s", r"[^\S\n]").replace("[^", "[^\n").encode(),
+                    re.MULTILINE,
+                ),
+                context,
+            )
+            for pattern, context in self.env_patterns
+        ]
+
         # Known environment variables with descriptions
         self.known_vars = {
             "CC": "C compiler command",
@@ -91,49 +1306,554 @@ class EnvironmentVariableInvestigator:
         return git_dir.exists() and (git_dir.is_dir() or git_dir.is_file())
 
     def find_build_files(self) -> List[Path]:
-        """Find all potential build configuration files"""
-        build_patterns = [
-            "setup.py",
-            "setup.cfg",
-            "pyproject.toml",
-            "CMakeLists.txt",
-            "**/CMakeLists.txt",
-            "configure.ac",
-            "configure.in",
-            "Makefile",
-            "makefile",
-            "*.mk",
-            "build.py",
-            "conda.yaml",
-            "environment.yml",
-        ]
+        """Find all potential build configuration files
+
+        Root-level build files and recursive patterns are matched together in a
+        single walk. Directories listed in ``exclude_dirs`` are pruned. With
+        ``use_git_index`` the tracked files from ``git ls-files`` are matched
+        instead, falling back to the directory walk if git is unavailable.
+        """
+        candidates = None
+        if self.use_git_index:
+            candidates = self._list_git_files()
+        if candidates is None:
+            candidates = self._walk_files()
+
+        ranked = []
+        for rel_path in candidates:
+            rank = self._match_build_file(rel_path)
+            if rank is not None:
+                ranked.append((rank, rel_path))
+
+        # Keep the historical ordering: root files by pattern order, then
+        # recursive matches grouped by pattern
+        ranked.sort()
+        return [self.project_path / rel_path for _, rel_path in ranked]
+
+    def _match_build_file(self, rel_path: str) -> Optional[int]:
+        """Return the pattern rank for a POSIX relative path, or None"""
+        directory, _, name = rel_path.rpartition("/")
+        if not directory and name in self._root_names:
+            return self._root_names[name]
+        if name in self._recursive_names:
+            return self._recursive_names[name]
+        if self._recursive_glob_re is not None:
+            match = self._recursive_glob_re.match(name)
+            if match:
+                return self._recursive_glob_ranks[int(match.lastgroup[1:])]
+        if self.sweep and self._source_language(name):
+            return self._sweep_rank
+        return None
+
+    @staticmethod
+    def _source_language(name: str) -> Optional[str]:
+        """Return the sweep language of a file name, or None"""
+        if name in SWEEP_NAMES:
+            return SWEEP_NAMES[name]
+        return SWEEP_SUFFIXES.get(os.path.splitext(name)[1])
+
+    def _walk_files(self) -> Iterator[str]:
+        """Yield POSIX relative paths of files below the project, pruning excludes"""
+        stack = [("", str(self.project_path))]
+        while stack:
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                self.incomplete_reasons.append("timeout during file discovery")
+                return
+            rel_dir, abs_dir = stack.pop()
+            try:
+                with os.scandir(abs_dir) as entries:
+                    for entry in entries:
+                        rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if entry.name not in self.exclude_dirs:
+                                    stack.append((rel_path, entry.path))
+                            elif entry.is_file():
+                                yield rel_path
+                        except OSError:
+                            continue
+            except OSError as e:
+                print(f"Warning: Could not list {abs_dir}: {e}", file=sys.stderr)
+
+    def _list_git_files(self) -> Optional[List[str]]:
+        """List tracked files via ``git ls-files -z``, or None if git fails"""
+        try:
+            result = subprocess.run(
+                ["git", "-C", str(self.project_path), "ls-files", "-z"],
+                capture_output=True,
+                check=True,
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(
+                f"Warning: git ls-files failed, walking the tree instead: {e}",
+                file=sys.stderr,
+            )
+            return None
 
         files = []
-        for pattern in build_patterns:
-            if "*" in pattern:
-                files.extend(self.project_path.glob(f"**/{pattern}"))
-            else:
-                file_path = self.project_path / pattern
-                if file_path.exists():
-                    files.append(file_path)
-
+        for raw in result.stdout.split(b"\0"):
+            if not raw:
+                continue
+            rel_path = os.fsdecode(raw)
+            if not self._is_excluded(rel_path):
+                files.append(rel_path)
         return files
 
+    def _is_excluded(self, rel_path: str) -> bool:
+        """Check whether any parent directory of a relative path is excluded"""
+        return any(part in self.exclude_dirs for part in rel_path.split("/")[:-1])
+
+    def list_revision_files(self, rev: str) -> List[Tuple[str, str]]:
+        """List ``(path, blob_sha)`` of build files at a git revision"""
+        result = subprocess.run(
+            ["git", "-C", str(self.project_path), "ls-tree", "-r", "-z", rev],
+            capture_output=True,
+            check=True,
+        )
+        ranked = []
+        for raw in result.stdout.split(b"\0"):
+            if not raw:
+                continue
+            meta, _, raw_path = raw.partition(b"\t")
+            _, obj_type, blob_sha = meta.decode().split()
+            rel_path = os.fsdecode(raw_path)
+            if obj_type != "blob" or self._is_excluded(rel_path):
+                continue
+            rank = self._match_build_file(rel_path)
+            if rank is not None:
+                ranked.append((rank, rel_path, blob_sha))
+        ranked.sort()
+        return [(rel_path, blob_sha) for _, rel_path, blob_sha in ranked]
+
+    def analyze_revision(
+        self,
+        reader: GitObjectReader,
+        rev: str,
+        blob_hits: Dict[Tuple[str, str], List[EnvHit]],
+    ) -> Dict[str, EnvVariable]:
+        """Analyze the build files of a revision straight from the object store
+
+        ``blob_hits`` maps ``(blob_sha, file name)`` to extracted hits and is
+        shared across revisions, so unchanged files are analyzed only once.
+        """
+        self.variables = {}
+        self.file_blobs = {}
+        if self.occurrences is not None:
+            self.occurrences = OccurrenceStore()
+        for rel_path, blob_sha in self.list_revision_files(rev):
+            self.file_blobs[rel_path] = blob_sha
+            key = (blob_sha, rel_path.rpartition("/")[2])
+            hits = blob_hits.get(key)
+            if hits is None and self.database:
+                hits = self.database.lookup_blob(blob_sha, self.analyzer_key(rel_path))
+                if hits is not None:
+                    self.file_notes["reused"] += 1
+                    blob_hits[key] = hits
+            if hits is None:
+                data = reader.read(blob_sha)
+                if data is None:
+                    print(f"Warning: Could not read {rev}:{rel_path}", file=sys.stderr)
+                    continue
+                if self.sweep and (
+                    (self.max_file_size is not None and len(data) > self.max_file_size)
+                    or b"\0" in data[:SNIFF_BYTES]
+                ):
+                    blob_hits[key] = []
+                    continue
+                use_buffer = (
+                    self.mmap_threshold is not None
+                    and len(data) > 0
+                    and len(data) >= self.mmap_threshold
+                )
+                hits = self.scan_file_data(rel_path, data, use_buffer)
+                blob_hits[key] = hits
+                if self.database:
+                    self.database.store_blob(
+                        blob_sha, self.analyzer_key(rel_path), hits
+                    )
+            self.apply_hits(self.project_path / rel_path, hits)
+        return self.variables
+
+    def analyze_files(
+        self,
+        files: List[Path],
+        jobs: int = 1,
+        progress: Optional[Callable[[Path], None]] = None,
+    ) -> None:
+        """Analyze build files in order, in parallel worker processes if jobs > 1
+
+        Results are always merged in the given order, so the report is the
+        same as a serial run. Stops early once the deadline has passed.
+        """
+        if jobs > 1 and len(files) > 1:
+            self._analyze_files_parallel(files, jobs, progress)
+            return
+        for index, file_path in enumerate(files):
+            if self._deadline_passed():
+                self._note_timeout(index, len(files))
+                return
+            if progress:
+                progress(file_path)
+            self.analyze_file(file_path)
+
+    def _analyze_files_parallel(
+        self,
+        files: List[Path],
+        jobs: int,
+        progress: Optional[Callable[[Path], None]],
+    ) -> None:
+        # Cache hits are resolved here; only the misses go to the workers
+        entries = []
+        tasks = []
+        for file_path in files:
+            rel_path = file_path.relative_to(self.project_path).as_posix()
+            try:
+                stat = file_path.stat()
+            except OSError as e:
+                print(f"Warning: Could not read {file_path}: {e}", file=sys.stderr)
+                continue
+            hits = self._lookup_cache(rel_path, stat)
+            entries.append((file_path, rel_path, stat, hits))
+            if hits is None:
+                known_blob = self.cache.entry_blob(rel_path) if self.cache else None
+                tasks.append((rel_path, known_blob, self._wants_blob()))
+
+        options = {
+            "mmap_threshold": self.mmap_threshold,
+            "use_ast": self.use_ast,
+            "use_tokenizers": self.use_tokenizers,
+            "max_bytes_per_file": self.max_bytes_per_file,
+            "sweep": self.sweep,
+            "max_file_size": self.max_file_size,
+            "database_path": str(self.database.db_path) if self.database else None,
+        }
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_scan_worker,
+            initargs=(str(self.project_path), options),
+        )
+        try:
+            chunksize = max(1, min(64, len(tasks) // (jobs * 4)))
+            results = executor.map(_scan_in_worker, tasks, chunksize=chunksize)
+            for index, (file_path, rel_path, stat, hits) in enumerate(entries):
+                if self._deadline_passed():
+                    self._note_timeout(index, len(entries))
+                    break
+                if progress:
+                    progress(file_path)
+                if hits is None:
+                    hits = self._finish_scan(rel_path, stat, next(results))
+                self.apply_hits(file_path, hits)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _deadline_passed(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def _note_timeout(self, done: int, total: int) -> None:
+        self.incomplete_reasons.append(f"timeout ({done} of {total} files analyzed)")
+
     def analyze_file(self, file_path: Path) -> None:
         """Analyze a single file for environment variables"""
+        rel_path = file_path.relative_to(self.project_path).as_posix()
         try:
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
+            stat = file_path.stat()
+            hits = self._lookup_cache(rel_path, stat)
+            if hits is None:
+                known_blob = self.cache.entry_blob(rel_path) if self.cache else None
+                scan = self.read_and_scan(rel_path, known_blob, self._wants_blob())
+                hits = self._finish_scan(rel_path, stat, scan)
+        except (IOError, UnicodeDecodeError) as e:
+            print(f"Warning: Could not read {file_path}: {e}", file=sys.stderr)
+            return
+
+        self.apply_hits(file_path, hits)
+
+    def _lookup_cache(
+        self, rel_path: str, stat: os.stat_result
+    ) -> Optional[List[EnvHit]]:
+        """Return hits from the per-repo cache if the file is unchanged"""
+        if not self.cache:
+            return None
+        # Entries stored under a larger --max-file-size must not bypass the skip
+        if self._exceeds_file_size(stat.st_size):
+            return None
+        hits = self.cache.lookup(rel_path, stat)
+        if hits is not None and self.cache.entry_blob(rel_path):
+            self.file_blobs[rel_path] = self.cache.entry_blob(rel_path)
+        return hits
+
+    def _wants_blob(self) -> bool:
+        return self.cache is not None or self.database is not None
+
+    def _finish_scan(
+        self, rel_path: str, stat: os.stat_result, scan: FileScan
+    ) -> List[EnvHit]:
+        """Record a FileScan in the cache and database and return its hits"""
+        if scan.note:
+            self.file_notes[scan.note] += 1
+        if scan.blob_sha:
+            self.file_blobs[rel_path] = scan.blob_sha
+        if scan.hits is None:
+            return self.cache.lookup_blob(rel_path, stat, scan.blob_sha)
+        if self.cache and scan.blob_sha is not None:
+            self.cache.store(rel_path, stat, scan.blob_sha, scan.hits)
+        if self.database and scan.blob_sha and scan.note != "reused":
+            self.database.store_blob(
+                scan.blob_sha, self.analyzer_key(rel_path), scan.hits
+            )
+        return scan.hits
+
+    def read_and_scan(
+        self, rel_path: str, known_blob: Optional[str] = None, want_blob: bool = False
+    ) -> FileScan:
+        """Read one file and extract its hits without consulting the cache
+
+        In sweep mode files above ``max_file_size`` and binary files are
+        skipped and never marked cacheable. Files above ``max_bytes_per_file`` are scanned partially and
+        never marked cacheable. Raises OSError if the file cannot be read.
+        """
+        with open(self.project_path / rel_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if self.sweep:
+                if self._exceeds_file_size(size):
+                    return FileScan([], None, "oversized")
+                if b"\0" in f.read(SNIFF_BYTES):
+                    return FileScan([], None, "binary")
+                f.seek(0)
+
+            if self._exceeds_byte_budget(size):
+                data = f.read(self.max_bytes_per_file)
+                return FileScan(self.scan_file_data(rel_path, data), None, "truncated")
+
+            if (
+                self.mmap_threshold is not None
+                and 0 < size
+                and size >= self.mmap_threshold
+            ):
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                    return self._scan_blob(rel_path, buf, True, known_blob, want_blob)
+            return self._scan_blob(rel_path, f.read(), False, known_blob, want_blob)
 
-            lines = content.split("\n")
+    def _exceeds_file_size(self, size: int) -> bool:
+        return (
+            self.sweep and self.max_file_size is not None and size > self.max_file_size
+        )
 
-            for line_num, line in enumerate(lines, 1):
-                self._analyze_line(line, file_path, line_num)
+    def _exceeds_byte_budget(self, size: int) -> bool:
+        return self.max_bytes_per_file is not None and size > self.max_bytes_per_file
 
-        except (IOError, UnicodeDecodeError) as e:
-            print(f"Warning: Could not read {file_path}: {e}", file=sys.stderr)
+    def _scan_blob(
+        self,
+        rel_path: str,
+        data,
+        use_buffer: bool,
+        known_blob: Optional[str],
+        want_blob: bool,
+    ) -> FileScan:
+        blob_sha = git_blob_sha(data) if want_blob else None
+        if known_blob and blob_sha == known_blob:
+            return FileScan(None, blob_sha)
+        if self.database and blob_sha:
+            hits = self.database.lookup_blob(blob_sha, self.analyzer_key(rel_path))
+            if hits is not None:
+                return FileScan(hits, blob_sha, "reused")
+        return FileScan(self.scan_file_data(rel_path, data, use_buffer), blob_sha)
+
+    def analyzer_key(self, rel_path: str) -> str:
+        """Identify the analyzer (and its version) that scan_file_data uses"""
+        name = rel_path.rpartition("/")[2]
+        tokenizer = self._tokenizer_for(name) if self.use_tokenizers else None
+        if self.use_ast and name.endswith(".py"):
+            kind = "python_ast"
+        elif tokenizer:
+            kind = tokenizer.__name__
+        else:
+            kind = "patterns"
+        return f"{kind}-v{CACHE_VERSION}"
+
+    def resolve_commit(self, rev: str = "HEAD") -> Optional[str]:
+        """Return the commit hash a revision points to, if it resolves"""
+        result = subprocess.run(
+            [
+                "git",
+                "-C",
+                str(self.project_path),
+                "rev-parse",
+                "--verify",
+                "--quiet",
+                f"{rev}^{{commit}}",
+            ],
+            capture_output=True,
+            text=True,
+        )
+        return result.stdout.strip() or None
+
+    def scan_file_data(self, rel_path: str, data, use_buffer: bool = False):
+        """Extract hits from raw file data, picking an analyzer by file name"""
+        hits = None
+        name = rel_path.rpartition("/")[2]
+        if self.use_ast and name.endswith(".py"):
+            hits = self.scan_python(bytes(data).decode("utf-8", errors="ignore"))
+        elif self.use_tokenizers:
+            tokenizer = self._tokenizer_for(name)
+            if tokenizer:
+                hits = [
+                    hit
+                    for hit in tokenizer(self._iter_lines(data))
+                    if self._is_valid_env_var(hit.name)
+                ]
+        if hits is None and use_buffer:
+            hits = self.scan_buffer(data)
+        elif hits is None:
+            hits = self.scan_content(bytes(data).decode("utf-8", errors="ignore"))
+        return hits
+
+    @staticmethod
+    def _tokenizer_for(name: str):
+        """Return the tokenizer or matcher for a file name, if any"""
+        if name == "CMakeLists.txt" or name.endswith(".cmake"):
+            return tokenize_cmake
+        if name in ("Makefile", "makefile", "GNUmakefile") or name.endswith(".mk"):
+            return tokenize_make
+        language = EnvironmentVariableInvestigator._source_language(name)
+        if language == "c":
+            return scan_c_source
+        if language == "shell":
+            return tokenize_shell
+        if language == "bazel":
+            return scan_bazel
+        return None
+
+    @staticmethod
+    def _iter_lines(data) -> Iterator[str]:
+        """Decode file data one line at a time"""
+        stream = data if isinstance(data, mmap.mmap) else io.BytesIO(data)
+        for raw in iter(stream.readline, b""):
+            yield raw.decode("utf-8", errors="ignore")
+
+    def scan_content(self, content: str) -> List[EnvHit]:
+        """Extract environment variable hits from file content"""
+        # Normalize newlines the same way text-mode reading would
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
+        hits: List[EnvHit] = []
+        for line_num, line in enumerate(content.split("\n"), 1):
+            self._analyze_line(line, line_num, hits)
+        return hits
+
+    def scan_python(self, content: str) -> Optional[List[EnvHit]]:
+        """Extract hits from Python source using its syntax tree
+
+        Returns None when the source does not parse, so the caller can fall
+        back to the line-based patterns.
+        """
+        # Every environment read goes through a name containing one of these
+        if "environ" not in content and "getenv" not in content:
+            return []
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
+
+        digest = hashlib.sha1(content.encode("utf-8", errors="ignore")).hexdigest()
+        tree = self._ast_cache.get(digest)
+        if tree is None:
+            try:
+                tree = ast.parse(content)
+            except (SyntaxError, ValueError):
+                return None
+            if len(self._ast_cache) >= AST_CACHE_SIZE:
+                del self._ast_cache[next(iter(self._ast_cache))]
+            self._ast_cache[digest] = tree
+
+        lines = content.split("\n")
+        hits = []
+        analyzer = PythonEnvAnalyzer(tree, content)
+        for name, line_num, _, context, default in analyzer.analyze():
+            if not self._is_valid_env_var(name):
+                continue
+            line = lines[line_num - 1] if line_num <= len(lines) else ""
+            hits.append(
+                EnvHit(
+                    name=name,
+                    line_number=line_num,
+                    context=context,
+                    default_value=default,
+                    line_content=line.strip(),
+                )
+            )
+        return hits
+
+    def scan_buffer(self, buffer) -> List[EnvHit]:
+        """Extract hits by running the byte patterns across a whole buffer
+
+        Produces the same hits as scan_content without splitting the file into
+        lines. Line numbers are resolved only for matches, by bisecting an
+        index of newline offsets built on the first match.
+        """
+        newlines: Optional[List[int]] = None
+        # Line number -> decoded line, or None when the line is filtered out
+        lines: Dict[int, Optional[str]] = {}
+        found = []
+
+        for index, (pattern, context) in enumerate(self._buffer_patterns):
+            for match in pattern.finditer(buffer):
+                if newlines is None:
+                    newlines = [m.start() for m in re.finditer(b"\n", buffer)]
+                line_idx = bisect.bisect_left(newlines, match.start())
+                line_num = line_idx + 1
+
+                if line_num not in lines:
+                    start = newlines[line_idx - 1] + 1 if line_idx else 0
+                    end = newlines[line_idx] if line_idx < len(newlines) else None
+                    line = buffer[start:end].decode("utf-8", errors="ignore")
+                    line = line.rstrip("\r")
+                    if self._is_python_dunder_line(line) or self._is_python_code_line(
+                        line
+                    ):
+                        line = None
+                    lines[line_num] = line
+
+                line = lines[line_num]
+                if line is None:
+                    continue
+
+                var_name = match.group(1).decode("ascii")
+                default_value = (
+                    match.group(2).decode("utf-8", errors="ignore")
+                    if match.lastindex >= 2
+                    else None
+                )
+                if self._is_valid_env_var(var_name) and self._is_valid_context(
+                    line, var_name, context
+                ):
+                    hit = EnvHit(
+                        name=var_name,
+                        line_number=line_num,
+                        context=context,
+                        default_value=default_value,
+                        line_content=line.strip(),
+                    )
+                    found.append((line_num, index, match.start(), hit))
 
-    def _analyze_line(self, line: str, file_path: Path, line_num: int) -> None:
+        # Restore line-major order so first-seen attribution matches scan_content
+        found.sort(key=lambda item: item[:3])
+        return [item[3] for item in found]
+
+    def apply_hits(self, file_path: Path, hits: List[EnvHit]) -> None:
+        """Merge the hits of one file into the discovered variables"""
+        if self.occurrences is not None:
+            self.occurrences.add_file(
+                file_path.relative_to(self.project_path).as_posix(), hits
+            )
+        for hit in hits:
+            self._add_variable(
+                var_name=hit.name,
+                file_path=file_path,
+                line_num=hit.line_number,
+                context=hit.context,
+                default_value=hit.default_value,
+                line_content=hit.line_content,
+            )
+
+    def _analyze_line(self, line: str, line_num: int, hits: List[EnvHit]) -> None:
         """Analyze a single line for environment variable patterns"""
         # Skip lines that are clearly Python code with dunder variables
         if self._is_python_dunder_line(line):
@@ -153,13 +1873,14 @@ class EnvironmentVariableInvestigator:
                 if self._is_valid_env_var(var_name) and self._is_valid_context(
                     line, var_name, context
                 ):
-                    self._add_variable(
-                        var_name=var_name,
-                        file_path=file_path,
-                        line_num=line_num,
-                        context=context,
-                        default_value=default_value,
-                        line_content=line.strip(),
+                    hits.append(
+                        EnvHit(
+                            name=var_name,
+                            line_number=line_num,
+                            context=context,
+                            default_value=default_value,
+                            line_content=line.strip(),
+                        )
                     )
 
     def _is_python_dunder_line(self, line: str) -> bool:
@@ -325,6 +2046,8 @@ class EnvironmentVariableInvestigator:
                 line_number=line_num,
                 usage_context=context,
             )
+            if self.on_new_variable:
+                self.on_new_variable(self.variables[var_name])
 
     def _infer_description(self, var_name: str, line_content: str) -> str:
         """Infer description from variable name and context"""
@@ -405,20 +2128,119 @@ class EnvironmentVariableInvestigator:
         data = {
             "project_path": str(self.project_path),
             "variables_found": len(self.variables),
+            **(
+                {"incomplete": self.incomplete_reasons}
+                if self.incomplete_reasons
+                else {}
+            ),
             "variables": {
-                name: {
-                    "description": var.description,
-                    "type": var.var_type,
-                    "default_value": var.default_value,
-                    "source_file": var.source_file,
-                    "line_number": var.line_number,
-                    "usage_context": var.usage_context,
-                }
+                name: self._variable_to_dict(var)
                 for name, var in sorted(self.variables.items())
             },
         }
+        if self.occurrences is not None:
+            for name, entry in data["variables"].items():
+                entry["occurrences"] = [
+                    {
+                        "source_file": source_file,
+                        "line_number": line_num,
+                        "usage_context": context,
+                    }
+                    for source_file, line_num, context in self.occurrences.occurrences(
+                        name
+                    )
+                ]
         return json.dumps(data, indent=2)
 
+    def stream_variable(self, var: EnvVariable) -> None:
+        """Write one newly discovered variable as a JSON line"""
+        record = {"record": "variable", "name": var.name, **self._variable_to_dict(var)}
+        sys.stdout.write(json.dumps(record) + "\n")
+        sys.stdout.flush()
+
+    @staticmethod
+    def _variable_to_dict(var: EnvVariable) -> Dict[str, object]:
+        return {
+            "description": var.description,
+            "type": var.var_type,
+            "default_value": var.default_value,
+            "source_file": var.source_file,
+            "line_number": var.line_number,
+            "usage_context": var.usage_context,
+        }
+
+    def generate_revision_report(
+        self,
+        revisions: List[str],
+        comparisons: List[Dict[str, Dict[str, object]]],
+        output_format: str = "text",
+    ) -> str:
+        """Generate a report of variable changes between consecutive revisions"""
+        pairs = list(zip(revisions, revisions[1:]))
+
+        if output_format == "json":
+            data = {
+                "project_path": str(self.project_path),
+                "revisions": revisions,
+                "comparisons": [
+                    {
+                        "from": old_rev,
+                        "to": new_rev,
+                        "added": {
+                            name: self._variable_to_dict(var)
+                            for name, var in diff["added"].items()
+                        },
+                        "removed": {
+                            name: self._variable_to_dict(var)
+                            for name, var in diff["removed"].items()
+                        },
+                        "changed": {
+                            name: {
+                                "from": self._variable_to_dict(before),
+                                "to": self._variable_to_dict(after),
+                            }
+                            for name, (before, after) in diff["changed"].items()
+                        },
+                    }
+                    for (old_rev, new_rev), diff in zip(pairs, comparisons)
+                ],
+            }
+            return json.dumps(data, indent=2)
+
+        report = ""
+        for (old_rev, new_rev), diff in zip(pairs, comparisons):
+            title = f"Environment Variable Changes from {old_rev} to {new_rev}"
+            report += f"{title}\n" + "=" * len(title) + "\n\n"
+            if not any(diff.values()):
+                report += "No environment variable changes.\n\n"
+                continue
+
+            for label, marker in (("Added", "+"), ("Removed", "-")):
+                if diff[label.lower()]:
+                    report += f"{label} ({len(diff[label.lower()])})\n"
+                    for name, var in diff[label.lower()].items():
+                        report += f"  {marker} {name}"
+                        report += f"  [{var.source_file}:{var.line_number}]"
+                        if var.default_value:
+                            report += f"  default: {var.default_value}"
+                        report += "\n"
+                    report += "\n"
+
+            if diff["changed"]:
+                report += f"Changed ({len(diff['changed'])})\n"
+                for name, (before, after) in diff["changed"].items():
+                    report += f"  ~ {name}  [{after.source_file}:{after.line_number}]\n"
+                    if before.default_value != after.default_value:
+                        report += (
+                            f"      default: {before.default_value or '(none)'} -> "
+                            f"{after.default_value or '(none)'}\n"
+                        )
+                    if before.var_type != after.var_type:
+                        report += f"      type: {before.var_type} -> {after.var_type}\n"
+                report += "\n"
+
+        return report
+
     def _generate_text_report(self) -> str:
         """Generate human-readable text report"""
         if not self.variables:
@@ -448,10 +2270,25 @@ class EnvironmentVariableInvestigator:
                     report += f"    Default: {var.default_value}\n"
                 report += f"    Source: {var.source_file}:{var.line_number}\n"
                 report += f"    Context: {var.usage_context}\n"
+                if self.occurrences is not None:
+                    report += self._format_occurrences(var.name)
                 report += "\n"
 
         return report
 
+    def _format_occurrences(self, var_name: str) -> str:
+        """List the recorded hits of a variable for the text report"""
+        total = self.occurrences.count(var_name)
+        text = f"    Occurrences: {total}\n"
+        for index, (source_file, line_num, context) in enumerate(
+            self.occurrences.occurrences(var_name)
+        ):
+            if index == TEXT_OCCURRENCE_LIMIT:
+                text += f"      ... and {total - index} more (use --json for all)\n"
+                break
+            text += f"      {source_file}:{line_num} [{context}]\n"
+        return text
+
     def _categorize_variable(self, var_name: str) -> str:
         """Categorize a variable by its purpose"""
         name_lower = var_name.lower()
@@ -477,6 +2314,71 @@ class EnvironmentVariableInvestigator:
             return "General Variables"
 
 
+def run_revision_comparison(
+    investigator: EnvironmentVariableInvestigator,
+    revisions: List[str],
+    args: argparse.Namespace,
+) -> None:
+    """Scan several revisions without checking them out and print the changes"""
+    blob_hits: Dict[Tuple[str, str], List[EnvHit]] = {}
+    scans = []
+    with GitObjectReader(investigator.project_path) as reader:
+        for rev in revisions:
+            try:
+                scans.append(investigator.analyze_revision(reader, rev, blob_hits))
+            except subprocess.CalledProcessError as e:
+                message = e.stderr.decode(errors="replace").strip()
+                print(
+                    f"Error: Could not read revision {rev}: {message}", file=sys.stderr
+                )
+                sys.exit(1)
+            if investigator.database:
+                investigator.database.record_scan(
+                    investigator.project_path,
+                    rev,
+                    investigator.resolve_commit(rev),
+                    scans[-1],
+                    investigator.file_blobs,
+                    [],
+                )
+            if args.verbose:
+                print(f"Analyzed {rev}: {len(scans[-1])} variables")
+
+    if args.verbose:
+        print(f"Analyzed {len(blob_hits)} distinct build file blobs")
+        print()
+
+    comparisons = [compare_variables(old, new) for old, new in zip(scans, scans[1:])]
+    output_format = "json" if args.json else "text"
+    print(investigator.generate_revision_report(revisions, comparisons, output_format))
+
+
+def print_database_query(
+    database: VariableDatabase, names: List[str], as_json: bool
+) -> None:
+    """Print which stored projects and revisions read the given variables"""
+    rows = database.query(names)
+    if as_json:
+        print(json.dumps({"query": names, "matches": rows}, indent=2))
+        return
+    if not rows:
+        print(f"No stored project reads {', '.join(names)}")
+        return
+    current = None
+    for row in rows:
+        if row["name"] != current:
+            current = row["name"]
+            print()
+            print(current)
+            print("-" * len(current))
+        location = f"{row['source_file']}:{row['line_number']}"
+        default = row["default_value"] if row["default_value"] else "(none)"
+        print(
+            f"  {row['project']} @ {row['revision']}  {location}  "
+            f"[{row['usage_context']}] default: {default}"
+        )
+
+
 def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(
@@ -490,10 +2392,174 @@ def main():
     )
     parser.add_argument("--json", action="store_true", help="Output in JSON format")
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
+    parser.add_argument(
+        "--git-index",
+        action="store_true",
+        help="Only consider files tracked by git (uses git ls-files)",
+    )
+    parser.add_argument(
+        "--exclude-dir",
+        action="append",
+        default=[],
+        metavar="NAME",
+        help="Directory name to skip during discovery (repeatable)",
+    )
+    parser.add_argument(
+        "--no-default-excludes",
+        action="store_true",
+        help="Do not skip .git, build, node_modules, third_party, etc.",
+    )
+    parser.add_argument(
+        "--mmap-threshold",
+        type=int,
+        default=MMAP_THRESHOLD,
+        metavar="BYTES",
+        help="Memory-map and scan files of at least this size as one buffer "
+        f"(default: {MMAP_THRESHOLD}, 0 for all files)",
+    )
+    parser.add_argument(
+        "--no-ast",
+        action="store_true",
+        help="Scan Python build files with line patterns instead of parsing them",
+    )
+    parser.add_argument(
+        "--no-tokenizers",
+        action="store_true",
+        help="Scan CMake and Makefiles with the generic line patterns",
+    )
+    revision_group = parser.add_mutually_exclusive_group()
+    revision_group.add_argument(
+        "--rev",
+        metavar="A..B",
+        help="Compare build environment variables between two git revisions",
+    )
+    revision_group.add_argument(
+        "--revs",
+        nargs="+",
+        metavar="REV",
+        help="Compare build environment variables across consecutive revisions",
+    )
+    parser.add_argument(
+        "--sweep",
+        action="store_true",
+        help="Scan all Python, C/C++, shell and Bazel sources, not just build files",
+    )
+    parser.add_argument(
+        "--max-file-size",
+        type=int,
+        default=SWEEP_MAX_FILE_SIZE,
+        metavar="BYTES",
+        help=f"Skip larger files during --sweep (default: {SWEEP_MAX_FILE_SIZE})",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        metavar="N",
+        help="Number of worker processes (default: CPU count with --sweep, else 1)",
+    )
+    parser.add_argument(
+        "--all-occurrences",
+        action="store_true",
+        help="Report every file and line where each variable is used, not just the first",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write each newly found variable as a JSON line as soon as it is found",
+    )
+    parser.add_argument(
+        "--max-files",
+        type=int,
+        metavar="N",
+        help="Analyze at most N build files",
+    )
+    parser.add_argument(
+        "--max-bytes-per-file",
+        type=int,
+        metavar="BYTES",
+        help="Only scan the first BYTES of each build file",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Stop discovery and analysis after SECONDS and report partial results",
+    )
+    parser.add_argument(
+        "--db",
+        metavar="PATH",
+        help="Record results in a SQLite database shared across projects, "
+        "reusing per-file results for files already analyzed elsewhere",
+    )
+    parser.add_argument(
+        "--query",
+        action="append",
+        metavar="NAME",
+        help="List projects in --db that read variable NAME (wildcards allowed, "
+        "repeatable) instead of scanning",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse per-file results from previous runs, reanalyzing only changed files",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="DIR",
+        help="Cache directory (default: $XDG_CACHE_HOME/ai-helpers/env_finder); implies --cache",
+    )
 
     args = parser.parse_args()
 
-    investigator = EnvironmentVariableInvestigator(args.project_path)
+    try:
+        revisions = parse_revisions(args.rev, args.revs)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.stream and revisions:
+        parser.error("--stream cannot be combined with --rev/--revs")
+    if args.query and not args.db:
+        parser.error("--query requires --db")
+
+    database = VariableDatabase(Path(args.db)) if args.db else None
+    if args.query:
+        print_database_query(database, args.query, args.json)
+        database.close()
+        return
+
+    # Keep stdout clean for JSON lines when streaming
+    log = functools.partial(print, file=sys.stderr) if args.stream else print
+    deadline = time.monotonic() + args.timeout if args.timeout else None
+
+    exclude_dirs = set() if args.no_default_excludes else set(DEFAULT_EXCLUDE_DIRS)
+    exclude_dirs.update(args.exclude_dir)
+
+    cache = None
+    if args.cache or args.cache_dir:
+        cache = ScanCache.for_project(
+            Path(args.project_path).resolve(),
+            Path(args.cache_dir) if args.cache_dir else None,
+            variant="sweep" if args.sweep else "",
+        )
+
+    investigator = EnvironmentVariableInvestigator(
+        args.project_path,
+        exclude_dirs=exclude_dirs,
+        use_git_index=args.git_index,
+        cache=cache,
+        mmap_threshold=args.mmap_threshold,
+        use_ast=not args.no_ast,
+        use_tokenizers=not args.no_tokenizers,
+        max_bytes_per_file=args.max_bytes_per_file,
+        deadline=deadline,
+        sweep=args.sweep,
+        max_file_size=args.max_file_size,
+        database=database,
+        all_occurrences=args.all_occurrences,
+    )
+    jobs = args.jobs or ((os.cpu_count() or 1) if args.sweep else 1)
+    if args.stream:
+        investigator.on_new_variable = investigator.stream_variable
 
     # Validate git repository
     if not investigator.validate_git_repository():
@@ -504,25 +2570,91 @@ def main():
         sys.exit(1)
 
     if args.verbose:
-        print(f"Analyzing project: {investigator.project_path}")
+        log(f"Analyzing project: {investigator.project_path}")
+
+    if revisions:
+        run_revision_comparison(investigator, revisions, args)
+        if database:
+            database.close()
+        return
 
     # Find and analyze build files
     build_files = investigator.find_build_files()
 
     if args.verbose:
-        print(f"Found {len(build_files)} build configuration files")
+        kind = "source" if args.sweep else "build configuration"
+        log(f"Found {len(build_files)} {kind} files")
         for file_path in build_files:
-            print(f"  - {file_path.relative_to(investigator.project_path)}")
-        print()
+            log(f"  - {file_path.relative_to(investigator.project_path)}")
+        log()
 
     if not build_files:
         print("Warning: No build configuration files found", file=sys.stderr)
 
+    if args.max_files is not None and len(build_files) > args.max_files:
+        investigator.incomplete_reasons.append(
+            f"max files reached ({args.max_files} of {len(build_files)} analyzed)"
+        )
+        build_files = build_files[: args.max_files]
+
     # Analyze each file
-    for file_path in build_files:
+    def progress(file_path: Path) -> None:
+        if args.verbose:
+            log(f"Analyzing {file_path.relative_to(investigator.project_path)}...")
+
+    investigator.analyze_files(build_files, jobs=jobs, progress=progress)
+
+    notes = investigator.file_notes
+    if notes["truncated"]:
+        investigator.incomplete_reasons.append(
+            f"{notes['truncated']} files truncated to {args.max_bytes_per_file} bytes"
+        )
+    if args.verbose and (notes["binary"] or notes["oversized"]):
+        log(
+            f"Skipped {notes['binary']} binary files and "
+            f"{notes['oversized']} files larger than {investigator.max_file_size} bytes"
+        )
+    for reason in investigator.incomplete_reasons:
+        print(f"Warning: Partial results: {reason}", file=sys.stderr)
+    if args.verbose and investigator.occurrences is not None:
+        log(
+            f"Recorded {investigator.occurrences.count()} occurrences in "
+            f"{investigator.occurrences.memory_usage() // 1024} KiB"
+        )
+
+    if cache:
+        cache.save()
         if args.verbose:
-            print(f"Analyzing {file_path.relative_to(investigator.project_path)}...")
-        investigator.analyze_file(file_path)
+            log(
+                f"Cache: {cache.files_analyzed} files analyzed, "
+                f"{cache.files_reused} reused from {cache.cache_file}"
+            )
+
+    if database:
+        database.record_scan(
+            investigator.project_path,
+            "worktree",
+            investigator.resolve_commit(),
+            investigator.variables,
+            investigator.file_blobs,
+            investigator.incomplete_reasons,
+        )
+        if args.verbose:
+            log(
+                f"Database: {database.blobs_stored} files analyzed, "
+                f"{investigator.file_notes['reused']} reused from {database.db_path}"
+            )
+        database.close()
+
+    if args.stream:
+        summary = {
+            "record": "summary",
+            "project_path": str(investigator.project_path),
+            "variables_found": len(investigator.variables),
+            "incomplete": investigator.incomplete_reasons,
+        }
+        print(json.dumps(summary))
+        return
 
     # Generate and display report
     output_format = "json" if args.json else "text"
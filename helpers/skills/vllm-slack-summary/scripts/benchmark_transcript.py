@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for generate_transcript.py
+
+Generates synthetic slackdump exports (users.json plus one JSON file per
+channel day, with threads, attachments, files and reactions) at a chosen
+scale, measures the conversion steps against them (or against real exports)
+and stores the results as JSON so runs before and after a change can be
+compared. No Slack workspace or slackdump is needed.
+
+    ./benchmark_transcript.py generate /tmp/slackbench --days 30 --messages-per-day 2000
+    ./benchmark_transcript.py run /tmp/slackbench vllm_slack_summary/slack_export -o after.json
+    ./benchmark_transcript.py compare before.json after.json
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from glob import glob
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generate_transcript  # noqa: E402
+
+
+# Metrics marked as improved or regressed by compare; the rest describe the input
+HIGHER_IS_BETTER = {
+    "extract_text_msgs_per_sec",
+    "process_msgs_per_sec",
+    "convert_msgs_per_sec",
+}
+LOWER_IS_BETTER = {
+    "load_users_sec",
+    "extract_text_sec",
+    "load_users_peak_rss_kib",
+    "user_index_sec",
+    "user_index_cached_sec",
+    "user_index_peak_rss_kib",
+    "process_sec",
+    "process_peak_rss_kib",
+    "convert_sec",
+    "convert_peak_rss_kib",
+}
+
+# Conversion steps, each measured in a fresh process
+PHASES = ["load_users", "user_index", "extract_text", "process", "convert"]
+
+
+# ============================================================================
+# Synthetic exports
+# ============================================================================
+
+
+WORDS = (
+    "the ci build test failed passed nightly wheel cuda rocm kernel regression "
+    "flaky timeout merge pr review docker image cache runner gpu h100 mi300 "
+    "a100 b200 memory oom torch compile triton attention decode benchmark "
+    "latency throughput fix revert bisect upstream release branch blocked"
+).split()
+TESTS = ["test_attention", "test_sampler", "test_lora", "test_spec_decode"]
+BOT_NOTICES = [
+    "Build #{n} *failed* on `main` ({sha}) "
+    "<https://buildkite.com/vllm/ci/builds/{n}|view build>",
+    "Nightly wheel for `{sha}` published: "
+    "<https://wheels.vllm.ai/{sha}/vllm-{n}.whl|download>",
+    "`{test}` is flaky: {k} of 20 runs failed "
+    "<https://buildkite.com/vllm/ci/builds/{n}#{sha}|logs>",
+]
+
+
+def _user_id(index: int) -> str:
+    return f"U{index:08X}"
+
+
+def _user(index: int, is_bot: bool) -> Dict[str, Any]:
+    """A users.json entry shaped like slackdump's, avatar URLs and all"""
+    name = f"bot{index}" if is_bot else f"user{index}"
+    avatar = f"https://secure.gravatar.com/avatar/{index:032x}.jpg"
+    return {
+        "id": _user_id(index),
+        "team_id": "T0BENCH000",
+        "name": name,
+        "deleted": False,
+        "real_name": f"{'Bot' if is_bot else 'User'} {index}",
+        "tz": "America/New_York",
+        "tz_offset": -14400,
+        "profile": {
+            "title": "Engineer",
+            "real_name": f"{'Bot' if is_bot else 'User'} {index}",
+            "display_name": "" if index % 4 == 0 else name,
+            "email": f"{name}@example.com",
+            "status_text": "",
+            "status_emoji": "",
+            "image_24": f"{avatar}?s=24",
+            "image_48": f"{avatar}?s=48",
+            "image_72": f"{avatar}?s=72",
+            "image_192": f"{avatar}?s=192",
+            "team": "T0BENCH000",
+        },
+        "is_admin": False,
+        "is_bot": is_bot,
+        "updated": 1700000000,
+    }
+
+
+def _human_text(rng: random.Random, members: List[str]) -> str:
+    words = rng.choices(WORDS, k=rng.randint(4, 40))
+    if rng.random() < 0.25:
+        words.insert(rng.randrange(len(words)), f"<@{rng.choice(members)}>")
+    if rng.random() < 0.15:
+        words.append(
+            f"<https://github.com/vllm-project/vllm/pull/{rng.randrange(20000)}>"
+        )
+    if rng.random() < 0.1:
+        words.insert(rng.randrange(len(words)), f"`{rng.choice(TESTS)}`")
+    if rng.random() < 0.1:
+        words.insert(rng.randrange(len(words)), f"*{rng.choice(WORDS)}*")
+    if rng.random() < 0.05:
+        words.append(f"\n```\nRuntimeError: CUDA error at {rng.choice(WORDS)}.cu\n```")
+    return " ".join(words)
+
+
+def _bot_text(rng: random.Random) -> str:
+    return rng.choice(BOT_NOTICES).format(
+        n=rng.randrange(100000),
+        sha=f"{rng.getrandbits(40):010x}",
+        test=rng.choice(TESTS),
+        k=rng.randint(1, 9),
+    )
+
+
+def _go_json(data: Any) -> str:
+    # slackdump is written in Go, whose encoder escapes <, > and &
+    text = json.dumps(data, indent=2, ensure_ascii=False)
+    return text.replace("<", "\\u003c").replace(">", "\\u003e").replace("&", "\\u0026")
+
+
+def generate_export(
+    root: Path,
+    days: int,
+    messages_per_day: int,
+    users: int,
+    active_users: int,
+    thread_ratio: float,
+    reply_ratio: float,
+    bot_ratio: float,
+    attachment_ratio: float,
+    file_ratio: float,
+    reaction_ratio: float,
+    seed: int,
+    channel: str = "ci-sig",
+    start_date: str = "2026-01-05",
+) -> Dict[str, int]:
+    """Write a synthetic slackdump export and return what it contains
+
+    Messages are spread over each day with unique timestamps. Replies go to
+    one of the recent threads, so threads regularly continue on later days.
+    Only ``active_users`` of the ``users`` workspace members post.
+    """
+    rng = random.Random(seed)
+    channel_dir = root / channel
+    channel_dir.mkdir(parents=True, exist_ok=True)
+
+    bots = max(1, users // 20)
+    with open(root / "users.json", "w", encoding="utf-8") as f:
+        f.write(_go_json([_user(i, i < bots) for i in range(users)]))
+    bot_ids = [_user_id(i) for i in range(min(bots, 5))]
+    members = [_user_id(i) for i in rng.sample(range(bots, users), active_users)]
+
+    counts = {"day_files": 0, "messages": 0, "threads": 0, "replies": 0}
+    threads: List[str] = []
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    for day_number in range(days):
+        day = start + timedelta(days=day_number)
+        base = day.timestamp()
+        offsets = sorted(rng.sample(range(86400 * 1000), messages_per_day))
+        messages = []
+        for offset in offsets:
+            ts = f"{base + offset / 1000:.6f}"
+            is_bot = rng.random() < bot_ratio
+            message: Dict[str, Any] = {
+                "type": "message",
+                "user": rng.choice(bot_ids if is_bot else members),
+                "ts": ts,
+                "text": _bot_text(rng) if is_bot else _human_text(rng, members),
+                "team": "T0BENCH000",
+            }
+            if is_bot:
+                message["subtype"] = "bot_message"
+            else:
+                message["client_msg_id"] = f"{rng.getrandbits(128):032x}"
+
+            roll = rng.random()
+            if roll < reply_ratio and threads:
+                message["thread_ts"] = rng.choice(threads[-50:])
+                counts["replies"] += 1
+            elif roll < reply_ratio + thread_ratio:
+                message["thread_ts"] = ts
+                threads.append(ts)
+                counts["threads"] += 1
+
+            if rng.random() < attachment_ratio:
+                message["attachments"] = [
+                    {
+                        "fallback": "CI status",
+                        "text": _bot_text(rng),
+                        "color": "d50200",
+                    }
+                ]
+            if rng.random() < file_ratio:
+                message["files"] = [
+                    {
+                        "id": f"F{rng.getrandbits(40):010X}",
+                        "name": f"log-{rng.randrange(1000)}.txt",
+                        "title": "CI log",
+                        "filetype": "text",
+                        "pretty_type": "Plain Text",
+                        "size": rng.randrange(1 << 20),
+                    }
+                ]
+            if rng.random() < reaction_ratio:
+                voters = rng.sample(members, rng.randint(1, 4))
+                message["reactions"] = [
+                    {
+                        "name": rng.choice(["eyes", "+1", "white_check_mark"]),
+                        "count": len(voters),
+                        "users": voters,
+                    }
+                ]
+            messages.append(message)
+
+        with open(
+            channel_dir / f"{day.strftime('%Y-%m-%d')}.json", "w", encoding="utf-8"
+        ) as f:
+            f.write(_go_json(messages))
+        counts["day_files"] += 1
+        counts["messages"] += len(messages)
+
+    counts["users"] = users
+    return counts
+
+
+# ============================================================================
+# Measurement
+# ============================================================================
+
+
+def _peak_rss_kib() -> int:
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    scale = 1024 if sys.platform == "darwin" else 1
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return peak // scale
+
+
+def _day_files(export_dir: str) -> List[str]:
+    channel_dir = generate_transcript.find_channel_dir(Path(export_dir))
+    if channel_dir is None:
+        raise ValueError(f"No channel directory found in {export_dir}")
+    return sorted(glob(str(channel_dir / "*.json")))
+
+
+def measure_phase(phase: str, export_dir: str, options: Dict[str, Any]) -> Dict:
+    """Run one conversion step and return its metrics
+
+    Meant to run in a fresh process so peak RSS belongs to this step alone.
+    The script's progress output is discarded.
+    """
+    users_file = os.path.join(export_dir, "users.json")
+    message_files = _day_files(export_dir)
+    metrics: Dict[str, Any] = {}
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if phase == "load_users":
+            start = time.perf_counter()
+            user_lookup = generate_transcript.load_users(users_file)
+            metrics["load_users_sec"] = time.perf_counter() - start
+            metrics["users"] = len(user_lookup)
+
+        elif phase == "user_index":
+            with tempfile.TemporaryDirectory() as cache_dir:
+                start = time.perf_counter()
+                user_ids = generate_transcript.collect_user_ids(message_files)
+                user_lookup = generate_transcript.load_user_index(
+                    users_file, user_ids, Path(cache_dir)
+                )
+                metrics["user_index_sec"] = time.perf_counter() - start
+
+                start = time.perf_counter()
+                user_ids = generate_transcript.collect_user_ids(message_files)
+                generate_transcript.load_user_index(
+                    users_file, user_ids, Path(cache_dir)
+                )
+                metrics["user_index_cached_sec"] = time.perf_counter() - start
+            metrics["referenced_users"] = len(user_lookup)
+
+        elif phase == "extract_text":
+            # Message text rendering (render_mrkdwn) alone, without file reads
+            user_lookup = generate_transcript.load_users(users_file)
+            messages = []
+            for file_path in message_files:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    messages.extend(json.load(f))
+            start = time.perf_counter()
+            for message in messages:
+                generate_transcript.extract_text_from_message(message, user_lookup)
+            metrics["extract_text_sec"] = time.perf_counter() - start
+
+        elif phase == "process":
+            user_lookup = generate_transcript.load_users(users_file)
+            start = time.perf_counter()
+            for file_path in message_files:
+                generate_transcript.process_messages_file(file_path, user_lookup)
+            metrics["process_sec"] = time.perf_counter() - start
+
+        elif phase == "convert":
+            with tempfile.TemporaryDirectory() as output_dir:
+                transcript = os.path.join(output_dir, "transcript.md")
+                start = time.perf_counter()
+                generate_transcript.convert_to_transcript(
+                    export_dir,
+                    "benchmark",
+                    transcript,
+                    jobs=options["jobs"],
+                    dedupe_options=options["dedupe_options"],
+                )
+                metrics["convert_sec"] = time.perf_counter() - start
+                metrics["transcript_bytes"] = os.path.getsize(transcript)
+
+    metrics[f"{phase}_peak_rss_kib"] = _peak_rss_kib()
+    return metrics
+
+
+def count_messages(export_dir: str) -> int:
+    messages = 0
+    for file_path in _day_files(export_dir):
+        with open(file_path, "r", encoding="utf-8") as f:
+            messages += len(json.load(f))
+    return messages
+
+
+def _in_fresh_process(function, *args) -> Dict:
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(function, *args).result()
+
+
+def benchmark_target(export_dir: str, options: Dict[str, Any], repeat: int) -> Dict:
+    """Measure an export ``repeat`` times and summarize with the median"""
+    messages = count_messages(export_dir)
+    day_files = len(_day_files(export_dir))
+    runs = []
+    for _ in range(repeat):
+        run: Dict[str, Any] = {"messages": messages, "day_files": day_files}
+        for phase in PHASES:
+            run.update(_in_fresh_process(measure_phase, phase, export_dir, options))
+        run["extract_text_msgs_per_sec"] = (
+            messages / run["extract_text_sec"] if run["extract_text_sec"] else 0.0
+        )
+        run["process_msgs_per_sec"] = (
+            messages / run["process_sec"] if run["process_sec"] else 0.0
+        )
+        run["convert_msgs_per_sec"] = (
+            messages / run["convert_sec"] if run["convert_sec"] else 0.0
+        )
+        runs.append(run)
+    median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    return {"path": export_dir, "median": median, "runs": runs}
+
+
+def compare_results(old: Dict, new: Dict) -> str:
+    """Format the change of each median metric for targets in both result files"""
+    old_targets = {target["path"]: target for target in old["targets"]}
+    lines = []
+    for target in new["targets"]:
+        previous = old_targets.get(target["path"])
+        if previous is None:
+            continue
+        lines.append(target["path"])
+        for key, value in target["median"].items():
+            before = previous["median"].get(key)
+            if before is None:
+                continue
+            if before:
+                change = (value - before) / before * 100
+                marker = " "
+                if change and key in HIGHER_IS_BETTER | LOWER_IS_BETTER:
+                    better = (change > 0) == (key in HIGHER_IS_BETTER)
+                    marker = "+" if better else "-"
+                lines.append(
+                    f"  {marker} {key:<24} {before:>14.3f} -> {value:>14.3f} "
+                    f"({change:+.1f}%)"
+                )
+            else:
+                lines.append(f"    {key:<24} {before:>14.3f} -> {value:>14.3f}")
+    return "\n".join(lines) if lines else "No common targets to compare"
+
+
+# ============================================================================
+# Command line
+# ============================================================================
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark generate_transcript on synthetic or real exports"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="Create a synthetic export")
+    generate.add_argument("path", help="Directory to create the export in")
+    generate.add_argument("--days", type=int, default=7, help="Day files")
+    generate.add_argument(
+        "--messages-per-day", type=int, default=500, help="Messages per day file"
+    )
+    generate.add_argument(
+        "--users", type=int, default=2000, help="Workspace users in users.json"
+    )
+    generate.add_argument(
+        "--active-users", type=int, default=150, help="Users posting in the channel"
+    )
+    generate.add_argument(
+        "--thread-ratio",
+        type=float,
+        default=0.1,
+        help="Fraction of messages that start a thread",
+    )
+    generate.add_argument(
+        "--reply-ratio",
+        type=float,
+        default=0.3,
+        help="Fraction of messages that reply to a recent thread",
+    )
+    generate.add_argument(
+        "--bot-ratio", type=float, default=0.2, help="Fraction of CI bot notices"
+    )
+    generate.add_argument(
+        "--attachment-ratio", type=float, default=0.05, help="Messages with attachments"
+    )
+    generate.add_argument(
+        "--file-ratio", type=float, default=0.03, help="Messages with files"
+    )
+    generate.add_argument(
+        "--reaction-ratio", type=float, default=0.2, help="Messages with reactions"
+    )
+    generate.add_argument("--seed", type=int, default=0, help="Random seed")
+
+    run = subparsers.add_parser("run", help="Measure the conversion of exports")
+    run.add_argument("paths", nargs="+", help="Export directories to measure")
+    run.add_argument("--repeat", type=int, default=3, help="Runs per export")
+    run.add_argument("--output", "-o", help="Write JSON results to this file")
+    run.add_argument(
+        "--jobs", "-j", type=int, default=1, help="Worker processes for conversion"
+    )
+    run.add_argument(
+        "--dedupe", action="store_true", help="Convert with near-duplicate collapsing"
+    )
+
+    compare = subparsers.add_parser("compare", help="Compare two result files")
+    compare.add_argument("old", help="Baseline JSON results")
+    compare.add_argument("new", help="New JSON results")
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        if args.active_users > args.users - max(1, args.users // 20):
+            parser.error("--active-users must be smaller than the human --users")
+        counts = generate_export(
+            Path(args.path),
+            days=args.days,
+            messages_per_day=args.messages_per_day,
+            users=args.users,
+            active_users=args.active_users,
+            thread_ratio=args.thread_ratio,
+            reply_ratio=args.reply_ratio,
+            bot_ratio=args.bot_ratio,
+            attachment_ratio=args.attachment_ratio,
+            file_ratio=args.file_ratio,
+            reaction_ratio=args.reaction_ratio,
+            seed=args.seed,
+        )
+        print(f"Generated {args.path}: {json.dumps(counts)}")
+        return
+
+    if args.command == "compare":
+        try:
+            with open(args.old) as f:
+                old = json.load(f)
+            with open(args.new) as f:
+                new = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not read results: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(compare_results(old, new))
+        return
+
+    options = {
+        "jobs": args.jobs,
+        "dedupe_options": {"max_distance": 6, "window": 50} if args.dedupe else None,
+    }
+    targets: List[Dict] = []
+    for path in args.paths:
+        if not os.path.isfile(os.path.join(path, "users.json")):
+            print(f"Error: {path} is not a slackdump export", file=sys.stderr)
+            sys.exit(1)
+        print(f"Measuring {path}...", file=sys.stderr)
+        targets.append(benchmark_target(os.path.abspath(path), options, args.repeat))
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "options": options,
+        "targets": targets,
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    for target in targets:
+        median = target["median"]
+        print(
+            f"{target['path']}: {median['messages']:.0f} messages, "
+            f"load_users {median['load_users_sec']:.3f}s "
+            f"({median['load_users_peak_rss_kib'] / 1024:.1f} MiB), "
+            f"user index {median['user_index_sec']:.3f}s "
+            f"({median['user_index_peak_rss_kib'] / 1024:.1f} MiB), "
+            f"extract_text {median['extract_text_msgs_per_sec']:.0f} msgs/s, "
+            f"process {median['process_msgs_per_sec']:.0f} msgs/s, "
+            f"convert {median['convert_msgs_per_sec']:.0f} msgs/s "
+            f"(peak RSS {median['convert_peak_rss_kib'] / 1024:.1f} MiB)",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -15,27 +15,76 @@ What this script does:
 
 Usage:
     python generate_transcript.py [--days N] [--channel CHANNEL_ID] [--output-dir DIR]
+                                  [--jobs N] [--incremental [--refetch-hours H]]
+    python generate_transcript.py --channels C07R5PAL2L9="vLLM CI SIG" C0123456789
+                                  [--channels-file FILE] [--max-exports N]
 
 Arguments:
     --days        Number of days to look back (default: 7)
     --channel     Slack channel ID (default: C07R5PAL2L9 for vLLM CI SIG)
     --output-dir  Directory for output files (default: vllm_slack_summary)
+    --jobs        Worker processes for converting day files (default: 1)
+    --incremental Only export messages newer than the previous run and merge
+                  them into the local export (state kept in export_state.json)
+    --channels    Several channels as ID or ID=NAME; each gets its own
+                  subdirectory and transcript, plus a combined index.md
+    --channels-file  JSON list of {"id": ..., "name": ...} channel entries
+    --max-exports Concurrent slackdump processes in multi-channel mode, slices
+                  included (default: 3)
+    --slice-days  Export the window as concurrent slices of N days, retried
+                  individually (--slice-jobs, --retries); with --incremental
+                  only the range since the previous run is sliced
+    --chunk-tokens  Also split the transcript into chunk files of about N
+                  tokens that never break a thread, with a manifest.json
+    --dedupe      Collapse near-duplicate messages such as repeated CI bot
+                  notices (--dedupe-distance, --dedupe-window)
+    --format      "compact" writes user aliases (with a legend), HH:MM times
+                  within each day and one line per message header to save
+                  tokens (--drop-reactions, --drop-files)
+    --thread-budget  Keep only the most active threads that fit in about N
+                  tokens; omitted threads are listed as one-line stubs,
+                  shorter ones without message text when tokens run out
+    --store       SQLite message store with full-text search; transcripts
+                  can be rendered from it (--no-export, --from-date,
+                  --to-date, --thread) and searched (--search)
 
 Output:
     Creates a directory containing:
     - slack_export/: Raw slackdump export data
     - transcript.md: Formatted markdown transcript of conversations
+    - export_state.json: Newest exported message per channel (--incremental)
+    - transcript_chunks/: Chunk files and manifest.json (--chunk-tokens)
 """
 
+import asyncio
+import concurrent.futures
+import hashlib
+import heapq
+import os
+import shutil
+import sqlite3
 import subprocess
 import sys
+import threading
 import json
 import re
 import argparse
+from collections import deque
 from datetime import datetime, timedelta
 from pathlib import Path
 from glob import glob
-from typing import List, Dict, Any
+from typing import (
+    Callable,
+    List,
+    Dict,
+    Any,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    TextIO,
+    Tuple,
+)
 
 
 # Security validation patterns
@@ -44,6 +93,9 @@ CHANNEL_ID_PATTERN = re.compile(r"^[A-Z][A-Z0-9]{8,}$")
 # Dangerous characters for paths: shell metacharacters, control chars, newlines
 UNSAFE_PATH_PATTERN = re.compile(r"[;\n\r\0`$|&<>\'\"\\]")
 
+DEFAULT_CHANNEL_ID = "C07R5PAL2L9"
+DEFAULT_CHANNEL_NAME = "vLLM CI SIG"
+
 
 def validate_channel_id(channel_id: str) -> str:
     """Validate and normalize a Slack channel ID.
@@ -104,31 +156,58 @@ def validate_output_dir(output_dir: str) -> str:
     return output_dir
 
 
-def run_command(cmd, description):
+def run_command(cmd, description, exit_on_error=True):
     """Run a command and handle errors.
 
     Args:
         cmd: List of command arguments (e.g., ['slackdump', 'export', '-o', 'dir'])
         description: Human-readable description for status messages
+        exit_on_error: Exit on failure; otherwise return None
     """
     print(f"📋 {description}...")
     result = subprocess.run(cmd, capture_output=True, text=True)
     if result.returncode != 0:
         print(f"❌ Error: {description} failed")
         print(f"STDERR: {result.stderr}")
+        if not exit_on_error:
+            return None
         sys.exit(1)
     return result.stdout
 
 
-def export_slack_messages(channel_id, days_back, output_dir):
-    """Export messages from Slack using slackdump."""
+def export_slack_messages(
+    channel_id, days_back, output_dir, exit_on_error=True, slice_days=0, **slice_options
+):
+    """Export messages from Slack using slackdump.
+
+    With ``slice_days`` the window is exported as concurrent slices, see
+    export_slack_sliced.
+    """
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days_back)
 
-    time_from = start_date.strftime("%Y-%m-%dT00:00:00")
-    time_to = end_date.strftime("%Y-%m-%dT23:59:59")
+    if slice_days:
+        return export_slack_sliced(
+            channel_id,
+            start_date,
+            end_date,
+            output_dir,
+            slice_days,
+            exit_on_error=exit_on_error,
+            **slice_options,
+        )
+    return export_slack_range(
+        channel_id,
+        start_date.strftime("%Y-%m-%dT00:00:00"),
+        end_date.strftime("%Y-%m-%dT23:59:59"),
+        output_dir,
+        exit_on_error,
+    )
 
-    cmd = [
+
+def slackdump_export_command(channel_id, time_from, time_to, output_dir):
+    """Build the slackdump command exporting one channel and time range."""
+    return [
         "slackdump",
         "export",
         "-time-from",
@@ -142,9 +221,382 @@ def export_slack_messages(channel_id, days_back, output_dir):
         channel_id,
     ]
 
-    run_command(
-        cmd, f"Exporting Slack messages from {start_date.date()} to {end_date.date()}"
+
+def export_slack_range(channel_id, time_from, time_to, output_dir, exit_on_error=True):
+    """Export messages between two slackdump timestamps (YYYY-mm-ddTHH:MM:SS).
+
+    Returns the output directory, or None if the export failed and
+    ``exit_on_error`` is False.
+    """
+    result = run_command(
+        slackdump_export_command(channel_id, time_from, time_to, output_dir),
+        f"Exporting {channel_id} messages from {time_from[:10]} to {time_to[:10]}",
+        exit_on_error,
+    )
+    return output_dir if result is not None else None
+
+
+# ============================================================================
+# Incremental Export Functions
+# ============================================================================
+
+STATE_FILE_NAME = "export_state.json"
+
+
+def load_export_state(state_file: Path) -> Dict[str, Any]:
+    """Load the per-channel high-water marks of earlier exports."""
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"channels": {}}
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Ignoring unreadable export state {state_file}: {e}")
+        return {"channels": {}}
+
+
+def write_json_atomic(path: Path, data: Any) -> None:
+    """Write JSON to a temporary file and move it into place."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def find_channel_dir(export_path: Path) -> Optional[Path]:
+    """Return the channel directory of a slackdump export, if any."""
+    channel_dirs = sorted(
+        d
+        for d in export_path.iterdir()
+        if d.is_dir() and d.name not in ["attachments", "__uploads"]
+    )
+    return channel_dirs[0] if channel_dirs else None
+
+
+def merge_day_file(day_file: Path, new_messages: List[Dict[str, Any]]) -> int:
+    """Merge messages into a day file, deduplicating by ts.
+
+    Newly exported copies replace stored ones, so edits, reactions and reply
+    counts stay current. Returns the number of messages not seen before.
+    """
+    existing = []
+    if day_file.exists():
+        with open(day_file, "r", encoding="utf-8") as f:
+            existing = json.load(f)
+
+    by_ts = {m["ts"]: m for m in existing if m.get("ts")}
+    added = 0
+    for message in new_messages:
+        ts = message.get("ts")
+        if not ts:
+            continue
+        if ts not in by_ts:
+            added += 1
+        by_ts[ts] = message
+
+    merged = sorted(by_ts.values(), key=lambda m: float(m["ts"]))
+    write_json_atomic(day_file, merged)
+    return added
+
+
+def merge_users(users_file: Path, new_users_file: Path) -> None:
+    """Merge a freshly exported users.json into the stored one by user ID."""
+    with open(new_users_file, "r", encoding="utf-8") as f:
+        new_users = json.load(f)
+    users = {}
+    if users_file.exists():
+        with open(users_file, "r", encoding="utf-8") as f:
+            users = {u.get("id"): u for u in json.load(f)}
+    for user in new_users:
+        users[user.get("id")] = user
+    write_json_atomic(users_file, list(users.values()))
+
+
+def newest_ts(channel_dir: Path) -> Optional[str]:
+    """Return the newest message ts stored in a channel directory."""
+    day_files = sorted(channel_dir.glob("*.json"))
+    for day_file in reversed(day_files):
+        with open(day_file, "r", encoding="utf-8") as f:
+            messages = json.load(f)
+        timestamps = [m["ts"] for m in messages if m.get("ts")]
+        if timestamps:
+            return max(timestamps, key=float)
+    return None
+
+
+def incremental_export(
+    channel_id: str,
+    days_back: int,
+    output_dir: Path,
+    refetch_hours: float = 24,
+    exit_on_error: bool = True,
+    slice_days: int = 0,
+    **slice_options,
+) -> Optional[Path]:
+    """Export only messages newer than the last run and merge them locally.
+
+    The newest exported ts of each channel is kept in export_state.json. Each
+    run exports from that mark (minus ``refetch_hours``, to pick up late
+    replies, edits and reactions) and merges the result into
+    ``output_dir/slack_export``, deduplicating messages by ts. The state also
+    records which channel that export holds; a run for another channel
+    replaces it with a full export instead of merging into it. With
+    ``slice_days`` the range is exported as concurrent slices, see
+    export_slack_sliced.
+    """
+    export_dir = output_dir / "slack_export"
+    state_file = output_dir / STATE_FILE_NAME
+    state = load_export_state(state_file)
+    channel_state = state["channels"].get(channel_id, {})
+
+    end_date = datetime.now()
+    window_start = (end_date - timedelta(days=days_back)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    start_date = window_start
+    stored_channel_dir = find_channel_dir(export_dir) if export_dir.exists() else None
+    owner = state.get("export_channel")
+    if owner is None and len(state["channels"]) == 1:
+        # State written before the exported channel was recorded
+        owner = next(iter(state["channels"]))
+    if stored_channel_dir and owner != channel_id:
+        print(f"🔁 {export_dir} holds another channel's export, replacing it")
+        stored_channel_dir = None
+        state["channels"] = {}
+        channel_state = {}
+    if channel_state.get("latest_ts") and stored_channel_dir:
+        resume_from = timestamp_to_datetime(channel_state["latest_ts"]) - timedelta(
+            hours=refetch_hours
+        )
+        start_date = max(window_start, resume_from)
+        print(f"⏩ Resuming after {format_timestamp(channel_state['latest_ts'])}")
+    else:
+        print("📥 No previous export state, exporting the full window")
+
+    incoming_dir = output_dir / "slack_export.incoming"
+    if incoming_dir.exists():
+        shutil.rmtree(incoming_dir)
+    if slice_days:
+        exported = export_slack_sliced(
+            channel_id,
+            start_date,
+            end_date,
+            str(incoming_dir),
+            slice_days,
+            exit_on_error=exit_on_error,
+            **slice_options,
+        )
+    else:
+        exported = export_slack_range(
+            channel_id,
+            start_date.strftime("%Y-%m-%dT%H:%M:%S"),
+            end_date.strftime("%Y-%m-%dT23:59:59"),
+            str(incoming_dir),
+            exit_on_error,
+        )
+    if exported is None:
+        return None
+
+    incoming_channel_dir = find_channel_dir(incoming_dir)
+    if stored_channel_dir is None:
+        # First run: the fresh export becomes the local store as is
+        if export_dir.exists():
+            shutil.rmtree(export_dir)
+        os.replace(incoming_dir, export_dir)
+    else:
+        added = 0
+        if incoming_channel_dir:
+            for day_file in sorted(incoming_channel_dir.glob("*.json")):
+                with open(day_file, "r", encoding="utf-8") as f:
+                    added += merge_day_file(
+                        stored_channel_dir / day_file.name, json.load(f)
+                    )
+        if (incoming_dir / "users.json").exists():
+            merge_users(export_dir / "users.json", incoming_dir / "users.json")
+        shutil.rmtree(incoming_dir)
+        print(f"✅ Merged {added} new messages into {export_dir}")
+
+    channel_dir = find_channel_dir(export_dir)
+    latest = newest_ts(channel_dir) if channel_dir else None
+    if latest:
+        state["channels"][channel_id] = {
+            "latest_ts": latest,
+            "exported_at": end_date.isoformat(timespec="seconds"),
+        }
+    state["export_channel"] = channel_id
+    write_json_atomic(state_file, state)
+    return export_dir
+
+
+# ============================================================================
+# Time-Sliced Export Functions
+# ============================================================================
+
+
+def plan_slices(
+    start_date: datetime, end_date: datetime, slice_days: int
+) -> List[tuple]:
+    """Split a window into day-aligned (time_from, time_to) slackdump ranges."""
+    slices = []
+    current = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    last_day = end_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    while current <= last_day:
+        slice_end = min(current + timedelta(days=slice_days - 1), last_day)
+        slices.append(
+            (
+                current.strftime("%Y-%m-%dT00:00:00"),
+                slice_end.strftime("%Y-%m-%dT23:59:59"),
+            )
+        )
+        current = slice_end + timedelta(days=1)
+    return slices
+
+
+async def export_slice(
+    channel_id: str,
+    time_from: str,
+    time_to: str,
+    slice_dir: Path,
+    semaphore: asyncio.Semaphore,
+    retries: int,
+    process_limit: Optional[threading.Semaphore] = None,
+) -> bool:
+    """Export one slice in an asyncio subprocess, retrying with backoff.
+
+    ``process_limit`` is shared with other threads exporting at the same time
+    and caps their slackdump processes together.
+    """
+    description = f"{channel_id} {time_from[:10]}..{time_to[:10]}"
+    for attempt in range(retries + 1):
+        if slice_dir.exists():
+            shutil.rmtree(slice_dir)
+        async with semaphore:
+            if process_limit:
+                await asyncio.to_thread(process_limit.acquire)
+            try:
+                print(f"📋 Exporting slice {description}...")
+                process = await asyncio.create_subprocess_exec(
+                    *slackdump_export_command(
+                        channel_id, time_from, time_to, slice_dir
+                    ),
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                _, stderr = await process.communicate()
+            finally:
+                if process_limit:
+                    process_limit.release()
+        if process.returncode == 0:
+            # Marks the slice as complete, so a rerun can reuse it; slackdump
+            # may not create the directory for a range without messages
+            slice_dir.mkdir(parents=True, exist_ok=True)
+            (slice_dir / ".done").touch()
+            return True
+        error = stderr.decode(errors="replace").strip()
+        if attempt < retries:
+            delay = 2**attempt
+            print(f"⚠️  Slice {description} failed ({error}), retrying in {delay}s")
+            await asyncio.sleep(delay)
+        else:
+            print(f"❌ Error: slice {description} failed after {retries + 1} attempts")
+            print(f"STDERR: {error}")
+    return False
+
+
+async def _export_slices(
+    channel_id: str,
+    pending: List[tuple],
+    max_concurrent: int,
+    retries: int,
+    process_limit: Optional[threading.Semaphore] = None,
+) -> List[bool]:
+    semaphore = asyncio.Semaphore(max(1, max_concurrent))
+    return await asyncio.gather(
+        *(
+            export_slice(
+                channel_id,
+                time_from,
+                time_to,
+                slice_dir,
+                semaphore,
+                retries,
+                process_limit,
+            )
+            for time_from, time_to, slice_dir in pending
+        )
     )
+
+
+def export_slack_sliced(
+    channel_id: str,
+    start_date: datetime,
+    end_date: datetime,
+    output_dir,
+    slice_days: int,
+    max_concurrent: int = 4,
+    retries: int = 2,
+    exit_on_error: bool = True,
+    process_limit: Optional[threading.Semaphore] = None,
+):
+    """Export a window as concurrent day or week slices and merge them.
+
+    Each slice is exported into ``<output_dir>.slices/`` and retried on its
+    own; the results are merged into the standard export layout that
+    convert_to_transcript reads. When a slice keeps failing, completed past
+    slices are kept so the next run only exports what is missing. At most
+    ``max_concurrent`` slices run at once, and no more processes than
+    ``process_limit`` allows across all threads sharing it.
+
+    Returns the output directory, or None if a slice failed and
+    ``exit_on_error`` is False.
+    """
+    output_path = Path(output_dir)
+    slices_root = output_path.with_name(output_path.name + ".slices")
+    slices_root.mkdir(parents=True, exist_ok=True)
+    today = datetime.now().strftime("%Y-%m-%d")
+
+    slices = []
+    pending = []
+    for time_from, time_to in plan_slices(start_date, end_date, slice_days):
+        slice_dir = slices_root / f"{time_from[:10]}_{time_to[:10]}"
+        slices.append(slice_dir)
+        # Slices reaching today may still grow, so they are always re-exported
+        if (slice_dir / ".done").exists() and time_to[:10] < today:
+            continue
+        pending.append((time_from, time_to, slice_dir))
+
+    print(
+        f"📦 Exporting {len(pending)} of {len(slices)} slices of {slice_days} days, "
+        f"{max_concurrent} at a time"
+    )
+    results = asyncio.run(
+        _export_slices(channel_id, pending, max_concurrent, retries, process_limit)
+    )
+    if not all(results):
+        print(f"❌ Error: {results.count(False)} slices failed; completed slices kept")
+        if exit_on_error:
+            sys.exit(1)
+        return None
+
+    # Merge the slices into one standard export
+    if output_path.exists():
+        shutil.rmtree(output_path)
+    output_path.mkdir(parents=True)
+    messages = 0
+    for slice_dir in slices:
+        slice_channel_dir = find_channel_dir(slice_dir)
+        if slice_channel_dir:
+            channel_dir = output_path / slice_channel_dir.name
+            channel_dir.mkdir(exist_ok=True)
+            for day_file in sorted(slice_channel_dir.glob("*.json")):
+                with open(day_file, "r", encoding="utf-8") as f:
+                    messages += merge_day_file(
+                        channel_dir / day_file.name, json.load(f)
+                    )
+        if (slice_dir / "users.json").exists():
+            merge_users(output_path / "users.json", slice_dir / "users.json")
+    shutil.rmtree(slices_root)
+    print(f"✅ Merged {messages} messages from {len(slices)} slices into {output_dir}")
     return output_dir
 
 
@@ -153,6 +605,17 @@ def export_slack_messages(channel_id, days_back, output_dir):
 # ============================================================================
 
 
+def _user_entry(user: Dict[str, Any]) -> Dict[str, Any]:
+    profile = user.get("profile", {})
+    return {
+        "real_name": user.get("real_name", profile.get("real_name", "Unknown User")),
+        "display_name": profile.get("display_name", ""),
+        "name": user.get("name", ""),
+        "email": profile.get("email", ""),
+        "is_bot": user.get("is_bot", False),
+    }
+
+
 def load_users(users_file: str) -> Dict[str, Dict[str, Any]]:
     """Load user data from users.json and create a lookup dictionary."""
     print(f"📂 Loading users from {users_file}")
@@ -163,19 +626,165 @@ def load_users(users_file: str) -> Dict[str, Dict[str, Any]]:
     # Create user_id -> user info mapping
     user_lookup = {}
     for user in users_data:
+        user_lookup[user.get("id")] = _user_entry(user)
+
+    print(f"✅ Loaded {len(user_lookup)} users")
+    return user_lookup
+
+
+class UserRecord:
+    """Compact user entry that reads like the dicts returned by load_users."""
+
+    __slots__ = ("real_name", "display_name", "name", "email", "is_bot")
+
+    def __init__(
+        self,
+        real_name: str = "Unknown User",
+        display_name: str = "",
+        name: str = "",
+        email: str = "",
+        is_bot: bool = False,
+    ):
+        self.real_name = real_name
+        self.display_name = display_name
+        self.name = name
+        self.email = email
+        self.is_bot = is_bot
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def fields(self) -> List[Any]:
+        return [getattr(self, key) for key in self.__slots__]
+
+
+# Authors and mentions in raw day files; slackdump writes "<" as \u003c
+USER_REFERENCE_RE = re.compile(rb'"user"\s*:\s*"([A-Z0-9]+)"|(?:<|\\u003c)@([A-Z0-9]+)')
+
+
+def collect_user_ids(message_files: Iterable[str]) -> set:
+    """Return the IDs of all users who post or are mentioned in the day files."""
+    user_ids = set()
+    for file_path in message_files:
+        with open(file_path, "rb") as f:
+            data = f.read()
+        for author, mention in USER_REFERENCE_RE.findall(data):
+            user_ids.add((author or mention).decode())
+    return user_ids
+
+
+def iter_users_json(
+    users_file: str, chunk_size: int = 1024 * 1024
+) -> Iterator[Dict[str, Any]]:
+    """Yield the user objects of users.json one at a time.
+
+    The file is decoded in chunks, so the whole workspace directory is never
+    held in memory at once.
+
+    Raises:
+        ValueError: If the file is not a JSON array of objects
+    """
+    decoder = json.JSONDecoder()
+    with open(users_file, "r", encoding="utf-8") as f:
+        buffer, pos, eof, started = "", 0, False, False
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                if eof:
+                    raise ValueError(f"{users_file} ends before the user list")
+                buffer, pos = f.read(chunk_size), 0
+                eof = not buffer
+                continue
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError(f"{users_file} is not a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                user, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Most likely an object cut off at the end of the chunk
+                if eof:
+                    raise
+                more = f.read(chunk_size)
+                eof = not more
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            yield user
+            pos = end
+
+
+def users_cache_dir() -> Path:
+    """Return the XDG cache directory used for user indexes."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return Path(base) / "ai-helpers" / "vllm-slack-summary"
+
+
+def load_user_index(
+    users_file: str, user_ids: set, cache_dir: Optional[Path] = None
+) -> Dict[str, UserRecord]:
+    """Load only the given users from users.json as compact records.
+
+    users.json is stream-parsed, keeping just the referenced users. The
+    result is cached under the file's SHA-256, so later runs against the
+    same users.json skip the parse while they need no new users.
+    """
+    digest = hashlib.sha256()
+    with open(users_file, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    cache_file = (cache_dir or users_cache_dir()) / f"users-{digest.hexdigest()}.json"
+
+    requested: set = set()
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        requested = set(cached["requested"])
+        if user_ids <= requested:
+            user_lookup = {
+                user_id: UserRecord(*fields)
+                for user_id, fields in cached["users"].items()
+            }
+            print(f"✅ Loaded {len(user_lookup)} users from cache {cache_file}")
+            return user_lookup
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"⚠️  Ignoring unreadable users cache {cache_file}: {e}")
+
+    # Keep what earlier runs asked for, so the cache only ever grows
+    wanted = user_ids | requested
+    print(f"📂 Indexing {len(wanted)} referenced users from {users_file}")
+    user_lookup = {}
+    for user in iter_users_json(users_file):
         user_id = user.get("id")
-        profile = user.get("profile", {})
-
-        user_lookup[user_id] = {
-            "real_name": user.get(
-                "real_name", profile.get("real_name", "Unknown User")
-            ),
-            "display_name": profile.get("display_name", ""),
-            "name": user.get("name", ""),
-            "email": profile.get("email", ""),
-            "is_bot": user.get("is_bot", False),
-        }
+        if user_id in wanted:
+            user_lookup[user_id] = UserRecord(**_user_entry(user))
 
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(
+            cache_file,
+            {
+                "requested": sorted(wanted),
+                "users": {
+                    user_id: record.fields() for user_id, record in user_lookup.items()
+                },
+            },
+        )
+    except OSError as e:
+        print(f"⚠️  Could not write users cache {cache_file}: {e}")
     print(f"✅ Loaded {len(user_lookup)} users")
     return user_lookup
 
@@ -207,46 +816,84 @@ def get_user_display(user_id: str, user_lookup: Dict[str, Dict[str, Any]]) -> st
     return display_name
 
 
-def extract_text_from_message(
-    message: Dict[str, Any], user_lookup: Dict[str, Dict[str, Any]]
+# Slack mrkdwn tokens, matched in one left-to-right pass. Code comes first so
+# nothing inside code spans is treated as formatting; bold, italic and strike
+# need a non-space just inside the markers and no word character outside,
+# which keeps snake_case names and arithmetic like 2 * 3 * 4 intact.
+MRKDWN_TOKEN_RE = re.compile(
+    r"(?P<fence>```[^`]*```)"
+    r"|(?P<code>`[^`\n]+`)"
+    r"|<@(?P<user>[A-Z0-9]+)>"
+    r"|<#[A-Z0-9]+\|(?P<channel>[^>]+)>"
+    r"|<(?P<url>https?://[^|>]+)(?:\|[^>]+)?>"
+    r"|(?<![*\w])\*(?=[^\s*])(?P<bold>[^*\n]*?[^\s*])\*(?![*\w])"
+    r"|(?<![_\w])_(?=[^\s_])(?P<italic>[^_\n]*?[^\s_])_(?![_\w])"
+    r"|(?<![~\w])~(?=[^\s~])(?P<strike>[^~\n]*?[^\s~])~(?![~\w])"
+)
+# Mentions, channels and links only: used inside code and for attachments
+MRKDWN_ENTITY_RE = re.compile(
+    r"<@(?P<user>[A-Z0-9]+)>"
+    r"|<#[A-Z0-9]+\|(?P<channel>[^>]+)>"
+    r"|<(?P<url>https?://[^|>]+)(?:\|[^>]+)?>"
+)
+
+
+def render_mrkdwn(
+    text: str, user_lookup: Dict[str, Dict[str, Any]], formatting: bool = True
 ) -> str:
-    """Extract clean text from message, handling various Slack formats with markdown."""
-    # Primary text field
-    text = message.get("text", "")
-
-    # Ensure code blocks have newlines around them
-    # Match ```...``` and ensure newlines before and after
-    text = re.sub(
-        r"(?<!\n)(```)", r"\n\1", text
-    )  # Add newline before ``` if not present
-    text = re.sub(
-        r"(```[^`]*```)(?!\n)", r"\1\n", text
-    )  # Add newline after ``` if not present
+    """Render Slack mrkdwn as markdown in a single pass over the text.
 
-    # Replace user mentions <@U123456> with **@username**
-    def replace_mention(match):
-        user_id = match.group(1)
-        user_name = get_user_display(user_id, user_lookup)
-        return f"**@{user_name}**"
-
-    text = re.sub(r"<@([A-Z0-9]+)>", replace_mention, text)
-
-    # Replace channel mentions <#C123456|channel-name> with **#channel-name**
-    text = re.sub(r"<#[A-Z0-9]+\|([^>]+)>", r"**#\1**", text)
+    Args:
+        text: Slack message text
+        user_lookup: User lookup used to resolve mentions
+        formatting: Convert bold/italic/strike and code fences; when False only
+            mentions, channels and links are rewritten
 
-    # Clean up URLs - keep them but remove the < > wrapper
-    text = re.sub(r"<(https?://[^|>]+)(?:\|[^>]+)?>", r"\1", text)
+    Returns:
+        The markdown text
+    """
 
-    # Convert inline code: `code` stays as is (Slack uses backticks same as markdown)
+    def render_token(match: re.Match, in_bold: bool = False) -> str:
+        kind = match.lastgroup
+        value = match.group(kind)
+        # Mentions inside bold text are already bold
+        strong = "" if in_bold else "**"
+        if kind == "user":
+            return f"{strong}@{get_user_display(value, user_lookup)}{strong}"
+        if kind == "channel":
+            return f"{strong}#{value}{strong}"
+        if kind == "url":
+            return value
+        if kind == "fence":
+            # Code blocks always start and end on their own line
+            source = match.string
+            start, end = match.span()
+            body = MRKDWN_ENTITY_RE.sub(render_token, value[3:-3])
+            prefix = "" if start > 0 and source[start - 1] == "\n" else "\n"
+            closing = "```" if body.endswith("\n") else "\n```"
+            suffix = "" if source.startswith("\n", end) else "\n"
+            return f"{prefix}```{body}{closing}{suffix}"
+        if kind == "code":
+            return MRKDWN_ENTITY_RE.sub(render_token, value)
+        inner = MRKDWN_TOKEN_RE.sub(
+            lambda m: render_token(m, in_bold or kind == "bold"), value
+        )
+        if kind == "bold":
+            return f"**{inner}**"
+        if kind == "italic":
+            return f"*{inner}*"
+        return f"~~{inner}~~"
 
-    # Convert Slack's bold *text* to markdown **text**
-    text = re.sub(r"(?<!\*)\*(?!\*)([^\*]+)\*(?!\*)", r"**\1**", text)
+    pattern = MRKDWN_TOKEN_RE if formatting else MRKDWN_ENTITY_RE
+    return pattern.sub(render_token, text)
 
-    # Convert Slack's italic _text_ to markdown *text*
-    text = re.sub(r"(?<!_)_(?!_)([^_]+)_(?!_)", r"*\1*", text)
 
-    # Convert Slack's strikethrough ~text~ to markdown ~~text~~
-    text = re.sub(r"~([^~]+)~", r"~~\1~~", text)
+def extract_text_from_message(
+    message: Dict[str, Any], user_lookup: Dict[str, Dict[str, Any]]
+) -> str:
+    """Extract clean text from message, handling various Slack formats with markdown."""
+    # Primary text field, with code, mentions, links and formatting rendered
+    text = render_mrkdwn(message.get("text", ""), user_lookup)
 
     # Also check if there are attachments with text
     attachments = message.get("attachments", [])
@@ -255,10 +902,8 @@ def extract_text_from_message(
         for att in attachments:
             att_text = att.get("text", "")
             if att_text:
-                # Apply same replacements to attachment text
-                att_text = re.sub(r"<@([A-Z0-9]+)>", replace_mention, att_text)
-                att_text = re.sub(r"<#[A-Z0-9]+\|([^>]+)>", r"**#\1**", att_text)
-                att_text = re.sub(r"<(https?://[^|>]+)(?:\|[^>]+)?>", r"\1", att_text)
+                # Resolve mentions, channels and links in attachment text
+                att_text = render_mrkdwn(att_text, user_lookup, formatting=False)
                 attachment_texts.append(f"\n> 📎 *Attachment:* {att_text}")
         if attachment_texts:
             text += "\n".join(attachment_texts)
@@ -283,106 +928,1220 @@ def extract_text_from_message(
     return text
 
 
-def process_messages_file(
-    file_path: str, user_lookup: Dict[str, Dict[str, Any]], include_threads: bool = True
+class ThreadIndex:
+    """Thread replies that are stored in a different day file than their parent.
+
+    Slack exports file each reply under the day it was posted, so a thread
+    that continues past midnight is split across day files. One pre-pass over
+    the export keeps only those out-of-file replies (and replies whose parent
+    is not in the export at all), so each day file can still be rendered on
+    its own with every reply attached to its parent.
+    """
+
+    def __init__(self, message_files: List[str]):
+        self.message_files = list(message_files)
+        # thread_ts -> replies stored outside the parent's day file
+        self.replies: Dict[str, List[Dict[str, Any]]] = {}
+        # thread_ts -> day file index of the parent message
+        self.parents: Dict[str, int] = {}
+        # thread_ts -> (file index, position) of the first reply of an orphan
+        self.orphan_anchors: Dict[str, tuple] = {}
+        self.reply_count = 0
+        self._positions = {path: i for i, path in enumerate(self.message_files)}
+
+    @classmethod
+    def build(cls, message_files: List[str]) -> "ThreadIndex":
+        """Scan all day files once and index their cross-file thread replies."""
+        index = cls(message_files)
+        first_reply: Dict[str, tuple] = {}
+        for file_idx, file_path in enumerate(index.message_files):
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    messages = json.load(f)
+            except Exception as e:
+                print(f"⚠️  Could not index {file_path}: {e}")
+                continue
+            for message in messages:
+                ts = message.get("ts")
+                thread_ts = message.get("thread_ts")
+                if (not thread_ts or thread_ts == ts) and message.get(
+                    "type", ""
+                ) == "message":
+                    index.parents[ts] = file_idx
+            for position, message in enumerate(messages):
+                ts = message.get("ts")
+                thread_ts = message.get("thread_ts")
+                if not thread_ts or thread_ts == ts:
+                    continue
+                index.reply_count += 1
+                if index.parents.get(thread_ts) == file_idx:
+                    continue
+                index.replies.setdefault(thread_ts, []).append(message)
+                key = (float(ts or "0"), file_idx, position)
+                if thread_ts not in first_reply or key < first_reply[thread_ts]:
+                    first_reply[thread_ts] = key
+        for thread_ts, (_, file_idx, position) in first_reply.items():
+            if thread_ts not in index.parents:
+                index.orphan_anchors[thread_ts] = (file_idx, position)
+        return index
+
+    def file_position(self, file_path: str) -> Optional[int]:
+        return self._positions.get(file_path)
+
+    def is_local(self, thread_ts: str, file_idx: int) -> bool:
+        """True if the thread's parent is stored in the given day file."""
+        return self.parents.get(thread_ts) == file_idx
+
+    def is_orphan_anchor(self, thread_ts: str, file_idx: int, position: int) -> bool:
+        """True for the first reply of a thread whose parent is not exported."""
+        return self.orphan_anchors.get(thread_ts) == (file_idx, position)
+
+    def get_replies(self, thread_ts: str) -> List[Dict[str, Any]]:
+        """Return the replies of a thread stored outside the parent's day file."""
+        return self.replies.get(thread_ts, [])
+
+    def spanning_threads(self) -> int:
+        """Number of threads with replies outside their parent's day file."""
+        return len(self.replies)
+
+
+def _render_replies(
+    replies: List[Dict[str, Any]], user_lookup: Dict[str, Dict[str, Any]]
+) -> Iterator[str]:
+    yield "\n> **Thread replies:**"
+    for reply in replies:
+        reply_user_id = reply.get("user", "UNKNOWN")
+        reply_ts = reply.get("ts", "0")
+        reply_text = extract_text_from_message(reply, user_lookup)
+
+        reply_user_display = get_user_display(reply_user_id, user_lookup)
+        reply_timestamp_str = format_timestamp(reply_ts)
+
+        yield f"> **[{reply_timestamp_str}] {reply_user_display}:**"
+        # Indent reply text with quote markers
+        for line in reply_text.split("\n"):
+            yield f"> {line}"
+
+
+class MessageBlock(NamedTuple):
+    """Rendered lines of one top-level message together with its thread."""
+
+    start_ts: float
+    end_ts: float
+    messages: int
+    lines: List[str]
+
+
+def _message_lines(
+    message: Dict[str, Any], user_lookup: Dict[str, Dict[str, Any]]
 ) -> List[str]:
-    """Process a single Slack messages JSON file and return formatted transcript lines."""
+    """Render a top-level message as its header line and text."""
+    user_id = message.get("user", "UNKNOWN")
+    text = extract_text_from_message(message, user_lookup)
+
+    # Format the message with markdown
+    user_display = get_user_display(user_id, user_lookup)
+    timestamp_str = format_timestamp(message.get("ts", "0"))
+
+    return [f"\n**[{timestamp_str}] {user_display}:**", text]
+
+
+def _orphan_header(thread_ts: str) -> str:
+    return f"\n**[{format_timestamp(thread_ts)}] (thread started before this export)**"
+
+
+def _thread_block(
+    header: List[str],
+    start_ts: float,
+    replies: List[Dict[str, Any]],
+    user_lookup: Dict[str, Dict[str, Any]],
+) -> MessageBlock:
+    lines = list(header)
+    end_ts = start_ts
+    if replies:
+        replies = sorted(replies, key=lambda m: float(m.get("ts", "0")))
+        lines.extend(_render_replies(replies, user_lookup))
+        end_ts = max(end_ts, float(replies[-1].get("ts", "0")))
+    return MessageBlock(start_ts, end_ts, len(replies) + 1, lines)
+
+
+def iter_message_blocks(
+    file_path: str,
+    user_lookup: Dict[str, Dict[str, Any]],
+    include_threads: bool = True,
+    thread_index: Optional[ThreadIndex] = None,
+) -> Iterator[MessageBlock]:
+    """Process a single Slack messages JSON file, yielding one block per message.
+
+    Each block holds a top-level message and its rendered thread replies, so
+    a thread is never split between blocks.
+
+    Without a thread index only replies stored in the same day file are shown.
+    With one, every reply is attached to its parent wherever it is stored, and
+    threads whose parent is not in the export are shown where they first
+    appear.
+    """
     print(f"📄 Processing {file_path}")
 
     with open(file_path, "r", encoding="utf-8") as f:
         messages = json.load(f)
 
-    # Sort messages by timestamp
-    messages.sort(key=lambda m: float(m.get("ts", "0")))
+    file_idx = thread_index.file_position(file_path) if thread_index else None
+    if file_idx is None:
+        thread_index = None
 
-    transcript_lines = []
+    # Sort messages by timestamp, remembering their stored positions
+    order = sorted(
+        range(len(messages)), key=lambda i: float(messages[i].get("ts", "0"))
+    )
 
-    # Group messages by thread
+    # Group the replies stored in this file by thread
     threads = {}
-    standalone_messages = []
+    for position in order:
+        message = messages[position]
+        thread_ts = message.get("thread_ts")
+        if thread_ts and thread_ts != message.get("ts"):
+            if thread_index is None or thread_index.is_local(thread_ts, file_idx):
+                threads.setdefault(thread_ts, []).append(message)
 
-    for message in messages:
+    # Process all messages (standalone and thread parents)
+    for position in order:
+        message = messages[position]
         thread_ts = message.get("thread_ts")
-        ts = message.get("ts")
+        ts = message.get("ts", "0")
 
-        if thread_ts and thread_ts != ts:
-            # This is a reply in a thread
-            if thread_ts not in threads:
-                threads[thread_ts] = []
-            threads[thread_ts].append(message)
-        else:
-            standalone_messages.append(message)
+        if thread_ts and thread_ts != message.get("ts"):
+            # Replies are rendered under their parent
+            if (
+                include_threads
+                and thread_index
+                and thread_index.is_orphan_anchor(thread_ts, file_idx, position)
+            ):
+                block = _thread_block(
+                    [_orphan_header(thread_ts)],
+                    float(ts),
+                    thread_index.get_replies(thread_ts),
+                    user_lookup,
+                )
+                # The parent itself is not part of the export
+                yield block._replace(messages=block.messages - 1)
+            continue
 
-    # Process all messages (standalone and thread parents)
-    for message in standalone_messages:
         msg_type = message.get("type", "")
 
         # Skip non-message types
         if msg_type != "message":
             continue
 
-        user_id = message.get("user", "UNKNOWN")
-        ts = message.get("ts", "0")
-        text = extract_text_from_message(message, user_lookup)
+        # Add thread replies if they exist and are requested
+        replies = []
+        if include_threads:
+            replies = threads.get(ts, [])
+            if thread_index:
+                replies = replies + thread_index.get_replies(ts)
+        yield _thread_block(
+            _message_lines(message, user_lookup), float(ts), replies, user_lookup
+        )
 
-        # Format the message with markdown
-        user_display = get_user_display(user_id, user_lookup)
-        timestamp_str = format_timestamp(ts)
+    print(f"✅ Processed {len(messages)} messages from {file_path}")
 
-        transcript_lines.append(f"\n**[{timestamp_str}] {user_display}:**")
-        transcript_lines.append(text)
 
-        # Add thread replies if they exist and are requested
-        if include_threads and ts in threads:
-            transcript_lines.append("\n> **Thread replies:**")
-            for reply in sorted(threads[ts], key=lambda m: float(m.get("ts", "0"))):
-                reply_user_id = reply.get("user", "UNKNOWN")
-                reply_ts = reply.get("ts", "0")
-                reply_text = extract_text_from_message(reply, user_lookup)
-
-                reply_user_display = get_user_display(reply_user_id, user_lookup)
-                reply_timestamp_str = format_timestamp(reply_ts)
-
-                transcript_lines.append(
-                    f"> **[{reply_timestamp_str}] {reply_user_display}:**"
-                )
-                # Indent reply text with quote markers
-                for line in reply_text.split("\n"):
-                    transcript_lines.append(f"> {line}")
+def iter_messages_file(
+    file_path: str,
+    user_lookup: Dict[str, Dict[str, Any]],
+    include_threads: bool = True,
+    thread_index: Optional[ThreadIndex] = None,
+) -> Iterator[str]:
+    """Process a single Slack messages JSON file, yielding transcript lines one by one."""
+    for block in iter_message_blocks(
+        file_path, user_lookup, include_threads, thread_index
+    ):
+        yield from block.lines
 
-    print(f"✅ Processed {len(messages)} messages from {file_path}")
-    return transcript_lines
+
+def process_messages_file(
+    file_path: str,
+    user_lookup: Dict[str, Dict[str, Any]],
+    include_threads: bool = True,
+    thread_index: Optional[ThreadIndex] = None,
+) -> List[str]:
+    """Process a single Slack messages JSON file and return formatted transcript lines."""
+    return list(
+        iter_messages_file(file_path, user_lookup, include_threads, thread_index)
+    )
+
+
+# User lookup shared by all day files converted in one worker process
+_worker_user_lookup: Dict[str, Dict[str, Any]] = {}
+_worker_include_threads = True
+_worker_thread_index: Optional[ThreadIndex] = None
+
+
+def _init_convert_worker(
+    user_lookup: Dict[str, Dict[str, Any]],
+    include_threads: bool,
+    thread_index: Optional[ThreadIndex] = None,
+) -> None:
+    global _worker_user_lookup, _worker_include_threads, _worker_thread_index
+    _worker_user_lookup = user_lookup
+    _worker_include_threads = include_threads
+    _worker_thread_index = thread_index
+
+
+def render_day_file(
+    msg_file: str,
+    user_lookup: Dict[str, Dict[str, Any]],
+    include_threads: bool = True,
+    thread_index: Optional[ThreadIndex] = None,
+) -> Optional[List[MessageBlock]]:
+    """Render all message blocks of one day file, or None if it fails.
+
+    A failing day is dropped as a whole, never written in part.
+    """
+    try:
+        return list(
+            iter_message_blocks(
+                msg_file,
+                user_lookup,
+                include_threads=include_threads,
+                thread_index=thread_index,
+            )
+        )
+    except Exception as e:
+        print(f"❌ Failed to process {msg_file}: {e}")
+        return None
+
+
+def _convert_day_file(msg_file: str) -> Optional[List[MessageBlock]]:
+    """Render one day file in a worker, returning None if it fails"""
+    return render_day_file(
+        msg_file,
+        _worker_user_lookup,
+        include_threads=_worker_include_threads,
+        thread_index=_worker_thread_index,
+    )
+
+
+def render_day_files(
+    message_files: List[str],
+    user_lookup: Dict[str, Dict[str, Any]],
+    include_threads: bool = True,
+    jobs: int = 1,
+    thread_index: Optional[ThreadIndex] = None,
+):
+    """Yield (file, message blocks or None) for each day file in order.
+
+    Each day is rendered completely before it is yielded, so a day that
+    fails is dropped as a whole. With jobs > 1 the files are rendered in a
+    process pool; the user lookup is sent to each worker once and results
+    still come back in file order, so the transcript is identical to a
+    serial run, failed days included.
+    """
+    if jobs <= 1 or len(message_files) <= 1:
+        for msg_file in message_files:
+            yield (
+                msg_file,
+                render_day_file(msg_file, user_lookup, include_threads, thread_index),
+            )
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(jobs, len(message_files)),
+        initializer=_init_convert_worker,
+        initargs=(user_lookup, include_threads, thread_index),
+    ) as executor:
+        yield from zip(message_files, executor.map(_convert_day_file, message_files))
+
+
+class TranscriptWriter:
+    """Buffered, streaming writer for transcript lines.
+
+    Lines are separated by newlines exactly as ``"\\n".join(lines)`` would,
+    without ever holding the whole transcript in memory.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.lines_written = 0
+
+    def write_line(self, line: str) -> None:
+        if self.lines_written:
+            self.stream.write("\n")
+        self.stream.write(line)
+        self.lines_written += 1
+
+    def write_lines(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.write_line(line)
+
+
+# Output buffer for streamed transcripts
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Rough average for English chat text; good enough to size chunks
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(lines: Iterable[str]) -> int:
+    """Estimate the token count of transcript lines from their length."""
+    chars = sum(len(line) + 1 for line in lines)
+    return -(-chars // CHARS_PER_TOKEN)
+
+
+def day_header(day: str) -> str:
+    return f"\n## 📅 {day}\n"
+
+
+class TranscriptChunker:
+    """Split the rendered transcript into chunk files within a token budget.
+
+    Chunks are only cut between top-level messages, so a thread always stays
+    in one chunk with all of its replies. A thread larger than the budget
+    gets a chunk of its own and is flagged ``over_budget`` in the manifest.
+    ``manifest.json`` lists each chunk's date range and estimated tokens, so
+    the chunks can be summarized in parallel and the summaries reduced.
+    ``legend`` returns the header lines describing the users of a chunk,
+    such as the user aliases of the compact format; they are counted against
+    the budget and added to the chunk's header once it is complete.
+    """
+
+    def __init__(
+        self,
+        chunk_dir: Path,
+        token_budget: int,
+        channel_name: str = "",
+        legend: Optional[Callable[[Iterable[str]], List[str]]] = None,
+    ):
+        self.chunk_dir = chunk_dir
+        self.token_budget = token_budget
+        self.channel_name = channel_name
+        self.legend = legend
+        self.chunks: List[Dict[str, Any]] = []
+        self._file: Optional[TextIO] = None
+        self._writer: Optional[TranscriptWriter] = None
+        self._day: Optional[str] = None
+        # Users of the open chunk, in order of appearance, and their legend size
+        self._users: Dict[str, None] = {}
+        self._legend_tokens = 0
+
+        # Stale chunks from an earlier, longer run would confuse the reduce step
+        chunk_dir.mkdir(parents=True, exist_ok=True)
+        for old_chunk in chunk_dir.glob("chunk_*.md"):
+            old_chunk.unlink()
+
+    def _open_chunk(self) -> Dict[str, Any]:
+        number = len(self.chunks) + 1
+        name = f"chunk_{number:03d}.md"
+        self._file = open(
+            self.chunk_dir / name, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE
+        )
+        self._writer = TranscriptWriter(self._file)
+        self._day = None
+        self._users = {}
+        self._legend_tokens = 0
+
+        header_lines = [f"# Slack Conversation Transcript (part {number})", ""]
+        if self.channel_name:
+            header_lines.append(f"**Channel:** {self.channel_name}")
+        self._legend_at = len(header_lines)
+        header_lines.extend(["", "---", ""])
+        self._writer.write_lines(header_lines)
+
+        chunk = {
+            "file": name,
+            "start": None,
+            "end": None,
+            "days": [],
+            "messages": 0,
+            "tokens": estimate_tokens(header_lines),
+        }
+        self.chunks.append(chunk)
+        return chunk
+
+    def _close_chunk(self) -> None:
+        if self._file is None:
+            return
+        self._writer.write_lines(["", "---", "", "*End of part*"])
+        self._file.close()
+        self._file = None
+        self._writer = None
+        if self.legend and self._users:
+            legend = self.legend(self._users)
+            insert_lines(
+                self.chunk_dir / self.chunks[-1]["file"], self._legend_at, legend
+            )
+
+    def _legend_growth(self, users: Iterable[str]) -> Tuple[Dict[str, None], int]:
+        """Return the chunk's users with ``users`` added and the legend tokens added."""
+        chunk_users = dict(self._users)
+        chunk_users.update(dict.fromkeys(users))
+        if not self.legend or len(chunk_users) == len(self._users):
+            return chunk_users, 0
+        legend_tokens = estimate_tokens(self.legend(chunk_users))
+        return chunk_users, legend_tokens - self._legend_tokens
+
+    def add(self, day: str, block: MessageBlock, users: Iterable[str] = ()) -> None:
+        """Append one message block, starting a new chunk if it would not fit.
+
+        ``users`` are the users the block refers to, for the chunk's legend.
+        """
+        users = list(users)
+        chunk_users, legend_tokens = self._legend_growth(users)
+        tokens = estimate_tokens(block.lines) + legend_tokens
+        if day != self._day:
+            tokens += estimate_tokens([day_header(day)])
+
+        chunk = self.chunks[-1] if self._writer else None
+        if (
+            chunk is not None
+            and chunk["messages"]
+            and chunk["tokens"] + tokens > self.token_budget
+        ):
+            self._close_chunk()
+            chunk = None
+        if chunk is None:
+            chunk = self._open_chunk()
+            chunk_users, legend_tokens = self._legend_growth(users)
+            tokens = (
+                estimate_tokens(block.lines)
+                + legend_tokens
+                + estimate_tokens([day_header(day)])
+            )
+
+        if day != self._day:
+            self._writer.write_line(day_header(day))
+            chunk["days"].append(day)
+            self._day = day
+        self._writer.write_lines(block.lines)
+        self._users = chunk_users
+        self._legend_tokens += legend_tokens
+
+        chunk["tokens"] += tokens
+        chunk["messages"] += block.messages
+        if chunk["start"] is None or block.start_ts < chunk["start"]:
+            chunk["start"] = block.start_ts
+        if chunk["end"] is None or block.end_ts > chunk["end"]:
+            chunk["end"] = block.end_ts
+        if chunk["tokens"] > self.token_budget:
+            chunk["over_budget"] = True
+
+    def finish(self) -> Path:
+        """Close the last chunk and write the manifest, returning its path."""
+        self._close_chunk()
+        chunks = []
+        for chunk in self.chunks:
+            entry = dict(chunk)
+            entry["start"] = format_timestamp(str(chunk["start"]))
+            entry["end"] = format_timestamp(str(chunk["end"]))
+            chunks.append(entry)
+        manifest = {
+            "channel": self.channel_name,
+            "token_budget": self.token_budget,
+            "chars_per_token": CHARS_PER_TOKEN,
+            "total_tokens": sum(chunk["tokens"] for chunk in chunks),
+            "chunks": chunks,
+        }
+        manifest_file = self.chunk_dir / "manifest.json"
+        write_json_atomic(manifest_file, manifest)
+        return manifest_file
+
+
+# Variable parts of otherwise identical bot messages, replaced before hashing
+DEDUPE_REACTIONS_RE = re.compile(r"\n\n\*Reactions:\*.*\Z", re.DOTALL)
+DEDUPE_MENTION_RE = re.compile(r"\*\*@[^*\n]+\*\*|@\S+")
+DEDUPE_URL_RE = re.compile(r"https?://\S+")
+DEDUPE_HASH_RE = re.compile(r"\b(?=[0-9a-f]*\d)[0-9a-f]{7,}\b")
+DEDUPE_NUMBER_RE = re.compile(r"\d+(?:[.:]\d+)*")
+DEDUPE_WORD_RE = re.compile(r"<\w+>|\w+")
+
+# Shorter messages ("+1", "thanks") are never collapsed
+DEDUPE_MIN_WORDS = 4
+
+
+def normalize_for_dedupe(text: str) -> List[str]:
+    """Return the words of a message with mentions, URLs, hashes and numbers masked.
+
+    Reactions are left out, they do not change what a message says.
+    """
+    text = DEDUPE_REACTIONS_RE.sub("", text)
+    text = DEDUPE_MENTION_RE.sub("<user>", text)
+    text = DEDUPE_URL_RE.sub("<url>", text.lower())
+    text = DEDUPE_HASH_RE.sub("<hash>", text)
+    text = DEDUPE_NUMBER_RE.sub("<num>", text)
+    return DEDUPE_WORD_RE.findall(text)
+
+
+def simhash(words: List[str]) -> int:
+    """64-bit SimHash of a message's words and word pairs.
+
+    Feature hashes are summed per bit with a bit-sliced counter, so each
+    feature costs a few integer operations instead of a loop over 64 bits.
+    """
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    planes: List[int] = []
+    for feature in features:
+        carry = int.from_bytes(
+            hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big"
+        )
+        for j, plane in enumerate(planes):
+            planes[j], carry = plane ^ carry, plane & carry
+            if not carry:
+                break
+        if carry:
+            planes.append(carry)
+
+    # A bit is set when more than half of the features have it set: compare
+    # the per-bit counts with the threshold, most significant plane first
+    threshold = len(features) // 2 + 1
+    greater, equal = 0, (1 << 64) - 1
+    for j in range(max(len(planes), threshold.bit_length()) - 1, -1, -1):
+        plane = planes[j] if j < len(planes) else 0
+        if (threshold >> j) & 1:
+            equal &= plane
+        else:
+            greater |= equal & plane
+            equal &= ~plane
+    return greater | equal
+
+
+class _DuplicateRun:
+    __slots__ = ("author", "words", "_fingerprint", "blocks")
+
+    def __init__(self, author: Optional[str], words: List[str], block: MessageBlock):
+        self.author = author
+        self.words = words
+        self._fingerprint: Optional[int] = None
+        self.blocks = [block]
+
+    @property
+    def fingerprint(self) -> int:
+        if self._fingerprint is None:
+            self._fingerprint = simhash(self.words)
+        return self._fingerprint
+
+
+class NearDuplicateCollapser:
+    """Collapse near-duplicate messages, such as repeated CI bot notices.
+
+    Standalone messages (no thread) by the same author are compared after
+    masking URLs, hashes and numbers. Identical or SimHash-close messages
+    among the last ``window`` transcript entries are shown once, with their
+    count and time span, at the position of the first one.
+    """
+
+    def __init__(self, max_distance: int = 6, window: int = 50):
+        self.max_distance = max_distance
+        self.window = window
+        self.collapsed = 0
+        self.entries = 0
+        self.tokens_saved = 0
+
+    def _find_run(
+        self, pending: Iterable[_DuplicateRun], new_run: _DuplicateRun
+    ) -> Optional[_DuplicateRun]:
+        for run in reversed(pending):
+            if run.author != new_run.author:
+                continue
+            if run.words == new_run.words:
+                return run
+            distance = bin(run.fingerprint ^ new_run.fingerprint).count("1")
+            if distance <= self.max_distance:
+                return run
+        return None
+
+    def _emit(self, run: _DuplicateRun) -> MessageBlock:
+        first = run.blocks[0]
+        if len(run.blocks) == 1:
+            return first
+        last = run.blocks[-1]
+        note = (
+            f"\n> 🔁 *{len(run.blocks)} similar messages from "
+            f"{format_timestamp(str(first.start_ts))} to "
+            f"{format_timestamp(str(last.end_ts))}*"
+        )
+        self.entries += 1
+        self.collapsed += len(run.blocks) - 1
+        self.tokens_saved += sum(
+            estimate_tokens(block.lines) for block in run.blocks[1:]
+        ) - estimate_tokens([note])
+        return MessageBlock(
+            first.start_ts,
+            max(block.end_ts for block in run.blocks),
+            sum(block.messages for block in run.blocks),
+            first.lines + [note],
+        )
+
+    def collapse(self, blocks: Iterable[MessageBlock]) -> Iterator[MessageBlock]:
+        """Yield the blocks of one day with near-duplicate runs collapsed."""
+        pending = deque()
+        for block in blocks:
+            new_run = _DuplicateRun(None, [], block)
+            # Only a header and text: a message without thread replies
+            if len(block.lines) == 2:
+                words = normalize_for_dedupe(block.lines[1])
+                if len(words) >= DEDUPE_MIN_WORDS:
+                    new_run.author = block.lines[0].partition("] ")[2]
+                    new_run.words = words
+                    run = self._find_run(pending, new_run)
+                    if run is not None:
+                        run.blocks.append(block)
+                        continue
+            pending.append(new_run)
+            if len(pending) > self.window:
+                yield self._emit(pending.popleft())
+        while pending:
+            yield self._emit(pending.popleft())
+
+
+# Rendered parts of a message block rewritten by the compact format
+COMPACT_AUTHOR_RE = re.compile(
+    r"^\n?(?P<quote>(?:> )?)\*\*\[(?P<date>\d{4}-\d\d-\d\d) (?P<time>\d\d:\d\d):\d\d\] "
+    r"(?P<name>[^\n]*?):\*\*(?:\n(?P=quote)| )",
+    re.MULTILINE,
+)
+COMPACT_STAMP_RE = re.compile(
+    r"^\n?\*\*\[(?P<date>\d{4}-\d\d-\d\d) (?P<time>\d\d:\d\d):\d\d\] "
+    r"(?P<text>\([^\n]*\))\*\*$",
+    re.MULTILINE,
+)
+COMPACT_REPEAT_RE = re.compile(
+    r"\n\n> 🔁 \*(?P<count>\d+) similar messages "
+    r"from (?P<first_date>[\d-]+) (?P<first_time>\d\d:\d\d):\d\d "
+    r"to (?P<last_date>[\d-]+) (?P<last_time>\d\d:\d\d):\d\d\*$",
+    re.MULTILINE,
+)
+COMPACT_MENTION_RE = re.compile(r"\*\*@([^*\n]+)\*\*")
+COMPACT_REACTIONS_RE = re.compile(
+    r"\n(?P<quote>(?:> )?)\n(?P=quote)\*Reactions:\* (?P<reactions>[^\n]*)"
+)
+COMPACT_FILE_RE = re.compile(
+    r"\n(?P<quote>(?:> )?)(?:\n(?P=quote))?📄 \*File:\* (?P<file>[^\n]*)"
+)
+
+
+def compact_time(date: str, time: str, day: str) -> str:
+    """Shorten a timestamp to HH:MM, adding the date only if it is not ``day``."""
+    if date == day:
+        return time
+    if date[:4] == day[:4]:
+        return f"{date[5:]} {time}"
+    return f"{date} {time}"
+
+
+class CompactFormatter:
+    """Rewrite rendered message blocks in a compact, token-saving format.
+
+    Authors and mentions become short aliases (``u1``, ``u2``, ... in order of
+    first appearance) defined once in a legend, timestamps become ``HH:MM``
+    within the day heading (with the date only when it differs), and each
+    message header shares a line with its text. Reaction and file markers
+    are shortened, or dropped entirely.
+    """
+
+    def __init__(self, reactions: bool = True, files: bool = True):
+        self.reactions = reactions
+        self.files = files
+        self.aliases: Dict[str, str] = {}
+        # Users referred to by the last formatted block
+        self.last_users: Dict[str, None] = {}
+        self._next_alias = 1
+        self.chars_in = 0
+        self.chars_out = 0
+
+    def alias(self, name: str) -> str:
+        if name not in self.aliases:
+            # Never hand out an alias that is itself a user's name
+            alias = f"u{self._next_alias}"
+            while alias in self.aliases:
+                self._next_alias += 1
+                alias = f"u{self._next_alias}"
+            self._next_alias += 1
+            self.aliases[name] = alias
+        self.last_users[name] = None
+        return self.aliases[name]
+
+    def legend(self, users: Optional[Iterable[str]] = None) -> List[str]:
+        """Return the alias legend for ``users``, or for every user seen so far."""
+        names = list(self.aliases if users is None else users)
+        if not names:
+            return []
+        names.sort(key=lambda name: int(self.aliases[name][1:]))
+        entries = "; ".join(f"{self.aliases[name]}={name}" for name in names)
+        return [f"**Users:** {entries}"]
+
+    def format(self, day: str, block: MessageBlock) -> MessageBlock:
+        """Return the block in compact form, as a single multi-line entry."""
+        text = "\n".join(block.lines)
+        self.chars_in += len(text) + 1
+        self.last_users = {}
+
+        reactions = r"\n\g<quote>\g<reactions>" if self.reactions else ""
+        text = COMPACT_REACTIONS_RE.sub(reactions, text)
+        files = r"\n\g<quote>📄 \g<file>" if self.files else ""
+        text = COMPACT_FILE_RE.sub(files, text)
+        text = text.replace("📎 *Attachment:* ", "📎 ")
+        # Quoted lines after a message are its thread replies
+        text = text.replace("\n\n> **Thread replies:**", "")
+        text = COMPACT_MENTION_RE.sub(lambda m: f"@{self.alias(m.group(1))}", text)
+
+        def author(match: re.Match) -> str:
+            time = compact_time(match["date"], match["time"], day)
+            return f"{match['quote']}[{time}] {self.alias(match['name'])}: "
+
+        def stamp(match: re.Match) -> str:
+            time = compact_time(match["date"], match["time"], day)
+            return f"[{time}] {match['text']}"
+
+        def repeat(match: re.Match) -> str:
+            first = compact_time(match["first_date"], match["first_time"], day)
+            last = compact_time(match["last_date"], match["last_time"], day)
+            return f"\n> 🔁 {match['count']} similar, {first} to {last}"
+
+        text = COMPACT_AUTHOR_RE.sub(author, text)
+        text = COMPACT_STAMP_RE.sub(stamp, text)
+        text = COMPACT_REPEAT_RE.sub(repeat, text)
+
+        self.chars_out += len(text) + 1
+        return block._replace(lines=[text])
+
+
+def insert_lines(path: Path, after: int, lines: List[str]) -> None:
+    """Insert lines into a written text file after its first ``after`` lines."""
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with (
+        open(path, "r", encoding="utf-8") as src,
+        open(tmp_path, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as dst,
+    ):
+        for _ in range(after):
+            dst.write(src.readline())
+        for line in lines:
+            dst.write(f"{line}\n")
+        shutil.copyfileobj(src, dst, WRITE_BUFFER_SIZE)
+    os.replace(tmp_path, path)
+
+
+# Weights of the activity score used to pick threads within a token budget
+THREAD_REPLY_WEIGHT = 1.0
+THREAD_PARTICIPANT_WEIGHT = 2.0
+THREAD_REACTION_WEIGHT = 0.5
+# A thread's score halves for every week since its latest message
+THREAD_RECENCY_HALF_LIFE_DAYS = 7.0
+# Length of the message text quoted in the stub of an omitted thread
+THREAD_STUB_CHARS = 80
+# Share of the budget kept for stubs while picking the threads shown in full
+THREAD_STUB_SHARE = 0.25
+
+# Authors and reaction counts in a rendered message block
+BLOCK_AUTHOR_RE = re.compile(
+    r"^\n?(?P<reply>> )?\*\*\[[^\]\n]+\] (?P<name>[^\n]*?):\*\*$", re.MULTILINE
+)
+BLOCK_REACTIONS_RE = re.compile(r"\*Reactions:\* ([^\n]*)")
+REACTION_COUNT_RE = re.compile(r"\((\d+)\)")
+
+
+class _Candidate:
+    __slots__ = (
+        "block",
+        "score",
+        "tokens",
+        "stub",
+        "stub_tokens",
+        "short_stub",
+        "short_stub_tokens",
+        "choice",
+    )
+
+    def __init__(self, block: MessageBlock, score: float, tokens: int):
+        self.block = block
+        self.score = score
+        self.tokens = tokens
+        self.stub: Optional[MessageBlock] = None
+        self.stub_tokens = 0
+        self.short_stub: Optional[MessageBlock] = None
+        self.short_stub_tokens = 0
+        # "full", "stub", "short_stub" or None when left out
+        self.choice: Optional[str] = None
+
+
+class ThreadSelector:
+    """Keep the most active threads of a transcript within a token budget.
+
+    Every top-level message is scored by its replies, distinct participants
+    and reactions, discounted by the age of its latest message. Entries are
+    taken from a max-heap by score and shown in full while they fit, keeping
+    part of the budget (THREAD_STUB_SHARE) free. Every omitted thread is then
+    listed by a short stub without message text, most active first, and the
+    most active of those get the quoted text back while tokens are left.
+    Omitted threads that do not fit even as a short stub are counted in the
+    summary, as are the messages without replies that are left out.
+
+    ``compact_options`` measures entries as the compact format renders them.
+    """
+
+    def __init__(
+        self,
+        token_budget: int,
+        compact_options: Optional[Dict[str, bool]] = None,
+    ):
+        self.token_budget = token_budget
+        self._measure = None
+        if compact_options is not None:
+            self._measure = CompactFormatter(**compact_options)
+        self.entries = 0
+        self.full = 0
+        self.stubs = 0
+        self.unlisted = 0
+        self.left_out = 0
+        self.tokens = 0
+
+    def _tokens(self, day: str, block: MessageBlock) -> int:
+        if self._measure:
+            block = self._measure.format(day, block)
+        return estimate_tokens(block.lines)
+
+    @staticmethod
+    def score(block: MessageBlock, newest_ts: float) -> Tuple[float, int, int]:
+        """Return (score, replies, participants) of a rendered block."""
+        text = "\n".join(block.lines)
+        replies = 0
+        participants = set()
+        for match in BLOCK_AUTHOR_RE.finditer(text):
+            participants.add(match["name"])
+            if match["reply"]:
+                replies += 1
+        reactions = sum(
+            int(count)
+            for reaction_list in BLOCK_REACTIONS_RE.findall(text)
+            for count in REACTION_COUNT_RE.findall(reaction_list)
+        )
+        activity = (
+            1
+            + THREAD_REPLY_WEIGHT * replies
+            + THREAD_PARTICIPANT_WEIGHT * max(len(participants) - 1, 0)
+            + THREAD_REACTION_WEIGHT * reactions
+        )
+        age_days = max(newest_ts - block.end_ts, 0) / 86400
+        return (
+            activity * 0.5 ** (age_days / THREAD_RECENCY_HALF_LIFE_DAYS),
+            replies,
+            len(participants),
+        )
+
+    @staticmethod
+    def stub(
+        block: MessageBlock,
+        replies: int,
+        participants: int,
+        chars: int = THREAD_STUB_CHARS,
+    ) -> MessageBlock:
+        """Return a one-line entry standing in for an omitted thread.
+
+        Args:
+            block: Rendered thread
+            replies: Number of replies in the thread
+            participants: Number of distinct authors in the thread
+            chars: Length of the quoted message text, 0 to quote none
+
+        Returns:
+            Block with the message header, text snippet and reply counts
+        """
+        header = block.lines[0]
+        snippet = ""
+        if chars and len(block.lines) > 1 and not block.lines[1].startswith("\n> "):
+            # First line of the message text, without code fences
+            for line in block.lines[1].split("\n"):
+                if line.strip() and not line.startswith("```"):
+                    snippet = " ".join(line.split())
+                    break
+            if len(snippet) > chars:
+                snippet = snippet[:chars].rsplit(" ", 1)[0] + "…"
+            if snippet:
+                snippet += " "
+        reply_word = "reply" if replies == 1 else "replies"
+        note = (
+            f"*(thread omitted: {replies} {reply_word}, {participants} participants)*"
+        )
+        return MessageBlock(
+            block.start_ts, block.end_ts, 1, [f"{header} {snippet}{note}"]
+        )
+
+    def select(
+        self, days: Iterable[Tuple[str, Optional[Iterable[MessageBlock]]]]
+    ) -> List[Tuple[str, Optional[List[MessageBlock]]]]:
+        """Read all days and return them with only the selected entries.
+
+        Shown threads keep their place in the transcript; omitted threads are
+        replaced by their stubs. Days that fail to render stay None.
+        """
+        rendered: List[Tuple[str, Optional[List[MessageBlock]]]] = []
+        for day, blocks in days:
+            if blocks is not None:
+                try:
+                    blocks = list(blocks)
+                except Exception as e:
+                    print(f"❌ Failed to process {day}: {e}")
+                    blocks = None
+            rendered.append((day, blocks))
+
+        newest_ts = max(
+            (block.end_ts for _, blocks in rendered for block in blocks or []),
+            default=0.0,
+        )
+        cost = sum(estimate_tokens([day_header(day)]) for day, _ in rendered)
+        candidates: List[Tuple[str, _Candidate]] = []
+        for day, blocks in rendered:
+            for block in blocks or []:
+                score, replies, participants = self.score(block, newest_ts)
+                candidate = _Candidate(block, score, self._tokens(day, block))
+                if replies:
+                    candidate.stub = self.stub(block, replies, participants)
+                    candidate.stub_tokens = self._tokens(day, candidate.stub)
+                    candidate.short_stub = self.stub(block, replies, participants, 0)
+                    candidate.short_stub_tokens = self._tokens(
+                        day, candidate.short_stub
+                    )
+                candidates.append((day, candidate))
+
+        stub_reserve = min(
+            sum(candidate.stub_tokens for _, candidate in candidates),
+            int(self.token_budget * THREAD_STUB_SHARE),
+        )
+
+        # Show the highest-scored entries in full while they fit
+        ranked = [(-candidate.score, i) for i, (_, candidate) in enumerate(candidates)]
+        heapq.heapify(ranked)
+        omitted = []
+        while ranked:
+            _, i = heapq.heappop(ranked)
+            candidate = candidates[i][1]
+            if cost + candidate.tokens + stub_reserve <= self.token_budget:
+                candidate.choice = "full"
+                cost += candidate.tokens
+            elif candidate.stub is not None:
+                omitted.append(candidate)
+
+        # List as many omitted threads as fit, most active first, then quote
+        # the text of the most active ones in what is left
+        for candidate in omitted:
+            if cost + candidate.short_stub_tokens <= self.token_budget:
+                candidate.choice = "short_stub"
+                cost += candidate.short_stub_tokens
+        for candidate in omitted:
+            extra = candidate.stub_tokens - candidate.short_stub_tokens
+            if candidate.choice and cost + extra <= self.token_budget:
+                candidate.choice = "stub"
+                cost += extra
+
+        selected = iter(candidates)
+        result: List[Tuple[str, Optional[List[MessageBlock]]]] = []
+        for day, blocks in rendered:
+            if blocks is None:
+                result.append((day, None))
+                continue
+            kept = []
+            for _ in blocks:
+                _, candidate = next(selected)
+                if candidate.choice == "full":
+                    kept.append(candidate.block)
+                elif candidate.choice == "stub":
+                    kept.append(candidate.stub)
+                elif candidate.choice == "short_stub":
+                    kept.append(candidate.short_stub)
+            result.append((day, kept))
+
+        self.entries = len(candidates)
+        self.full = sum(1 for _, c in candidates if c.choice == "full")
+        self.stubs = sum(1 for c in omitted if c.choice)
+        self.unlisted = len(omitted) - self.stubs
+        self.left_out = self.entries - self.full - len(omitted)
+        self.tokens = cost
+        return result
+
+    def summary(self) -> str:
+        return (
+            f"{self.full} of {self.entries} messages and threads shown in full "
+            f"within a {self.token_budget}-token budget, {self.stubs} omitted "
+            f"threads listed as stubs, {self.unlisted} omitted threads not "
+            f"listed, {self.left_out} messages without replies left out"
+        )
+
+
+def write_transcript(
+    output_file: str,
+    channel_name: str,
+    days: Iterable[Tuple[str, Optional[Iterable[MessageBlock]]]],
+    day_count: int,
+    chunk_tokens: int = 0,
+    dedupe_options: Optional[Dict[str, int]] = None,
+    compact_options: Optional[Dict[str, bool]] = None,
+    thread_budget: int = 0,
+) -> int:
+    """Stream rendered days into a markdown transcript file.
+
+    Args:
+        output_file: Transcript path
+        channel_name: Channel shown in the header
+        days: (day, message blocks) pairs in date order; blocks of None mark
+            a day that failed to render
+        day_count: Number of days expected, reported in the footer
+        chunk_tokens: Also split the transcript into chunk files of at most
+            this many estimated tokens, under ``<transcript>_chunks/``
+        dedupe_options: Collapse near-duplicate messages; keyword arguments
+            for NearDuplicateCollapser, or None to keep every message
+        compact_options: Write the compact format; keyword arguments for
+            CompactFormatter, or None for the full markdown format
+        thread_budget: Only show the most active threads that fit in this
+            many estimated tokens, with stubs for the others (see
+            ThreadSelector); all days are read before writing
+
+    Returns:
+        The number of days written
+    """
+    formatter = None
+    if compact_options is not None:
+        formatter = CompactFormatter(**compact_options)
+
+    chunker = None
+    if chunk_tokens > 0:
+        output_path = Path(output_file)
+        chunker = TranscriptChunker(
+            output_path.with_name(f"{output_path.stem}_chunks"),
+            chunk_tokens,
+            channel_name,
+            legend=formatter.legend if formatter else None,
+        )
+
+    collapser = None
+    if dedupe_options is not None:
+        collapser = NearDuplicateCollapser(**dedupe_options)
+        days = (
+            (day, None if blocks is None else collapser.collapse(blocks))
+            for day, blocks in days
+        )
+
+    selector = None
+    if thread_budget > 0:
+        selector = ThreadSelector(thread_budget, compact_options)
+        print(f"🎯 Selecting the most active threads within {thread_budget} tokens")
+        days = selector.select(days)
+
+    print(f"📝 Writing transcript to {output_file}")
+    with open(output_file, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+        writer = TranscriptWriter(f)
+
+        # Add header with markdown
+        header_lines = ["# Slack Conversation Transcript", ""]
+        if channel_name:
+            header_lines.append(f"**Channel:** {channel_name}")
+        header_lines.extend(
+            [
+                f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            ]
+        )
+        if selector:
+            header_lines.append(f"**Selection:** {selector.summary()}")
+        header_lines.extend(["", "---", ""])
+        writer.write_lines(header_lines)
+
+        # Stream each day, in date order
+        days_written = 0
+        for day, blocks in days:
+            writer.write_line(day_header(day))
+            if blocks is None:
+                continue
+            try:
+                for block in blocks:
+                    if formatter:
+                        block = formatter.format(day, block)
+                    writer.write_lines(block.lines)
+                    if chunker:
+                        users = formatter.last_users if formatter else ()
+                        chunker.add(day, block, users)
+            except Exception as e:
+                print(f"❌ Failed to process {day}: {e}")
+                continue
+            days_written += 1
+
+        # Add footer; the file count is only known once everything is written
+        writer.write_lines(
+            [
+                "",
+                "---",
+                "",
+                f"**Files processed:** {days_written} of {day_count}",
+                "",
+                "*End of transcript*",
+            ]
+        )
+    if formatter:
+        # Aliases are assigned as users appear, so the legend is added last
+        legend = formatter.legend()
+        if legend:
+            insert_lines(Path(output_file), len(header_lines) - 3, legend)
+    print(f"✅ Transcript written to {output_file}")
+
+    if formatter:
+        legend_chars = sum(len(line) + 1 for line in formatter.legend())
+        compact_chars = formatter.chars_out + legend_chars
+        saved = 1 - compact_chars / formatter.chars_in if formatter.chars_in else 0
+        print(
+            f"🗜️  Compact format: {formatter.chars_in} -> {compact_chars} characters "
+            f"of messages (~{-(-compact_chars // CHARS_PER_TOKEN)} tokens), "
+            f"{saved:.0%} smaller"
+        )
+    if selector:
+        print(f"🎯 {selector.summary()} (~{selector.tokens} tokens)")
+    if collapser:
+        print(
+            f"🔁 Collapsed {collapser.collapsed} near-duplicate messages into "
+            f"{collapser.entries} entries, saving ~{collapser.tokens_saved} tokens"
+        )
+    if chunker:
+        manifest_file = chunker.finish()
+        print(
+            f"🧩 Split transcript into {len(chunker.chunks)} chunks of up to "
+            f"{chunk_tokens} tokens, manifest at {manifest_file}"
+        )
+    return days_written
 
 
 def convert_to_transcript(
-    export_dir: str, channel_name: str, output_file: str, include_threads: bool = True
+    export_dir: str,
+    channel_name: str,
+    output_file: str,
+    include_threads: bool = True,
+    jobs: int = 1,
+    since: Optional[str] = None,
+    chunk_tokens: int = 0,
+    dedupe_options: Optional[Dict[str, int]] = None,
+    compact_options: Optional[Dict[str, bool]] = None,
+    thread_budget: int = 0,
 ):
-    """Convert Slack export to markdown transcript."""
+    """Convert Slack export to markdown transcript.
+
+    ``since`` (YYYY-mm-dd) skips older day files, for exports that keep more
+    history than the requested window. With ``chunk_tokens`` the transcript
+    is also split into chunk files of at most that many estimated tokens,
+    written with a manifest to ``<transcript>_chunks/`` next to it.
+    ``dedupe_options`` collapses near-duplicate messages (see
+    NearDuplicateCollapser), ``compact_options`` selects the compact format
+    (see CompactFormatter) and ``thread_budget`` keeps only the most active
+    threads within that many tokens (see ThreadSelector).
+    """
     export_path = Path(export_dir)
 
     # Find the channel directory (should be the only directory besides attachments)
-    channel_dirs = [
-        d
-        for d in export_path.iterdir()
-        if d.is_dir() and d.name not in ["attachments", "__uploads"]
-    ]
-
-    if not channel_dirs:
+    channel_dir = find_channel_dir(export_path)
+    if channel_dir is None:
         print(f"❌ Error: No channel directory found in {export_dir}")
         sys.exit(1)
 
-    channel_dir = channel_dirs[0]
     users_file = export_path / "users.json"
 
-    # Load users
-    try:
-        user_lookup = load_users(str(users_file))
-    except Exception as e:
-        print(f"❌ Failed to load users: {e}")
-        sys.exit(1)
-
     # Find all matching message files
     message_files = glob(str(channel_dir / "*.json"))
+    if since:
+        message_files = [f for f in message_files if Path(f).stem >= since]
     if not message_files:
         print(f"❌ No message files found in {channel_dir}")
         sys.exit(1)
@@ -391,53 +2150,768 @@ def convert_to_transcript(
     message_files.sort()
     print(f"📋 Found {len(message_files)} message files")
 
-    # Process all files
-    all_transcript_lines = []
-
-    # Add header with markdown
-    header_lines = ["# Slack Conversation Transcript", ""]
-    if channel_name:
-        header_lines.append(f"**Channel:** {channel_name}")
-    header_lines.extend(
-        [
-            f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            f"**Files processed:** {len(message_files)}",
-            "",
-            "---",
-            "",
-        ]
+    # Load only the users these days refer to
+    try:
+        user_lookup = load_user_index(str(users_file), collect_user_ids(message_files))
+    except Exception as e:
+        print(f"❌ Failed to load users: {e}")
+        sys.exit(1)
+
+    # Index replies across all days so threads spanning days stay together
+    thread_index = None
+    if include_threads:
+        thread_index = ThreadIndex.build(message_files)
+        print(
+            f"🧵 Indexed {thread_index.reply_count} thread replies, "
+            f"{thread_index.spanning_threads()} threads spanning several days"
+        )
+
+    if jobs > 1:
+        print(f"⚡ Converting day files with {jobs} worker processes")
+    days = (
+        (Path(msg_file).stem, blocks)
+        for msg_file, blocks in render_day_files(
+            message_files,
+            user_lookup,
+            include_threads=include_threads,
+            jobs=jobs,
+            thread_index=thread_index,
+        )
+    )
+    write_transcript(
+        output_file,
+        channel_name,
+        days,
+        len(message_files),
+        chunk_tokens=chunk_tokens,
+        dedupe_options=dedupe_options,
+        compact_options=compact_options,
+        thread_budget=thread_budget,
     )
-    all_transcript_lines.extend(header_lines)
 
-    # Process each file
-    for msg_file in message_files:
-        file_header = f"\n## 📅 {Path(msg_file).stem}\n"
-        all_transcript_lines.append(file_header)
+    return output_file
+
+
+# ============================================================================
+# Message Store Functions
+# ============================================================================
 
+
+class MessageStore:
+    """SQLite store of exported Slack messages with a full-text index.
+
+    Day files are imported once and only re-read when they change, so
+    transcripts for any date range or thread are rendered from queries
+    instead of re-parsing the whole export. Message text (with mentions
+    resolved) is indexed with FTS5 for keyword search across all imported
+    history.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            id TEXT PRIMARY KEY,
+            name TEXT,
+            real_name TEXT,
+            display_name TEXT,
+            email TEXT,
+            is_bot INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY,
+            channel TEXT NOT NULL,
+            ts TEXT NOT NULL,
+            ts_num REAL NOT NULL,
+            day TEXT NOT NULL,
+            user TEXT,
+            thread_ts TEXT,
+            type TEXT,
+            raw TEXT NOT NULL,
+            search_text TEXT,
+            UNIQUE (channel, ts)
+        );
+        CREATE INDEX IF NOT EXISTS messages_day ON messages (channel, day, ts_num);
+        CREATE INDEX IF NOT EXISTS messages_thread ON messages (channel, thread_ts);
+        CREATE TABLE IF NOT EXISTS threads (
+            channel TEXT NOT NULL,
+            thread_ts TEXT NOT NULL,
+            reply_count INTEGER,
+            participants INTEGER,
+            latest_reply REAL,
+            PRIMARY KEY (channel, thread_ts)
+        );
+        CREATE TABLE IF NOT EXISTS reactions (
+            channel TEXT NOT NULL,
+            ts TEXT NOT NULL,
+            name TEXT NOT NULL,
+            count INTEGER,
+            users TEXT,
+            PRIMARY KEY (channel, ts, name)
+        );
+        CREATE TABLE IF NOT EXISTS imported_files (
+            channel TEXT NOT NULL,
+            name TEXT NOT NULL,
+            size INTEGER,
+            mtime_ns INTEGER,
+            PRIMARY KEY (channel, name)
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+            search_text, content='messages', content_rowid='id'
+        );
+        CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts (rowid, search_text)
+            VALUES (new.id, new.search_text);
+        END;
+        CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, search_text)
+            VALUES ('delete', old.id, old.search_text);
+        END;
+        CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE ON messages BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, search_text)
+            VALUES ('delete', old.id, old.search_text);
+            INSERT INTO messages_fts (rowid, search_text)
+            VALUES (new.id, new.search_text);
+        END;
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps the store consistent on a crash without a sync per commit
+        self.conn.execute("PRAGMA synchronous=NORMAL")
         try:
-            lines = process_messages_file(
-                msg_file, user_lookup, include_threads=include_threads
+            self.conn.executescript(self.SCHEMA)
+        except sqlite3.OperationalError as e:
+            self.conn.close()
+            raise RuntimeError(f"SQLite without FTS5 support: {e}")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _file_changed(self, channel: str, path: Path) -> bool:
+        stat = path.stat()
+        row = self.conn.execute(
+            "SELECT size, mtime_ns FROM imported_files WHERE channel = ? AND name = ?",
+            (channel, path.name),
+        ).fetchone()
+        return row != (stat.st_size, stat.st_mtime_ns)
+
+    def _mark_imported(self, channel: str, path: Path) -> None:
+        stat = path.stat()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO imported_files VALUES (?, ?, ?, ?)",
+            (channel, path.name, stat.st_size, stat.st_mtime_ns),
+        )
+
+    def import_users(self, users_file: Path) -> None:
+        print(f"📂 Loading users from {users_file}")
+
+        def rows():
+            # Streamed, so a large workspace directory is never fully in memory
+            for user in iter_users_json(str(users_file)):
+                entry = _user_entry(user)
+                yield (
+                    user.get("id"),
+                    entry["name"],
+                    entry["real_name"],
+                    entry["display_name"],
+                    entry["email"],
+                    int(bool(entry["is_bot"])),
+                )
+
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?, ?)", rows()
+        )
+
+    def user_lookup(self) -> Dict[str, Dict[str, Any]]:
+        """Return the stored users in the format of ``load_users``."""
+        return {
+            user_id: {
+                "name": name,
+                "real_name": real_name,
+                "display_name": display_name,
+                "email": email,
+                "is_bot": bool(is_bot),
+            }
+            for user_id, name, real_name, display_name, email, is_bot in (
+                self.conn.execute("SELECT * FROM users")
             )
-            all_transcript_lines.extend(lines)
-        except Exception as e:
-            print(f"❌ Failed to process {msg_file}: {e}")
-            continue
+        }
 
-    # Add footer
-    footer_lines = ["", "---", "", "*End of transcript*"]
-    all_transcript_lines.extend(footer_lines)
+    def import_export(self, export_dir: str, channel: str) -> int:
+        """Import a slackdump export, skipping day files imported unchanged.
+
+        Returns:
+            The number of day files (re)imported
+        """
+        export_path = Path(export_dir)
+        channel_dir = find_channel_dir(export_path)
+        if channel_dir is None:
+            raise ValueError(f"No channel directory found in {export_dir}")
+
+        users_file = export_path / "users.json"
+        with self.conn:
+            if users_file.exists() and self._file_changed(channel, users_file):
+                self.import_users(users_file)
+                self._mark_imported(channel, users_file)
+        user_lookup = self.user_lookup()
+
+        imported = 0
+        for day_file in sorted(channel_dir.glob("*.json")):
+            if not self._file_changed(channel, day_file):
+                continue
+            with open(day_file, "r", encoding="utf-8") as f:
+                messages = json.load(f)
+            with self.conn:
+                self._import_messages(channel, day_file.stem, messages, user_lookup)
+                self._mark_imported(channel, day_file)
+            imported += 1
+
+        with self.conn:
+            self._refresh_threads(channel)
+        print(
+            f"🗄️  Imported {imported} changed day files of {channel} into {self.db_path}"
+        )
+        return imported
+
+    def _import_messages(
+        self,
+        channel: str,
+        day: str,
+        messages: List[Dict[str, Any]],
+        user_lookup: Dict[str, Dict[str, Any]],
+    ) -> None:
+        self.conn.executemany(
+            """
+            INSERT INTO messages (
+                channel, ts, ts_num, day, user, thread_ts, type, raw, search_text
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (channel, ts) DO UPDATE SET
+                day = excluded.day,
+                user = excluded.user,
+                thread_ts = excluded.thread_ts,
+                type = excluded.type,
+                raw = excluded.raw,
+                search_text = excluded.search_text
+            """,
+            [
+                (
+                    channel,
+                    message.get("ts", "0"),
+                    float(message.get("ts", "0")),
+                    day,
+                    message.get("user"),
+                    message.get("thread_ts"),
+                    message.get("type", ""),
+                    json.dumps(message),
+                    extract_text_from_message(message, user_lookup),
+                )
+                for message in messages
+            ],
+        )
+        # Reactions of a re-imported day are replaced as a whole
+        self.conn.executemany(
+            "DELETE FROM reactions WHERE channel = ? AND ts = ?",
+            [(channel, message.get("ts", "0")) for message in messages],
+        )
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO reactions VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    channel,
+                    message.get("ts", "0"),
+                    reaction.get("name", ""),
+                    reaction.get("count", 0),
+                    json.dumps(reaction.get("users", [])),
+                )
+                for message in messages
+                for reaction in message.get("reactions", [])
+            ],
+        )
 
-    # Output
-    transcript_text = "\n".join(all_transcript_lines)
+    def _refresh_threads(self, channel: str) -> None:
+        self.conn.execute("DELETE FROM threads WHERE channel = ?", (channel,))
+        self.conn.execute(
+            """
+            INSERT INTO threads
+            SELECT channel, thread_ts, COUNT(*), COUNT(DISTINCT user), MAX(ts_num)
+            FROM messages
+            WHERE channel = ? AND thread_ts IS NOT NULL AND thread_ts != ts
+            GROUP BY thread_ts
+            """,
+            (channel,),
+        )
 
-    print(f"📝 Writing transcript to {output_file}")
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(transcript_text)
-    print(f"✅ Transcript written to {output_file}")
+    def _replies(self, channel: str, thread_ts: str, after: float = 0):
+        return [
+            json.loads(raw)
+            for (raw,) in self.conn.execute(
+                """
+                SELECT raw FROM messages
+                WHERE channel = ? AND thread_ts = ? AND ts != thread_ts
+                    AND ts_num >= ?
+                ORDER BY ts_num
+                """,
+                (channel, thread_ts, after),
+            )
+        ]
+
+    def iter_days(
+        self,
+        channel: str,
+        start_day: str,
+        end_day: str,
+        user_lookup: Dict[str, Dict[str, Any]],
+        include_threads: bool = True,
+    ) -> Iterator[Tuple[str, List[MessageBlock]]]:
+        """Yield (day, message blocks) for each stored day in the range.
+
+        Threads are attached to their parent with all stored replies. A
+        thread whose parent is older than the range is shown from its first
+        reply inside the range.
+        """
+        in_range = "channel = ? AND day BETWEEN ? AND ?"
+        params = (channel, start_day, end_day)
+        threads = {
+            thread_ts
+            for (thread_ts,) in self.conn.execute(
+                "SELECT thread_ts FROM threads WHERE channel = ?", (channel,)
+            )
+        }
+        parents = {
+            ts
+            for (ts,) in self.conn.execute(
+                f"SELECT ts FROM messages WHERE {in_range} "
+                "AND (thread_ts IS NULL OR thread_ts = ts) AND type = 'message'",
+                params,
+            )
+        }
 
+        day, blocks = None, []
+        anchored = set()
+        rows = self.conn.execute(
+            f"SELECT day, raw FROM messages WHERE {in_range} ORDER BY day, ts_num",
+            params,
+        )
+        for row_day, raw in rows:
+            if row_day != day:
+                if day is not None:
+                    yield day, blocks
+                day, blocks = row_day, []
+            message = json.loads(raw)
+            ts = message.get("ts", "0")
+            thread_ts = message.get("thread_ts")
+            if thread_ts and thread_ts != ts:
+                if include_threads and thread_ts not in parents:
+                    if thread_ts not in anchored:
+                        anchored.add(thread_ts)
+                        replies = self._replies(channel, thread_ts, float(ts))
+                        block = _thread_block(
+                            [_orphan_header(thread_ts)],
+                            float(ts),
+                            replies,
+                            user_lookup,
+                        )
+                        blocks.append(block._replace(messages=block.messages - 1))
+                continue
+            if message.get("type", "") != "message":
+                continue
+            replies = []
+            if include_threads and ts in threads:
+                replies = self._replies(channel, ts)
+            blocks.append(
+                _thread_block(
+                    _message_lines(message, user_lookup),
+                    float(ts),
+                    replies,
+                    user_lookup,
+                )
+            )
+        if day is not None:
+            yield day, blocks
+
+    def thread_block(
+        self, channel: str, thread_ts: str, user_lookup: Dict[str, Dict[str, Any]]
+    ) -> Optional[Tuple[str, MessageBlock]]:
+        """Return (day, block) for one thread, or None if it is not stored."""
+        row = self.conn.execute(
+            "SELECT day, raw FROM messages WHERE channel = ? AND ts = ?",
+            (channel, thread_ts),
+        ).fetchone()
+        replies = self._replies(channel, thread_ts)
+        if row is None:
+            if not replies:
+                return None
+            first_ts = float(replies[0].get("ts", "0"))
+            day = datetime.fromtimestamp(first_ts).strftime("%Y-%m-%d")
+            return day, _thread_block(
+                [_orphan_header(thread_ts)], first_ts, replies, user_lookup
+            )
+        day, raw = row
+        message = json.loads(raw)
+        return day, _thread_block(
+            _message_lines(message, user_lookup), float(thread_ts), replies, user_lookup
+        )
+
+    def search(
+        self, query: str, channel: Optional[str] = None, limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Full-text search over message text, best matches first.
+
+        ``query`` uses FTS5 syntax (``"exact phrase"``, ``OR``, ``prefix*``);
+        if it does not parse, its words are searched as plain terms.
+        """
+        sql = """
+            SELECT m.channel, m.day, m.ts, m.user, m.thread_ts,
+                snippet(messages_fts, 0, '«', '»', ' … ', 16)
+            FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid
+            WHERE messages_fts MATCH ? {channel_filter}
+            ORDER BY rank LIMIT ?
+        """.format(channel_filter="AND m.channel = ?" if channel else "")
+
+        def run(match: str):
+            params = [match] + ([channel] if channel else []) + [limit]
+            return self.conn.execute(sql, params).fetchall()
+
+        try:
+            rows = run(query)
+        except sqlite3.OperationalError:
+            terms = ['"' + word.replace('"', '""') + '"' for word in query.split()]
+            rows = run(" ".join(terms)) if terms else []
+        keys = ["channel", "day", "ts", "user", "thread_ts", "snippet"]
+        return [dict(zip(keys, row)) for row in rows]
+
+
+def render_from_store(
+    store: MessageStore,
+    channel: str,
+    channel_name: str,
+    output_file: str,
+    start_day: str,
+    end_day: str,
+    include_threads: bool = True,
+    chunk_tokens: int = 0,
+    dedupe_options: Optional[Dict[str, int]] = None,
+    compact_options: Optional[Dict[str, bool]] = None,
+    thread_budget: int = 0,
+) -> str:
+    """Write a transcript of a stored channel between two days (inclusive)."""
+    user_lookup = store.user_lookup()
+    day_count = store.conn.execute(
+        "SELECT COUNT(DISTINCT day) FROM messages "
+        "WHERE channel = ? AND day BETWEEN ? AND ?",
+        (channel, start_day, end_day),
+    ).fetchone()[0]
+    if not day_count:
+        print(f"❌ No stored messages for {channel} between {start_day} and {end_day}")
+        sys.exit(1)
+    print(f"📋 Rendering {day_count} stored days from {start_day} to {end_day}")
+    write_transcript(
+        output_file,
+        channel_name,
+        store.iter_days(channel, start_day, end_day, user_lookup, include_threads),
+        day_count,
+        chunk_tokens=chunk_tokens,
+        dedupe_options=dedupe_options,
+        compact_options=compact_options,
+        thread_budget=thread_budget,
+    )
     return output_file
 
 
+def print_search_results(results: List[Dict[str, Any]], store: MessageStore) -> None:
+    user_lookup = store.user_lookup()
+    if not results:
+        print("No matching messages")
+        return
+    for result in results:
+        user_display = get_user_display(result["user"] or "UNKNOWN", user_lookup)
+        thread = ""
+        if result["thread_ts"] and result["thread_ts"] != result["ts"]:
+            thread = f" (in thread {result['thread_ts']})"
+        print(
+            f"[{format_timestamp(result['ts'])}] {result['channel']} "
+            f"{user_display}{thread}  ts={result['ts']}"
+        )
+        print(f"    {' '.join(result['snippet'].split())}")
+
+
+# ============================================================================
+# Multi-Channel Functions
+# ============================================================================
+
+
+def parse_channel_specs(
+    specs: List[str], channels_file: Optional[str]
+) -> List[Dict[str, str]]:
+    """Build the channel list from ID[=NAME] arguments and a JSON config file.
+
+    Raises:
+        ValueError: If a channel ID is invalid or the config file is malformed
+    """
+    entries = []
+    if channels_file:
+        try:
+            with open(channels_file, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Could not read channels file {channels_file}: {e}")
+        if isinstance(config, dict):
+            config = config.get("channels", [])
+        for item in config:
+            if not isinstance(item, dict) or "id" not in item:
+                raise ValueError(f"Channel entries need an 'id': {item!r}")
+            entries.append((item["id"], item.get("name")))
+    for spec in specs:
+        channel_id, _, name = spec.partition("=")
+        entries.append((channel_id, name or None))
+
+    channels = []
+    seen = set()
+    for channel_id, name in entries:
+        channel_id = validate_channel_id(channel_id)
+        if channel_id in seen:
+            continue
+        seen.add(channel_id)
+        if not name:
+            name = (
+                DEFAULT_CHANNEL_NAME if channel_id == DEFAULT_CHANNEL_ID else channel_id
+            )
+        channels.append({"id": channel_id, "name": name})
+    return channels
+
+
+def export_channel(
+    channel_id: str,
+    days_back: int,
+    channel_output_dir: Path,
+    incremental: bool = False,
+    refetch_hours: float = 24,
+    exit_on_error: bool = True,
+    export_options: Optional[Dict[str, Any]] = None,
+) -> Optional[Path]:
+    """Export one channel into ``channel_output_dir/slack_export``.
+
+    ``export_options`` are passed to export_slack_messages or
+    incremental_export (time slicing).
+    """
+    channel_output_dir.mkdir(parents=True, exist_ok=True)
+    if incremental:
+        return incremental_export(
+            channel_id,
+            days_back,
+            channel_output_dir,
+            refetch_hours,
+            exit_on_error,
+            **(export_options or {}),
+        )
+    export_dir = channel_output_dir / "slack_export"
+    if export_slack_messages(
+        channel_id, days_back, str(export_dir), exit_on_error, **(export_options or {})
+    ):
+        return export_dir
+    return None
+
+
+def _convert_channel(
+    export_dir: str,
+    channel_name: str,
+    output_file: str,
+    since: Optional[str],
+    chunk_tokens: int = 0,
+    dedupe_options: Optional[Dict[str, int]] = None,
+    compact_options: Optional[Dict[str, bool]] = None,
+    thread_budget: int = 0,
+) -> Optional[str]:
+    """Convert one channel in a worker process, returning None on failure."""
+    try:
+        return convert_to_transcript(
+            export_dir,
+            channel_name,
+            output_file,
+            since=since,
+            chunk_tokens=chunk_tokens,
+            dedupe_options=dedupe_options,
+            compact_options=compact_options,
+            thread_budget=thread_budget,
+        )
+    except SystemExit:
+        # convert_to_transcript exits on a broken export; only this channel fails
+        return None
+    except Exception as e:
+        print(f"❌ Failed to convert {export_dir}: {e}")
+        return None
+
+
+def run_multi_channel(
+    channels: List[Dict[str, str]],
+    days_back: int,
+    output_dir: Path,
+    max_exports: int = 3,
+    jobs: int = 1,
+    incremental: bool = False,
+    refetch_hours: float = 24,
+    export_options: Optional[Dict[str, Any]] = None,
+    chunk_tokens: int = 0,
+    dedupe_options: Optional[Dict[str, int]] = None,
+    compact_options: Optional[Dict[str, bool]] = None,
+    thread_budget: int = 0,
+) -> Path:
+    """Export and convert several channels, then write a combined index.
+
+    Exports run in threads, at most ``max_exports`` slackdump processes at a
+    time, including the slices of time-sliced exports; the exports are then
+    converted in up to ``jobs`` worker processes. A failing channel is
+    reported in the index instead of stopping the run.
+    """
+    since = (datetime.now() - timedelta(days=days_back)).strftime("%Y-%m-%d")
+    results = {channel["id"]: {"status": "export failed"} for channel in channels}
+
+    # Every channel's slices count against the same process limit
+    export_options = dict(export_options or {})
+    if export_options.get("slice_days"):
+        export_options["process_limit"] = threading.Semaphore(max(1, max_exports))
+
+    print(f"🚀 Exporting {len(channels)} channels, {max_exports} at a time")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_exports)) as pool:
+        export_dirs = list(
+            pool.map(
+                lambda channel: export_channel(
+                    channel["id"],
+                    days_back,
+                    output_dir / channel["id"],
+                    incremental,
+                    refetch_hours,
+                    exit_on_error=False,
+                    export_options=export_options,
+                ),
+                channels,
+            )
+        )
+
+    # Convert only once all exports are done, so no process is forked while
+    # export threads are still running
+    exported = [
+        (channel, export_dir)
+        for channel, export_dir in zip(channels, export_dirs)
+        if export_dir is not None
+    ]
+    print(f"⚡ Converting {len(exported)} channel exports with {jobs} worker processes")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max(1, jobs)) as pool:
+        transcripts = pool.map(
+            _convert_channel,
+            [str(export_dir) for _, export_dir in exported],
+            [channel["name"] for channel, _ in exported],
+            [
+                str(output_dir / channel["id"] / "transcript.md")
+                for channel, _ in exported
+            ],
+            [since if incremental else None] * len(exported),
+            [chunk_tokens] * len(exported),
+            [dedupe_options] * len(exported),
+            [compact_options] * len(exported),
+            [thread_budget] * len(exported),
+        )
+        for (channel, _), transcript in zip(exported, transcripts):
+            results[channel["id"]] = (
+                {"status": "ok", "transcript": transcript}
+                if transcript
+                else {"status": "conversion failed"}
+            )
+
+    index_file = output_dir / "index.md"
+    lines = [
+        "# Slack Transcripts Index",
+        "",
+        f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"**Period:** last {days_back} days",
+        "",
+        "| Channel | ID | Transcript | Size |",
+        "|---------|----|------------|------|",
+    ]
+    for channel in channels:
+        result = results[channel["id"]]
+        if result["status"] == "ok":
+            transcript = Path(result["transcript"])
+            rel_path = transcript.relative_to(output_dir)
+            link = f"[{rel_path}]({rel_path})"
+            size = f"{transcript.stat().st_size // 1024} KB"
+        else:
+            link, size = f"❌ {result['status']}", "-"
+        # A | in a channel name would end its table cell
+        name = channel["name"].replace("|", "\\|")
+        lines.append(f"| {name} | {channel['id']} | {link} | {size} |")
+    with open(index_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    ok = sum(1 for r in results.values() if r["status"] == "ok")
+    print(f"✅ {ok} of {len(channels)} channel transcripts written")
+    return index_file
+
+
+def render_with_store(
+    db_path: str,
+    channel_id: str,
+    channel_name: str,
+    export_dir: Path,
+    output_dir: Path,
+    args: argparse.Namespace,
+    dedupe_options: Optional[Dict[str, int]] = None,
+    compact_options: Optional[Dict[str, bool]] = None,
+    thread_budget: int = 0,
+) -> Path:
+    """Update the message store from the export and render the transcript."""
+    try:
+        store = MessageStore(db_path)
+    except RuntimeError as e:
+        print(f"❌ Cannot open message store: {e}")
+        sys.exit(1)
+    try:
+        if not args.no_export:
+            try:
+                store.import_export(str(export_dir), channel_id)
+            except (OSError, ValueError) as e:
+                print(f"❌ Failed to import {export_dir}: {e}")
+                sys.exit(1)
+
+        if args.thread:
+            thread_file = output_dir / f"thread_{args.thread}.md"
+            found = store.thread_block(channel_id, args.thread, store.user_lookup())
+            if found is None:
+                print(f"❌ Thread {args.thread} is not in {db_path}")
+                sys.exit(1)
+            day, block = found
+            write_transcript(
+                str(thread_file),
+                channel_name,
+                [(day, [block])],
+                1,
+                compact_options=compact_options,
+            )
+            return thread_file
+
+        start_day = args.from_date or (
+            datetime.now() - timedelta(days=args.days)
+        ).strftime("%Y-%m-%d")
+        end_day = args.to_date or datetime.now().strftime("%Y-%m-%d")
+        transcript_file = output_dir / "transcript.md"
+        render_from_store(
+            store,
+            channel_id,
+            channel_name,
+            str(transcript_file),
+            start_day,
+            end_day,
+            chunk_tokens=args.chunk_tokens,
+            dedupe_options=dedupe_options,
+            compact_options=compact_options,
+            thread_budget=thread_budget,
+        )
+        return transcript_file
+    finally:
+        store.close()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Generate summary of vLLM CI Slack channel"
@@ -447,23 +2921,193 @@ def main():
     )
     parser.add_argument(
         "--channel",
-        default="C07R5PAL2L9",
+        default=DEFAULT_CHANNEL_ID,
         help="Slack channel ID (default: vLLM CI SIG)",
     )
+    parser.add_argument(
+        "--channels",
+        nargs="+",
+        default=[],
+        metavar="ID[=NAME]",
+        help="Export several channels concurrently, one transcript per channel",
+    )
+    parser.add_argument(
+        "--channels-file",
+        help='JSON file listing channels as [{"id": ..., "name": ...}]',
+    )
+    parser.add_argument(
+        "--max-exports",
+        type=int,
+        default=3,
+        help="Concurrent slackdump processes in multi-channel mode, shared by "
+        "all channels and their slices (default: 3)",
+    )
     parser.add_argument(
         "--output-dir", default="vllm_slack_summary", help="Output directory"
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only export messages newer than the previous run and merge them "
+        "into the local export",
+    )
+    parser.add_argument(
+        "--refetch-hours",
+        type=float,
+        default=24,
+        help="With --incremental, re-export this many hours before the last "
+        "exported message to catch late replies and edits (default: 24)",
+    )
+    parser.add_argument(
+        "--slice-days",
+        type=int,
+        default=0,
+        help="Export the window (with --incremental, the range since the last "
+        "run) as concurrent slices of this many days, each retried on its own "
+        "(default: 0, one export)",
+    )
+    parser.add_argument(
+        "--slice-jobs",
+        type=int,
+        default=4,
+        help="Concurrent slackdump processes per channel with --slice-days "
+        "(default: 4)",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=2,
+        help="Retries for each failed slice with --slice-days (default: 2)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for converting day files (default: 1)",
+    )
+    parser.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=0,
+        help="Also split the transcript into chunk files of about this many "
+        "tokens, never breaking a thread (default: 0, no chunks)",
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Collapse near-duplicate messages, such as repeated CI bot "
+        "notices, into one entry with a count and time span",
+    )
+    parser.add_argument(
+        "--dedupe-distance",
+        type=int,
+        default=6,
+        help="With --dedupe, maximum SimHash distance in bits between "
+        "near-duplicates (default: 6, 0 for exact matches after masking "
+        "numbers, hashes and URLs)",
+    )
+    parser.add_argument(
+        "--dedupe-window",
+        type=int,
+        default=50,
+        help="With --dedupe, how many recent entries a message is compared "
+        "with (default: 50)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["markdown", "compact"],
+        default="markdown",
+        help="Transcript format: full markdown, or compact with user aliases "
+        "and short timestamps to save tokens (default: markdown)",
+    )
+    parser.add_argument(
+        "--drop-reactions",
+        action="store_true",
+        help="With --format compact, leave out reactions",
+    )
+    parser.add_argument(
+        "--drop-files",
+        action="store_true",
+        help="With --format compact, leave out file markers",
+    )
+    parser.add_argument(
+        "--thread-budget",
+        type=int,
+        default=0,
+        metavar="TOKENS",
+        help="Show only the most active threads (replies, participants, "
+        "reactions, recency) that fit in about this many tokens, with "
+        "one-line stubs for the others; stubs lose their message text, and "
+        "the header counts the threads left unlisted, when the budget runs "
+        "out (default: 0, everything)",
+    )
+    parser.add_argument(
+        "--store",
+        metavar="DB",
+        help="Import the export into this SQLite message store and render the "
+        "transcript from it",
+    )
+    parser.add_argument(
+        "--no-export",
+        action="store_true",
+        help="With --store, skip slackdump and use the messages already stored",
+    )
+    parser.add_argument(
+        "--from-date",
+        metavar="YYYY-MM-DD",
+        help="With --store, first day of the transcript (default: --days ago)",
+    )
+    parser.add_argument(
+        "--to-date",
+        metavar="YYYY-MM-DD",
+        help="With --store, last day of the transcript (default: today)",
+    )
+    parser.add_argument(
+        "--thread",
+        metavar="TS",
+        help="With --store, render only the thread started at this timestamp",
+    )
+    parser.add_argument(
+        "--search",
+        metavar="QUERY",
+        help="Search the --store for QUERY (FTS5 syntax) and exit",
+    )
 
     args = parser.parse_args()
 
+    store_only = [args.no_export, args.from_date, args.to_date, args.thread]
+    if not args.store and (any(store_only) or args.search):
+        parser.error(
+            "--no-export, --from-date, --to-date, --thread and --search need --store"
+        )
+
     # Validate inputs before use
     try:
         channel_id = validate_channel_id(args.channel)
         output_dir_str = validate_output_dir(args.output_dir)
+        channels = parse_channel_specs(args.channels, args.channels_file)
+        for date in (args.from_date, args.to_date):
+            if date:
+                datetime.strptime(date, "%Y-%m-%d")
     except ValueError as e:
         print(f"❌ Input validation error: {e}")
         sys.exit(1)
 
+    if channels and args.store:
+        parser.error("--store works with a single --channel")
+    if args.format != "compact" and (args.drop_reactions or args.drop_files):
+        parser.error("--drop-reactions and --drop-files need --format compact")
+
+    if args.search:
+        try:
+            store = MessageStore(args.store)
+        except RuntimeError as e:
+            print(f"❌ Cannot open message store: {e}")
+            sys.exit(1)
+        print_search_results(store.search(args.search, channel=channel_id), store)
+        store.close()
+        return
+
     print("=" * 60)
     print("vLLM Slack Summary Generator for RHAIIS Team")
     print("=" * 60)
@@ -472,14 +3116,85 @@ def main():
     output_dir = Path(output_dir_str)
     output_dir.mkdir(exist_ok=True)
 
+    export_options = {
+        "slice_days": args.slice_days,
+        "max_concurrent": args.slice_jobs,
+        "retries": args.retries,
+    }
+    dedupe_options = None
+    if args.dedupe:
+        dedupe_options = {
+            "max_distance": args.dedupe_distance,
+            "window": args.dedupe_window,
+        }
+    compact_options = None
+    if args.format == "compact":
+        compact_options = {
+            "reactions": not args.drop_reactions,
+            "files": not args.drop_files,
+        }
+
+    if channels:
+        index_file = run_multi_channel(
+            channels,
+            args.days,
+            output_dir,
+            max_exports=args.max_exports,
+            jobs=args.jobs,
+            incremental=args.incremental,
+            refetch_hours=args.refetch_hours,
+            export_options=export_options,
+            chunk_tokens=args.chunk_tokens,
+            dedupe_options=dedupe_options,
+            compact_options=compact_options,
+            thread_budget=args.thread_budget,
+        )
+        print(f"\n✅ Channel index generated at: {index_file}")
+        return
+
     export_dir = output_dir / "slack_export"
     transcript_file = output_dir / "transcript.md"
 
     # Step 1: Export Slack messages
-    export_slack_messages(channel_id, args.days, str(export_dir))
+    since = None
+    if args.no_export:
+        pass
+    elif args.incremental:
+        incremental_export(
+            channel_id, args.days, output_dir, args.refetch_hours, **export_options
+        )
+        since = (datetime.now() - timedelta(days=args.days)).strftime("%Y-%m-%d")
+    else:
+        export_slack_messages(channel_id, args.days, str(export_dir), **export_options)
 
     # Step 2: Convert to transcript
-    convert_to_transcript(str(export_dir), "vLLM CI SIG", str(transcript_file))
+    channel_name = (
+        DEFAULT_CHANNEL_NAME if channel_id == DEFAULT_CHANNEL_ID else channel_id
+    )
+    if args.store:
+        transcript_file = render_with_store(
+            args.store,
+            channel_id,
+            channel_name,
+            export_dir,
+            output_dir,
+            args,
+            dedupe_options=dedupe_options,
+            compact_options=compact_options,
+            thread_budget=args.thread_budget,
+        )
+    else:
+        convert_to_transcript(
+            str(export_dir),
+            channel_name,
+            str(transcript_file),
+            jobs=args.jobs,
+            since=since,
+            chunk_tokens=args.chunk_tokens,
+            dedupe_options=dedupe_options,
+            compact_options=compact_options,
+            thread_budget=args.thread_budget,
+        )
 
     # Step 3: Report locations of generated artifacts
     print(f"\n✅ Transcript generated at: {transcript_file}")